@@ -0,0 +1,165 @@
+"""
+WildLens – dynamic micro-batching for the inference service
+===========================================================
+
+Concurrent ``/predict`` calls each hold a single decoded ``[3, H, W]`` tensor.
+Instead of running one forward pass per request inside the event loop, the
+handlers ``await batcher.submit(tensor)``; a background task collects queued
+tensors until either
+
+    • ``max_batch_size`` images are waiting, or
+    • ``max_wait_ms`` elapsed since the first image of the batch arrived,
+
+then runs **one** batched forward pass in a worker thread and resolves every
+request's future with its row of softmax probabilities.
+
+Knobs (env vars read by ``api/app.py``):
+    BATCH_MAX_SIZE     – images per forward pass         (default 8)
+    BATCH_MAX_WAIT_MS  – latency budget for filling a batch (default 10)
+"""
+
+from __future__ import annotations
+import asyncio, time
+from concurrent.futures import ThreadPoolExecutor
+
+import torch
+
+
+class MicroBatcher:
+    """
+    Queue single-image requests and run them through ``model`` in batches.
+
+    The batcher must be started from inside the running event loop
+    (FastAPI startup hook) and stopped on shutdown.
+    """
+
+    def __init__(self, model, max_batch_size: int = 8, max_wait_ms: float = 10.0,
+                 device: str | torch.device = "cpu"):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be >= 1")
+        self.model          = model
+        self.max_batch_size = max_batch_size
+        self.max_wait       = max_wait_ms / 1000.0
+        self.device         = torch.device(device)
+
+        self._queue: asyncio.Queue | None = None
+        self._task:  asyncio.Task  | None = None
+        # one thread: torch already parallelises *inside* a forward pass
+        self._executor = ThreadPoolExecutor(max_workers=1,
+                                            thread_name_prefix="batcher")
+
+        # counters for /metrics
+        self._batches  = 0
+        self._images   = 0
+        self._busy_s   = 0.0
+
+    # ─────────────────────────── lifecycle ───────────────────────────
+    async def start(self):
+        if self._task is not None:
+            return
+        self._queue = asyncio.Queue()
+        self._task  = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        # fail whatever is still waiting instead of leaving callers hanging
+        while not self._queue.empty():
+            _, fut = self._queue.get_nowait()
+            if not fut.done():
+                fut.set_exception(RuntimeError("batcher stopped"))
+        self._executor.shutdown(wait=False)
+
+    # ─────────────────────────── public API ──────────────────────────
+    async def submit(self, tensor: torch.Tensor) -> torch.Tensor:
+        """
+        Queue one preprocessed ``[3, H, W]`` tensor and wait for its
+        probability vector ``[n_classes]``.
+        """
+        if self._queue is None:
+            raise RuntimeError("MicroBatcher.start() was never awaited")
+        fut = asyncio.get_running_loop().create_future()
+        await self._queue.put((tensor, fut))
+        return await fut
+
+    async def submit_many(self, tensors) -> list[torch.Tensor]:
+        """Queue several tensors at once; results keep the input order."""
+        return list(await asyncio.gather(*(self.submit(t) for t in tensors)))
+
+    def stats(self) -> dict:
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms":    self.max_wait * 1000.0,
+            "batches":        self._batches,
+            "images":         self._images,
+            "mean_batch":     round(self._images / self._batches, 3) if self._batches else 0.0,
+            "busy_seconds":   round(self._busy_s, 4),
+            "queued":         self._queue.qsize() if self._queue else 0,
+        }
+
+    # ─────────────────────────── internals ───────────────────────────
+    async def _collect(self) -> list:
+        """Block for the first item, then fill up to size / deadline."""
+        batch    = [await self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            # anything already queued is taken without waiting
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    @torch.inference_mode()
+    def _forward(self, tensors: list[torch.Tensor]) -> list[torch.Tensor]:
+        # tensors of different spatial size can't be stacked → one pass per shape
+        by_shape: dict[tuple, list[int]] = {}
+        for i, t in enumerate(tensors):
+            by_shape.setdefault(tuple(t.shape), []).append(i)
+
+        out = [None] * len(tensors)
+        for idxs in by_shape.values():
+            xb    = torch.stack([tensors[i] for i in idxs]).to(self.device)
+            probs = torch.softmax(self.model(xb), dim=1).cpu()
+            for i, row in zip(idxs, probs):
+                out[i] = row
+        return out
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch   = await self._collect()
+            # callers that gave up (client disconnect) don't need compute
+            batch   = [(t, f) for t, f in batch if not f.cancelled()]
+            if not batch:
+                continue
+            tensors = [t for t, _ in batch]
+            t0 = time.perf_counter()
+            try:
+                probs = await loop.run_in_executor(self._executor,
+                                                   self._forward, tensors)
+            except Exception as exc:            # surface to every caller
+                for _, fut in batch:
+                    if not fut.done():
+                        fut.set_exception(exc)
+                continue
+            self._busy_s  += time.perf_counter() - t0
+            self._batches += 1
+            self._images  += len(batch)
+            for row, (_, fut) in zip(probs, batch):
+                if not fut.done():
+                    fut.set_result(row)
@@ -0,0 +1,138 @@
+"""
+WildLens – content-addressed prediction cache
+=============================================
+
+Re-submitted photos (retries after a low-confidence answer, double taps,
+offline-sync replays) are answered without decoding or running the model.
+
+    key   = BLAKE2b-128 of the raw upload bytes, namespaced by the run-id
+    tier1 = in-process LRU with TTL          (PREDICTION_CACHE_SIZE / _TTL)
+    tier2 = optional JSON files on disk      (PREDICTION_CACHE_DIR/<namespace>)
+
+Callers that store differently shaped values (the FastAPI service keeps
+response dicts, ``ai.predict`` keeps ``[label, conf]``) pass their own
+``namespace`` so they can share PREDICTION_CACHE_DIR without reading each
+other's entries.
+
+``bind_run(run_id)`` is called with the run that is about to answer; when it
+differs from the previous one, the memory tier is dropped and disk entries
+of older runs are deleted, so a new model never serves stale predictions.
+"""
+
+from __future__ import annotations
+from collections import OrderedDict
+from pathlib import Path
+import hashlib, json, os, shutil, threading, time
+
+
+def digest(data: bytes | bytearray | memoryview) -> str:
+    """Fast content hash of the raw (still encoded) image bytes."""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+class PredictionCache:
+    def __init__(self, max_entries: int = 4096, ttl_seconds: float = 3600.0,
+                 disk_dir: str | Path | None = None, namespace: str | None = None):
+        self.max_entries = max_entries
+        self.ttl         = ttl_seconds
+        self.namespace   = namespace
+        self.disk_dir    = None
+        if disk_dir:
+            self.disk_dir = Path(disk_dir) / namespace if namespace else Path(disk_dir)
+        self.run_id: str | None = None
+        self._mem: OrderedDict[str, tuple[float, object]] = OrderedDict()
+        self._lock = threading.Lock()
+        # counters
+        self.hits = self.disk_hits = self.misses = self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    # ─────────────────────────── run binding ─────────────────────────
+    def bind_run(self, run_id: str):
+        if run_id == self.run_id:
+            return
+        with self._lock:
+            self._mem.clear()
+            self.run_id = run_id
+        if self.disk_dir and self.disk_dir.is_dir():
+            for old in self.disk_dir.iterdir():
+                if old.is_dir() and old.name != run_id:
+                    shutil.rmtree(old, ignore_errors=True)
+
+    def _disk_path(self, key: str) -> Path:
+        return self.disk_dir / self.run_id / key[:2] / f"{key}.json"
+
+    # ─────────────────────────── get / put ───────────────────────────
+    def get(self, key: str):
+        if not self.enabled:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            entry = self._mem.get(key)
+            if entry is not None:
+                if now - entry[0] <= self.ttl:
+                    self._mem.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._mem[key]
+
+        if self.disk_dir and self.run_id:
+            path = self._disk_path(key)
+            try:
+                if time.time() - path.stat().st_mtime <= self.ttl:
+                    value = json.loads(path.read_text())
+                    self._remember(key, value, now)
+                    self.disk_hits += 1
+                    return value
+                path.unlink(missing_ok=True)
+            except (OSError, ValueError):
+                pass
+
+        self.misses += 1
+        return None
+
+    def put(self, key: str, value):
+        if not self.enabled:
+            return
+        self._remember(key, value, time.monotonic())
+        if self.disk_dir and self.run_id:
+            path = self._disk_path(key)
+            try:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = path.with_suffix(".tmp")
+                tmp.write_text(json.dumps(value, ensure_ascii=False))
+                os.replace(tmp, path)                 # atomic for other workers
+            except OSError:
+                pass
+
+    def _remember(self, key, value, now):
+        with self._lock:
+            self._mem[key] = (now, value)
+            self._mem.move_to_end(key)
+            while len(self._mem) > self.max_entries:
+                self._mem.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "namespace": self.namespace,
+            "run_id":    self.run_id,
+            "entries":   len(self._mem),
+            "hits":      self.hits,
+            "disk_hits": self.disk_hits,
+            "misses":    self.misses,
+            "evictions": self.evictions,
+            "hit_rate":  round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+        }
+
+
+def from_env(namespace: str | None = None) -> PredictionCache:
+    return PredictionCache(
+        max_entries=int(os.getenv("PREDICTION_CACHE_SIZE", 4096)),
+        ttl_seconds=float(os.getenv("PREDICTION_CACHE_TTL", 3600)),
+        disk_dir=os.getenv("PREDICTION_CACHE_DIR") or None,
+        namespace=namespace,
+    )
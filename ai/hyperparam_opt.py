@@ -48,10 +48,12 @@ def objective(trial: optuna.Trial) -> float:
         "WD_HEAD":  str(wd_head),
         "WD_FINE":  str(wd_fine),
         "DROPOUT":  str(dropout),
-        # DataLoader housekeeping (optional)
-        "NUM_WORKERS": "0",
-        "PIN_MEMORY":  "0",
+        # trials only need metrics.json – skip TorchScript/INT8/ONNX export
+        "EXPORT_RUNTIMES": "0",
     }
+    # DataLoader workers / pinning: sized from the host by utils/loaders.py
+    # inside train_model.py; NUM_WORKERS, PIN_MEMORY, … set for the search
+    # itself are inherited through os.environ and still take effect.
 
     try:
         subprocess.run(cmd, env=env, check=True,
@@ -8,26 +8,42 @@ WildLens – footprint inference helper
 
 The script looks for the *latest* run in ai/runs/, reconstructs the model
 and returns the predicted class + confidence.
+
+Long-lived callers (the Django workers) go through the module-level
+``registry``: each run is loaded once per process and kept warm; the latest
+run is re-scanned at most every MODEL_RESCAN_SECONDS, or immediately via
+``registry.reload()``. The registry serves the runtime chosen by
+INFERENCE_BACKEND (see ``ai/runtimes.py``).
+
+Registry-backed calls consult ``prediction_cache`` first (content hash of the
+encoded image + run-id, see ``ai/cache.py``); it is emptied whenever a newer
+run becomes the latest.
 """
 
 from __future__ import annotations
 from pathlib import Path
-import argparse, json
-import torch, torchvision
-from torchvision import transforms
-from torch import nn
-from PIL import Image
+from concurrent.futures import ThreadPoolExecutor
+import argparse, io, json, logging, os, threading, time
+import torch
+from PIL import UnidentifiedImageError
+
+try:
+    from ai.preprocess import StageTimer, preprocess, new_batch
+    from ai.runtimes import BACKEND, load_backend, load_labels, split_model_path
+    from ai import cache as _cache
+except ImportError:                      # executed as ``python ai/predict.py``
+    from preprocess import StageTimer, preprocess, new_batch
+    from runtimes import BACKEND, load_backend, load_labels, split_model_path
+    import cache as _cache
+
+log = logging.getLogger(__name__)
 
 # ───────────────────────── configuration ─────────────────────────
-IMG_SIZE = 224
 RUNS_DIR = Path(__file__).parent / "runs"
+RESCAN_SECONDS = float(os.getenv("MODEL_RESCAN_SECONDS", 60))
 
 # ────────────────────────── core helpers ─────────────────────────
 
-
-IMNET_MEAN = (0.485, 0.456, 0.406)
-IMNET_STD  = (0.229, 0.224, 0.225)
-
 def _latest_run() -> Path:
     runs = [p for p in RUNS_DIR.iterdir() if p.is_dir()]
     if not runs:
@@ -35,52 +51,232 @@ def _latest_run() -> Path:
     # run-id starts with YYYYMMDD-HHMMSS so lexicographic max == newest
     return max(runs, key=lambda p: p.name)
 
-def load_model(device: str | torch.device = "cpu"):
-    run_dir = _latest_run()
-    labels  = json.loads((run_dir / "labels.json").read_text())
-    n_cls   = len(labels)
-
-    # ---------- read checkpoint --------------------
-    wrapper = torch.load(run_dir / "model.pt", map_location=device)
-    state   = wrapper["state_dict"] if "state_dict" in wrapper else wrapper
-
-    # ---------- decide which head architecture was used ----
-    has_seq_head = any(k.startswith("fc.1.") for k in state.keys())
-
-    base = torchvision.models.resnet18(weights=None)
-    if has_seq_head:
-        base.fc = nn.Sequential(
-            nn.Dropout(p=0.0),
-            nn.Linear(base.fc.in_features, n_cls)
-        )
-    else:                                   # ← old single-Linear head
-        base.fc = nn.Linear(base.fc.in_features, n_cls)
-
-    base.load_state_dict(state, strict=True)
-    base.to(device).eval()
-    return base, labels
-
-_tf = transforms.Compose([
-    transforms.Resize((IMG_SIZE, IMG_SIZE)),
-    transforms.ToTensor(),    
-    transforms.Normalize(IMNET_MEAN, IMNET_STD), # training used no normalisation
-])
+def load_model(device: str | torch.device = "cpu", run_dir: Path | None = None,
+               backend: str = "eager"):
+    """Return ``(model, labels)`` for ``run_dir`` (default: the latest run) or a model file."""
+    run_dir  = run_dir or _latest_run()
+    model, _ = load_backend(run_dir, backend, device)
+    return model, load_labels(split_model_path(run_dir)[0])
+
+class ModelRegistry:
+    """
+    Process-wide cache of loaded runs, keyed by (run_dir, device).
+
+    ``get()`` returns the warm model for the latest run; the runs directory
+    is only re-scanned every ``rescan_seconds``. Superseded runs are dropped
+    so a worker never holds more than one checkpoint per device.
+    """
+
+    def __init__(self, rescan_seconds: float = RESCAN_SECONDS, backend: str = BACKEND):
+        self.rescan_seconds = rescan_seconds
+        self.backend        = backend
+        self._models: dict[tuple[Path, str], tuple] = {}
+        self._backends: dict[tuple[Path, str], str] = {}
+        self._lock       = threading.Lock()
+        self._latest     = None
+        self._scanned_at = float("-inf")
+        # metrics
+        self.hits = self.misses = self.loads = 0
+        self.load_seconds = self.last_load_seconds = 0.0
+
+    def latest_run(self) -> Path:
+        now = time.monotonic()
+        if self._latest is None or now - self._scanned_at >= self.rescan_seconds:
+            self._latest, self._scanned_at = _latest_run(), now
+        return self._latest
+
+    def get(self, device: str | torch.device = "cpu", run_dir: Path | None = None):
+        """Return ``(model, labels)``, loading the run (or model file) on first use only."""
+        run_dir = Path(run_dir) if run_dir else self.latest_run()
+        key     = (run_dir, str(device))
+        entry   = self._models.get(key)
+        if entry is not None:
+            self.hits += 1
+            return entry
+
+        with self._lock:
+            entry = self._models.get(key)          # another thread won the race
+            if entry is not None:
+                self.hits += 1
+                return entry
+            self.misses += 1
+            t0 = time.perf_counter()
+            model, chosen = load_backend(run_dir, self.backend, device)
+            entry = (model, load_labels(split_model_path(run_dir)[0]))
+            self.last_load_seconds = time.perf_counter() - t0
+            self.load_seconds     += self.last_load_seconds
+            self.loads            += 1
+            # evict older runs on the same device
+            for old in [k for k in self._models if k[1] == key[1]]:
+                del self._models[old]
+                self._backends.pop(old, None)
+            self._models[key]   = entry
+            self._backends[key] = chosen
+        return entry
+
+    def reload(self) -> Path:
+        """Re-scan ai/runs/ now (call after a training job finishes)."""
+        with self._lock:
+            self._latest, self._scanned_at = _latest_run(), time.monotonic()
+        return self._latest
+
+    def stats(self) -> dict:
+        return {
+            "current_run":       self._latest.name if self._latest else None,
+            "loaded":            [f"{r.name if r.is_dir() else r.parent.name + '/' + r.name}"
+                                  f"@{d}:{self._backends[(r, d)]}" for r, d in self._models],
+            "hits":              self.hits,
+            "misses":            self.misses,
+            "loads":             self.loads,
+            "load_seconds":      round(self.load_seconds, 4),
+            "last_load_seconds": round(self.last_load_seconds, 4),
+        }
+
+registry = ModelRegistry()
+
+# per-stage preprocessing latency of this process (open/decode/resize/normalize)
+timings = StageTimer()
+
+# results of registry-backed predictions, keyed by image content + run-id;
+# [label, conf] values → own namespace next to the FastAPI service's dicts
+prediction_cache = _cache.from_env("predict")
+
+def _model_device(model) -> torch.device:
+    # frozen TorchScript / ONNX runtimes may expose no parameters
+    params = getattr(model, "parameters", None)
+    p = next(params(), None) if params else None
+    return p.device if p is not None else torch.device("cpu")
+
+def _image_source(src):
+    """
+    Normalise what callers hand us into something ``Image.open`` accepts:
+    a path, raw ``bytes``/``bytearray``/``memoryview``, or a binary
+    file-like object (e.g. Django's ``UploadedFile``) – no temp files.
+    """
+    if isinstance(src, (bytes, bytearray, memoryview)):
+        return io.BytesIO(src)
+    if hasattr(src, "read"):
+        if hasattr(src, "seek"):
+            src.seek(0)
+        return src
+    return src                                  # str / Path
+
+def _raw_bytes(src) -> bytes | memoryview:
+    """The encoded image itself – what the prediction cache hashes."""
+    if isinstance(src, (bytes, bytearray, memoryview)):
+        return src
+    if hasattr(src, "read"):
+        if hasattr(src, "seek"):
+            src.seek(0)
+        return src.read()
+    return Path(src).read_bytes()
+
+def _cached_model(device):
+    """Registry model + labels, with the cache bound to the same run."""
+    device = device or ("cuda" if torch.cuda.is_available() else "cpu")
+    run    = registry.latest_run()
+    prediction_cache.bind_run(run.name)
+    model, labels = registry.get(device, run)
+    return model, labels, device
 
 @torch.inference_mode()
-def predict(img_path: str | Path, model=None, labels=None,
+def predict(img_path, model=None, labels=None,
             device: str | torch.device | None = None):
+    """
+    ``img_path`` may be a path, ``bytes``/``memoryview`` or a file-like
+    object holding an encoded image. Only calls served by the registry
+    (no explicit ``model``) are cached.
+    """
+    key = None
     if model is None or labels is None:
-        device = device or ("cuda" if torch.cuda.is_available() else "cpu")
-        model, labels = load_model(device)
+        model, labels, device = _cached_model(device)
+        if prediction_cache.enabled:
+            img_path = _raw_bytes(img_path)
+            key = _cache.digest(img_path)
+            hit = prediction_cache.get(key)
+            if hit is not None:
+                return tuple(hit)
 
-    device = next(model.parameters()).device if device is None else device
-    img = Image.open(img_path).convert("RGB")
-    tensor = _tf(img).unsqueeze(0).to(device)
+    device = _model_device(model) if device is None else device
+    tensor = preprocess(_image_source(img_path), timer=timings).unsqueeze(0).to(device)
 
     logits = model(tensor)
     probs  = torch.softmax(logits, 1)
     conf, idx = torch.max(probs, 1)
-    return labels[idx.item()], conf.item()
+    result = (labels[idx.item()], conf.item())
+    if key is not None:
+        prediction_cache.put(key, result)
+    return result
+
+def _load_tensor(src, out: torch.Tensor | None = None) -> torch.Tensor:
+    return preprocess(_image_source(src), out=out, timer=timings)
+
+@torch.inference_mode()
+def predict_batch(images, model=None, labels=None,
+                  device: str | torch.device | None = None,
+                  batch_size: int = 32, decode_workers: int = 4):
+    """
+    Classify many images (paths, bytes or file-like objects) in batched forward
+    passes. Images are decoded concurrently – PIL releases the GIL while
+    decoding. Returns ``[(label, confidence) | None, …]`` in input order;
+    ``None`` marks an image that could not be decoded. Registry-backed calls
+    answer cached images without decoding them.
+    """
+    images  = list(images)
+    results = [None] * len(images)
+    if model is None or labels is None:
+        model, labels, device = _cached_model(device)
+        if prediction_cache.enabled:
+            todo, keys = [], {}
+            for i, src in enumerate(images):
+                try:
+                    raw = _raw_bytes(src)
+                except OSError:
+                    continue                            # unreadable → None
+                keys[i] = _cache.digest(raw)
+                hit = prediction_cache.get(keys[i])
+                if hit is not None:
+                    results[i] = tuple(hit)
+                else:
+                    todo.append((i, raw))
+            if not todo:
+                return results
+            positions, images = zip(*todo)
+            misses = predict_batch(images, model, labels, device,
+                                   batch_size=batch_size, decode_workers=decode_workers)
+            for i, result in zip(positions, misses):
+                results[i] = result
+                if result is not None:
+                    prediction_cache.put(keys[i], result)
+            return results
+
+    device  = _model_device(model) if device is None else device
+
+    with ThreadPoolExecutor(max_workers=decode_workers) as pool:
+        for start in range(0, len(images), batch_size):
+            chunk = images[start:start + batch_size]
+            buf   = new_batch(len(chunk))          # decoded straight into place
+
+            def _safe_load(i):
+                try:
+                    # inference mode is thread-local; ``buf`` is an inference tensor
+                    with torch.inference_mode():
+                        _load_tensor(chunk[i], out=buf[i])
+                    return True
+                except (UnidentifiedImageError, OSError, ValueError) as exc:
+                    log.warning("predict_batch: cannot decode image %d: %s", start + i, exc)
+                    return False
+
+            ok = [i for i, good in zip(range(len(chunk)),
+                                       pool.map(_safe_load, range(len(chunk)))) if good]
+            if not ok:
+                continue
+            xb    = (buf if len(ok) == len(chunk) else buf[ok]).to(device)
+            probs = torch.softmax(model(xb), 1)
+            conf, idx = torch.max(probs, 1)
+            for i, c, k in zip(ok, conf.tolist(), idx.tolist()):
+                results[start + i] = (labels[k], c)
+    return results
 
 # ───────────────────────────── CLI ───────────────────────────────
 def _cli():
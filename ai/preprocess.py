@@ -0,0 +1,106 @@
+"""
+WildLens – inference-time image preprocessing
+=============================================
+
+One code path for ``ai/predict.py`` and the FastAPI service:
+
+    open      – read the header; for JPEGs ask libjpeg for a *draft* decode,
+                i.e. DCT-domain downscaling by 1/2, 1/4 or 1/8 so a 12 MP
+                photo is decoded at ~500 px instead of 4000 px
+    decode    – the (reduced) pixel decode + RGB conversion
+    resize    – ``Resize((224, 224))`` exactly as in ``train_model.py``
+                (PIL bilinear with antialiasing, uses Pillow's SIMD paths)
+    normalize – uint8 HWC → float CHW written into a caller-provided buffer,
+                with ToTensor's /255 and ImageNet Normalize fused into a
+                single multiply-add
+
+Set ``PREPROCESS_DRAFT=0`` to force full-resolution decoding (bit-for-bit
+identical to the training transform).
+"""
+
+from __future__ import annotations
+import os, threading, time
+
+import numpy as np
+import torch
+from PIL import Image
+
+IMG_SIZE   = 224
+IMNET_MEAN = (0.485, 0.456, 0.406)
+IMNET_STD  = (0.229, 0.224, 0.225)
+USE_DRAFT  = os.getenv("PREPROCESS_DRAFT", "1") != "0"
+
+# x_norm = (u8 / 255 - mean) / std  ==  u8 * _SCALE + _SHIFT
+_SCALE = (1.0 / (255.0 * torch.tensor(IMNET_STD))).view(3, 1, 1)
+_SHIFT = (-torch.tensor(IMNET_MEAN) / torch.tensor(IMNET_STD)).view(3, 1, 1)
+
+STAGES = ("open", "decode", "resize", "normalize")
+
+
+class StageTimer:
+    """Accumulates wall-time per preprocessing stage (thread-safe)."""
+
+    def __init__(self):
+        self._lock   = threading.Lock()
+        self.total_s = dict.fromkeys(STAGES, 0.0)
+        self.images  = 0
+
+    def add(self, spans: dict):
+        with self._lock:
+            for k, v in spans.items():
+                self.total_s[k] += v
+            self.images += 1
+
+    def stats(self) -> dict:
+        n = self.images or 1
+        return {"images": self.images,
+                **{f"{k}_ms_mean": round(1000 * v / n, 3)
+                   for k, v in self.total_s.items()}}
+
+
+def load_resized(src, size: int = IMG_SIZE, spans: dict | None = None) -> Image.Image:
+    """Open ``src`` and return an RGB ``size × size`` PIL image."""
+    t0  = time.perf_counter()
+    img = Image.open(src)
+    if USE_DRAFT and img.format == "JPEG":
+        # keeps both sides >= size, so the final resize still down-samples
+        img.draft("RGB", (size, size))
+    t1  = time.perf_counter()
+    img = img.convert("RGB")
+    t2  = time.perf_counter()
+    if img.size != (size, size):
+        img = img.resize((size, size), Image.BILINEAR)
+    t3  = time.perf_counter()
+    if spans is not None:
+        spans.update(open=t1 - t0, decode=t2 - t1, resize=t3 - t2)
+    return img
+
+
+def to_tensor(img: Image.Image, out: torch.Tensor | None = None) -> torch.Tensor:
+    """
+    uint8 RGB image → normalised float ``[3, H, W]``.
+    Writes into ``out`` (e.g. one slot of a preallocated batch) if given.
+    """
+    u8 = torch.from_numpy(np.array(img, dtype=np.uint8)).permute(2, 0, 1)
+    if out is None:
+        out = torch.empty(u8.shape, dtype=torch.float32)
+    out.copy_(u8)                                   # uint8 → float32
+    return torch.addcmul(_SHIFT, out, _SCALE, out=out)
+
+
+def preprocess(src, out: torch.Tensor | None = None,
+               timer: StageTimer | None = None, size: int = IMG_SIZE) -> torch.Tensor:
+    """Path / file-like → model-ready ``[3, size, size]`` float tensor."""
+    spans = {} if timer is not None else None
+    img = load_resized(src, size, spans)
+    t0  = time.perf_counter()
+    out = to_tensor(img, out)
+    if timer is not None:
+        spans["normalize"] = time.perf_counter() - t0
+        timer.add(spans)
+    return out
+
+
+def new_batch(n: int, size: int = IMG_SIZE) -> torch.Tensor:
+    """Preallocated ``[n, 3, size, size]`` buffer for ``preprocess(out=…)``."""
+    return torch.empty((n, 3, size, size), dtype=torch.float32)
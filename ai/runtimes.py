@@ -0,0 +1,390 @@
+"""
+WildLens – accelerated inference runtimes
+=========================================
+
+``train_model.py`` writes, next to ``model.pt``:
+
+    model.ts          TorchScript, frozen (optimize_for_inference on load)
+    model.int8.ts     static INT8 (FX graph mode, calibrated on val images)
+    model.dyn8.ts     dynamic INT8 (Linear layers only)
+    model.onnx        ONNX (only when the ``onnx`` package is installed)
+    runtimes.json     accuracy parity on the val split + latency per backend,
+                      and the ``auto`` choice made from them
+    runtimes.<host>.json  the ``auto`` choice re-timed on a serving host
+
+At serving time ``load_backend()`` returns a callable ``model(x) -> logits``
+for the backend named by ``INFERENCE_BACKEND``:
+
+    eager | torchscript | int8 | int8_dynamic | onnx | auto (default)
+
+``auto`` serves the fastest variant whose agreement with the eager model
+on the val split (recorded at export) is at least RUNTIME_MIN_AGREEMENT.
+Export latencies belong to the training host, so the parity-passing
+variants are re-timed once per serving host – keyed by CPU model + flags –
+and the pick is cached in ``runtimes.<host>.json``; later loads on that
+host only read it (RUNTIME_HOST_BENCH=0 keeps the export choice). A variant
+without a parity record is never picked by ``auto``. Quantized and ONNX
+backends are CPU-only.
+
+``load_backend()`` also takes a model *file* instead of a run directory:
+a file other than the run's ``model.pt`` (custom name, ``.ts``, ``.onnx``,
+TorchScript saved as ``.pt``) is served as-is.
+"""
+
+from __future__ import annotations
+from pathlib import Path
+import hashlib, inspect, json, os, platform, time, warnings, zipfile
+
+import torch, torchvision
+from torch import nn
+
+BACKEND       = os.getenv("INFERENCE_BACKEND", "auto")
+MIN_AGREEMENT = float(os.getenv("RUNTIME_MIN_AGREEMENT", 0.99))   # vs eager, val split
+HOST_BENCH    = os.getenv("RUNTIME_HOST_BENCH", "1") != "0"
+
+FILES = {
+    "eager":        "model.pt",
+    "torchscript":  "model.ts",
+    "int8":         "model.int8.ts",
+    "int8_dynamic": "model.dyn8.ts",
+    "onnx":         "model.onnx",
+}
+CPU_ONLY = {"int8", "int8_dynamic", "onnx"}
+
+
+# ─────────────────────────── loading ────────────────────────────
+def load_labels(run_dir: Path) -> list[str]:
+    labels_file = Path(run_dir) / "labels.json"
+    if labels_file.exists():
+        return json.loads(labels_file.read_text())
+    return [c for c in os.getenv("CLASSES", "").split(",") if c]
+
+
+def split_model_path(path: Path) -> tuple[Path, Path | None]:
+    """run dir or model file → (run dir, explicit file or None for the run's model.pt)."""
+    path = Path(path)
+    if path.is_dir():
+        return path, None
+    return path.parent, (None if path.name == FILES["eager"] else path)
+
+
+def _is_torchscript(path: Path) -> bool:
+    try:
+        with zipfile.ZipFile(path) as zf:
+            return any(n.endswith("constants.pkl") for n in zf.namelist())
+    except (OSError, zipfile.BadZipFile):
+        return False
+
+
+def load_eager(run_dir: Path, device: str | torch.device = "cpu", n_classes: int | None = None):
+    """Rebuild the torchvision ResNet-18 from ``model.pt`` (or the given checkpoint file)."""
+    run_dir, file = split_model_path(run_dir)
+    path = file or run_dir / FILES["eager"]
+    if _is_torchscript(path):                          # TorchScript saved as .pt
+        return torch.jit.load(str(path), map_location=device).eval()
+    ckpt = torch.load(path, map_location=device)
+
+    state    = ckpt["state_dict"] if "state_dict" in ckpt else ckpt
+    n_cls    = n_classes or len(ckpt.get("classes") or load_labels(run_dir))
+
+    # ---------- decide which head architecture was used ----
+    has_seq_head = any(k.startswith("fc.1.") for k in state.keys())
+
+    base = torchvision.models.resnet18(weights=None)
+    if has_seq_head:
+        base.fc = nn.Sequential(
+            nn.Dropout(p=0.0),
+            nn.Linear(base.fc.in_features, n_cls)
+        )
+    else:                                   # ← old single-Linear head
+        base.fc = nn.Linear(base.fc.in_features, n_cls)
+
+    base.load_state_dict(state, strict=True)
+    return base.to(device).eval()
+
+
+class OnnxModel:
+    """Wraps an onnxruntime session so it can be called like a module."""
+
+    def __init__(self, path: Path):
+        import onnxruntime as ort                     # optional dependency
+        opts = ort.SessionOptions()
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(str(path), opts,
+                                            providers=["CPUExecutionProvider"])
+        self.input   = self.session.get_inputs()[0].name
+
+    def __call__(self, x: torch.Tensor) -> torch.Tensor:
+        out = self.session.run(None, {self.input: x.detach().cpu().numpy()})[0]
+        return torch.from_numpy(out)
+
+    def eval(self):
+        return self
+
+
+def available_backends(run_dir: Path, device: str | torch.device = "cpu") -> list[str]:
+    out = []
+    for name, fname in FILES.items():
+        if not (Path(run_dir) / fname).exists():
+            continue
+        if name in CPU_ONLY and torch.device(device).type != "cpu":
+            continue
+        if name == "onnx":
+            try:
+                import onnxruntime  # noqa: F401
+            except ImportError:
+                continue
+        out.append(name)
+    return out
+
+
+def _load_one(run_dir: Path, backend: str, device):
+    path = Path(run_dir) / FILES[backend]
+    if backend == "eager":
+        return load_eager(run_dir, device)
+    if backend == "onnx":
+        return OnnxModel(path)
+    ts = torch.jit.load(str(path), map_location=device).eval()
+    if backend == "torchscript":
+        ts = torch.jit.optimize_for_inference(ts)       # conv/bn fusion, MKL-DNN
+    return ts
+
+
+def _load_file(path: Path, device):
+    """An explicit model file, by suffix → (model, backend name)."""
+    if path.suffix == ".onnx":
+        return OnnxModel(path), "onnx"
+    if path.suffix == ".ts":
+        ts = torch.jit.load(str(path), map_location=device).eval()
+        return torch.jit.optimize_for_inference(ts), "torchscript"
+    return load_eager(path, device), "eager"
+
+
+@torch.inference_mode()
+def _latency_ms(model, batch: int, iters: int = 3) -> float:
+    x = torch.randn(batch, 3, 224, 224)
+    model(x)                                                     # warm-up
+    t0 = time.perf_counter()
+    for _ in range(iters):
+        model(x)
+    return (time.perf_counter() - t0) / iters * 1000
+
+
+def read_table(run_dir: Path) -> dict:
+    """runtimes.json → {"backends": {name: row}, "auto": name | None}."""
+    try:
+        data = json.loads((Path(run_dir) / "runtimes.json").read_text())
+    except (OSError, ValueError):
+        return {"backends": {}, "auto": None}
+    if "backends" not in data:                       # older runs: the bare table
+        data = {"backends": data, "auto": None}
+    return data
+
+
+def parity_ok(table: dict, candidates: list[str],
+              min_agreement: float = MIN_AGREEMENT) -> list[str]:
+    """Candidates that kept parity with eager on the val split (eager always does)."""
+    rows = table.get("backends", {})
+    return [n for n in candidates if n == "eager"
+            or rows.get(n, {}).get("agreement", 0.0) >= min_agreement]
+
+
+def choose_auto(table: dict, candidates: list[str],
+                min_agreement: float = MIN_AGREEMENT) -> str:
+    """Fastest candidate (batch 8) that kept parity with eager; eager otherwise."""
+    rows = table.get("backends", {})
+    ok = parity_ok(table, candidates, min_agreement)
+    if table.get("auto") in ok:
+        return table["auto"]
+    timed = [n for n in ok if "latency_ms_b8" in rows.get(n, {})]
+    if not timed:
+        return "eager"
+    return min(timed, key=lambda n: rows[n]["latency_ms_b8"])
+
+
+def host_key(device: str | torch.device = "cpu") -> str:
+    """Short id of this host's CPU (model name + ISA flags) and the device type."""
+    cpu = {}
+    try:
+        for line in Path("/proc/cpuinfo").read_text().splitlines():
+            key, _, value = line.partition(":")
+            key = key.strip()
+            if key in ("model name", "flags", "Features", "CPU part") and key not in cpu:
+                cpu[key] = value.strip()
+    except OSError:
+        pass
+    ident = f"{cpu or platform.processor() or platform.machine()}|{torch.device(device).type}"
+    return hashlib.blake2b(ident.encode(), digest_size=6).hexdigest()
+
+
+def host_choice(run_dir: Path, candidates: list[str],
+                device: str | torch.device = "cpu",
+                min_agreement: float = MIN_AGREEMENT) -> str:
+    """
+    ``auto`` for this host: the parity-passing variants timed here (batch 8),
+    once – the pick is cached next to runtimes.json. Falls back to the
+    export choice when there is nothing to compare or timing fails.
+    """
+    table = read_table(run_dir)
+    ok    = parity_ok(table, candidates, min_agreement)
+    if len(ok) < 2:
+        return choose_auto(table, candidates, min_agreement)
+
+    path = Path(run_dir) / f"runtimes.{host_key(device)}.json"
+    try:
+        cached = json.loads(path.read_text())
+        if sorted(cached["latency_ms_b8"]) == sorted(ok) and cached["auto"] in ok:
+            return cached["auto"]
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+
+    timed = {}
+    for name in ok:
+        try:
+            timed[name] = round(_latency_ms(_load_one(run_dir, name, device), 8), 2)
+        except Exception as exc:
+            warnings.warn(f"[runtimes] timing {name} failed: {exc}")
+    if not timed:
+        return choose_auto(table, candidates, min_agreement)
+    auto = min(timed, key=timed.get)
+    try:                                               # read-only model dir: re-time next load
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"auto": auto, "latency_ms_b8": timed,
+                                   "min_agreement": min_agreement}, indent=2))
+        os.replace(tmp, path)
+    except OSError:
+        pass
+    return auto
+
+
+def load_backend(run_dir: Path, backend: str = BACKEND,
+                 device: str | torch.device = "cpu"):
+    """
+    Return ``(model, backend_name)``. ``auto`` serves the parity-passing
+    variant that is fastest on this host (``host_choice``); an unavailable
+    explicit choice falls back to eager with a warning. ``run_dir`` may
+    also be a model file.
+    """
+    run_dir, file = split_model_path(run_dir)
+    if file is not None:
+        model, name = _load_file(file, device)
+        if backend not in ("auto", name):
+            warnings.warn(f"[runtimes] {file.name} is served as {name}, not {backend!r}")
+        return model, name
+
+    candidates = available_backends(run_dir, device)
+    if backend == "auto":
+        backend = (host_choice(run_dir, candidates, device) if HOST_BENCH
+                   else choose_auto(read_table(run_dir), candidates))
+    if backend not in candidates:
+        warnings.warn(f"[runtimes] backend {backend!r} unavailable for "
+                      f"{Path(run_dir).name} – using eager")
+        return load_eager(run_dir, device), "eager"
+    try:
+        return _load_one(run_dir, backend, device), backend
+    except Exception as exc:
+        if backend == "eager":
+            raise
+        warnings.warn(f"[runtimes] {backend} failed to load: {exc} – using eager")
+        return load_eager(run_dir, device), "eager"
+
+
+# ─────────────────────────── export ─────────────────────────────
+def _export_torchscript(model, example, path):
+    # optimize_for_inference() graphs don't survive jit.save → applied on load
+    torch.jit.save(torch.jit.freeze(torch.jit.trace(model, example)), str(path))
+
+
+def _export_int8_static(model, example, path, calib_loader, calib_batches=8):
+    from torch.ao.quantization import get_default_qconfig_mapping
+    from torch.ao.quantization.quantize_fx import prepare_fx, convert_fx
+    import copy
+
+    prepared = prepare_fx(copy.deepcopy(model), get_default_qconfig_mapping("x86"), (example,))
+    with torch.inference_mode():
+        if calib_loader is None:
+            prepared(example)
+        else:
+            for i, (xb, _) in enumerate(calib_loader):
+                prepared(xb)
+                if i + 1 >= calib_batches:
+                    break
+    quant = convert_fx(prepared)
+    torch.jit.save(torch.jit.freeze(torch.jit.trace(quant, example)), str(path))
+
+
+def _export_int8_dynamic(model, example, path):
+    from torch.ao.quantization import quantize_dynamic
+    quant = quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
+    torch.jit.save(torch.jit.freeze(torch.jit.trace(quant, example)), str(path))
+
+
+def _export_onnx(model, example, path):
+    kwargs = {}
+    if "dynamo" in inspect.signature(torch.onnx.export).parameters:
+        kwargs["dynamo"] = False                  # TorchScript exporter, no onnxscript
+    torch.onnx.export(model, example, str(path),
+                      input_names=["input"], output_names=["logits"],
+                      dynamic_axes={"input": {0: "batch"}, "logits": {0: "batch"}},
+                      **kwargs)
+
+
+@torch.inference_mode()
+def _predictions(model, loader):
+    y_true, y_pred = [], []
+    for xb, yb in loader:
+        y_pred.append(model(xb).argmax(1).cpu())
+        y_true.append(yb)
+    return torch.cat(y_true), torch.cat(y_pred)
+
+
+def export_variants(model: nn.Module, run_dir: Path, val_loader=None) -> dict:
+    """
+    Write every runtime variant of ``model`` into ``run_dir`` and, when a
+    validation loader is given, a parity + latency table plus the ``auto``
+    choice to runtimes.json. A variant that fails to export is skipped with
+    a warning.
+    """
+    from sklearn.metrics import f1_score
+
+    model   = model.cpu().eval()
+    example = torch.randn(1, 3, 224, 224)
+    exporters = {
+        "torchscript":  lambda p: _export_torchscript(model, example, p),
+        "int8":         lambda p: _export_int8_static(model, example, p, val_loader),
+        "int8_dynamic": lambda p: _export_int8_dynamic(model, example, p),
+        "onnx":         lambda p: _export_onnx(model, example, p),
+    }
+    for name, export in exporters.items():
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                export(Path(run_dir) / FILES[name])
+        except Exception as exc:
+            (Path(run_dir) / FILES[name]).unlink(missing_ok=True)
+            print(f"[WARN] export {name} skipped – {exc}")
+
+    table = {}
+    if val_loader is not None:
+        y_true, ref = _predictions(model, val_loader)
+        for name in available_backends(run_dir):
+            m = model if name == "eager" else _load_one(run_dir, name, "cpu")
+            _, pred = _predictions(m, val_loader)
+            table[name] = {
+                "accuracy":     round((pred == y_true).float().mean().item(), 4),
+                "macro_f1":     round(f1_score(y_true, pred, average="macro"), 4),
+                "agreement":    round((pred == ref).float().mean().item(), 4),
+                "latency_ms_b1": round(_latency_ms(m, 1), 2),
+                "latency_ms_b8": round(_latency_ms(m, 8), 2),
+            }
+        auto = choose_auto({"backends": table}, list(table))
+        (Path(run_dir) / "runtimes.json").write_text(json.dumps(
+            {"backends": table, "auto": auto, "min_agreement": MIN_AGREEMENT}, indent=2))
+
+        print(f"{'backend':<13} {'acc':>6} {'F1':>6} {'agree':>6} {'b1 ms':>8} {'b8 ms':>8}")
+        for name, row in table.items():
+            print(f"{name:<13} {row['accuracy']:>6.3f} {row['macro_f1']:>6.3f} "
+                  f"{row['agreement']:>6.3f} {row['latency_ms_b1']:>8.1f} "
+                  f"{row['latency_ms_b8']:>8.1f}")
+        print(f"auto → {auto} (agreement ≥ {MIN_AGREEMENT})")
+    return table
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+WildLens – pre-fork worker pool for the AI service
+==================================================
+
+  $ python -m ai.serve --workers 4 --port 8001
+
+The parent process
+
+  1. pins torch to ONE intra-op thread (so no OpenMP pool exists at fork time),
+  2. binds the listening socket,
+  3. imports ``api.app`` – i.e. loads the model once – and moves its weights
+     into shared memory (``Module.share_memory()``),
+  4. forks N workers that all ``accept()`` on the inherited socket.
+
+Workers therefore map the same physical weight pages instead of each
+holding its own ~45 MB copy. Every worker then sets its own intra-op thread
+count to ``cores // workers`` so N workers never oversubscribe the CPU.
+A worker that dies is re-forked from the (still warm) parent.
+
+Env overrides: AI_WORKERS, AI_THREADS_PER_WORKER, PORT.
+CUDA cannot survive a fork – on GPU hosts a single worker is started.
+"""
+
+from __future__ import annotations
+import argparse, os, signal, socket, sys, time, traceback
+
+import torch
+
+
+def _cpu_count() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:                       # macOS / Windows
+        return os.cpu_count() or 1
+
+
+def _bind(host: str, port: int, backlog: int = 2048) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _share_weights(model) -> int:
+    """Move parameters/buffers into shared memory; returns bytes shared."""
+    if not isinstance(model, torch.nn.Module):
+        return 0                                 # ONNX session: COW only
+    model.share_memory()
+    return sum(t.numel() * t.element_size()
+               for t in list(model.parameters()) + list(model.buffers()))
+
+
+def _run_worker(sock: socket.socket, threads: int, log_level: str):
+    import uvicorn
+    from api.app import app
+
+    torch.set_num_threads(threads)
+    config = uvicorn.Config(app, log_level=log_level, lifespan="on")
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def main():
+    cpus = _cpu_count()
+    ap = argparse.ArgumentParser("WildLens AI pre-fork server")
+    ap.add_argument("--host", default="0.0.0.0")
+    ap.add_argument("--port", type=int, default=int(os.getenv("PORT", 8001)))
+    ap.add_argument("--workers", type=int,
+                    default=int(os.getenv("AI_WORKERS", max(1, cpus // 2))))
+    ap.add_argument("--threads-per-worker", type=int,
+                    default=int(os.getenv("AI_THREADS_PER_WORKER", 0)),
+                    help="intra-op threads per worker (0 = cores // workers)")
+    ap.add_argument("--log-level", default="info")
+    args = ap.parse_args()
+
+    # 1. no OpenMP thread pool may exist when we fork
+    torch.set_num_threads(1)
+
+    # 2. + 3. socket, model, shared weights
+    sock = _bind(args.host, args.port)
+    import api.app as ai_app
+    shared = _share_weights(ai_app.model)
+
+    workers = args.workers
+    if ai_app.DEVICE.type == "cuda" and workers > 1:
+        print("[serve] CUDA device – forking is unsafe, using 1 worker")
+        workers = 1
+    threads = args.threads_per_worker or max(1, cpus // workers)
+    print(f"[serve] {workers} workers × {threads} threads on {cpus} cores, "
+          f"{shared / 2**20:.1f} MB of weights shared", flush=True)
+
+    children: dict[int, tuple[int, float]] = {}      # pid → (slot, started)
+
+    def spawn(slot: int):
+        pid = os.fork()
+        if pid == 0:                            # ── child ──
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            code = 0
+            try:
+                _run_worker(sock, threads, args.log_level)
+            except BaseException:
+                traceback.print_exc()
+                code = 1
+            finally:
+                sys.stdout.flush(); sys.stderr.flush()
+                os._exit(code)
+        children[pid] = (slot, time.monotonic())
+
+    stopping = False
+
+    def stop(signum, _frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    for slot in range(workers):
+        spawn(slot)
+
+    # 4. supervise: re-fork crashed workers until asked to stop
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        slot, started = children.pop(pid, (None, 0.0))
+        if slot is None or stopping:
+            continue
+        if time.monotonic() - started < 5.0:
+            # dies during start-up → restarting would only crash-loop
+            print(f"[serve] worker {pid} failed at start-up ({status}) – exiting", flush=True)
+            stop(signal.SIGTERM, None)
+            continue
+        print(f"[serve] worker {pid} exited ({status}) – restarting", flush=True)
+        time.sleep(0.5)
+        spawn(slot)
+    sock.close()
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+import asyncio
+import torch
+from ai.batching import MicroBatcher
+
+
+class _Identity(torch.nn.Module):
+    """Returns the flattened input as logits so results are easy to check."""
+    def forward(self, x):
+        return x.flatten(1)
+
+
+def test_concurrent_requests_share_one_batch():
+    async def run():
+        batcher = MicroBatcher(_Identity(), max_batch_size=4, max_wait_ms=50)
+        await batcher.start()
+        xs = [torch.full((1, 1, 2), float(i)) for i in range(4)]
+        outs = await asyncio.gather(*(batcher.submit(x) for x in xs))
+        stats = batcher.stats()
+        await batcher.stop()
+        return outs, stats
+
+    outs, stats = asyncio.run(run())
+    assert stats["batches"] == 1 and stats["images"] == 4
+    for out in outs:                       # softmax over two equal logits
+        assert torch.allclose(out, torch.tensor([0.5, 0.5]))
+
+
+def test_mixed_shapes_are_not_stacked_together():
+    async def run():
+        batcher = MicroBatcher(_Identity(), max_batch_size=8, max_wait_ms=50)
+        await batcher.start()
+        outs = await batcher.submit_many([torch.zeros(1, 1, 2), torch.zeros(1, 1, 3)])
+        await batcher.stop()
+        return outs
+
+    a, b = asyncio.run(run())
+    assert a.shape == (2,) and b.shape == (3,)
@@ -0,0 +1,45 @@
+from ai.cache import PredictionCache, digest
+
+
+def test_lru_eviction_and_counters():
+    cache = PredictionCache(max_entries=2)
+    cache.bind_run("run-a")
+    for name in ("a", "b", "c"):
+        cache.put(digest(name.encode()), [name, 0.9])
+
+    assert cache.get(digest(b"a")) is None               # evicted (oldest)
+    assert cache.get(digest(b"c")) == ["c", 0.9]
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 1 and stats["evictions"] == 1
+
+
+def test_new_run_invalidates_memory_and_disk(tmp_path):
+    cache = PredictionCache(max_entries=8, disk_dir=tmp_path)
+    cache.bind_run("run-a")
+    key = digest(b"photo")
+    cache.put(key, ["Castor", 0.8])
+
+    # a fresh worker on the same run is served from disk
+    other = PredictionCache(max_entries=8, disk_dir=tmp_path)
+    other.bind_run("run-a")
+    assert other.get(key) == ["Castor", 0.8] and other.disk_hits == 1
+
+    other.bind_run("run-b")
+    assert other.get(key) is None
+    assert not (tmp_path / "run-a").exists()
+
+
+def test_namespaces_share_disk_dir_without_mixing(tmp_path):
+    api, lib = (PredictionCache(max_entries=8, disk_dir=tmp_path, namespace=ns) for ns in ("api", "predict"))
+    for c in (api, lib):
+        c.bind_run("run-a")
+    key = digest(b"photo")
+    api.put(key, {"species": "Castor", "confidence": 0.8})
+    lib.put(key, ["Castor", 0.8])
+
+    fresh = PredictionCache(max_entries=8, disk_dir=tmp_path, namespace="api")
+    fresh.bind_run("run-a")
+    assert fresh.get(key) == {"species": "Castor", "confidence": 0.8}
+
+    lib.bind_run("run-b")                                  # only its own old runs go
+    assert (tmp_path / "api" / "run-a").exists() and not (tmp_path / "predict" / "run-a").exists()
@@ -0,0 +1,62 @@
+import os
+
+from ai.utils.dataset_cache import DatasetCache
+
+
+def _rows(stamp="2025-01-01"):
+    return [{"id": i, "updated_at": stamp, "image_url": f"http://x/{i}.jpg",
+             "image_name": f"{i}.jpg", "label": "Renard" if i % 2 else "Ours"} for i in range(4)]
+
+
+def _fake_fetch(calls):
+    def fetch(rows, store):
+        calls.append(len(rows))
+        for r in rows:
+            p = store / r["label"] / r["image_name"]
+            p.parent.mkdir(parents=True, exist_ok=True)
+            p.write_bytes(r["image_name"].encode() * 10)
+    return fetch
+
+
+def test_same_metadata_reuses_version_without_fetching(tmp_path):
+    cache, calls = DatasetCache(tmp_path), []
+    first = cache.from_rows(_rows(), _fake_fetch(calls))
+    again = cache.from_rows(_rows(), _fake_fetch(calls))
+
+    assert first == again and calls == [4]
+    img = first / "Ours" / "0.jpg"
+    assert img.read_bytes() == b"0.jpg" * 10
+    assert os.stat(img).st_ino == os.stat(tmp_path / "store" / "Ours" / "0.jpg").st_ino   # hardlink
+
+    newer = cache.from_rows(_rows("2025-02-01"), _fake_fetch(calls))
+    assert newer != first and calls == [4, 4]
+
+
+def test_eviction_by_size_keeps_newest_and_prunes_store(tmp_path):
+    cache, calls = DatasetCache(tmp_path, max_bytes=1, keep=1), []
+    old = cache.from_rows(_rows()[:2], _fake_fetch(calls))
+    new = cache.from_rows(_rows()[2:], _fake_fetch(calls))          # evicts `old`
+
+    assert not old.exists() and new.exists()
+    assert not (tmp_path / "store" / "Ours" / "0.jpg").exists()     # no longer linked
+    assert (tmp_path / "store" / "Ours" / "2.jpg").exists()
+
+
+def test_local_directory_is_linked_not_copied(tmp_path):
+    src = tmp_path / "dummy" / "Castor"
+    src.mkdir(parents=True)
+    (src / "a.jpg").write_bytes(b"jpeg")
+    cache = DatasetCache(tmp_path / "cache")
+
+    root = cache.from_dir(tmp_path / "dummy")
+    assert (root / "Castor" / "a.jpg").stat().st_ino == (src / "a.jpg").stat().st_ino
+    assert cache.from_dir(tmp_path / "dummy") == root
+
+
+def test_size_eviction_skips_versions_that_free_nothing(tmp_path):
+    cache, calls = DatasetCache(tmp_path, max_bytes=1, keep=1), []
+    subset = cache.from_rows(_rows()[:2], _fake_fetch(calls))
+    full   = cache.from_rows(_rows(), _fake_fetch(calls))           # links the same store files
+
+    assert subset.exists() and full.exists()                        # dropping `subset` frees 0 bytes
+    assert cache.evict() == {"versions": 0, "store_files": 0}
@@ -0,0 +1,100 @@
+import io, os, threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from PIL import Image
+
+from ai.utils.downloader import download, MANIFEST
+
+
+def _png(color) -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", (32, 32), color).save(buf, format="PNG")
+    return buf.getvalue()
+
+
+class _StandIn(BaseHTTPRequestHandler):
+    """Serves FILES with Range support; the first GET of /flaky answers 503."""
+    protocol_version = "HTTP/1.1"
+    files, hits, ranges, flaky_left = {}, [], [], 1
+
+    def do_GET(self):
+        cls = type(self)
+        cls.hits.append(self.path)
+        if self.path == "/flaky.png" and cls.flaky_left:
+            cls.flaky_left -= 1
+            return self._send(503, b"")
+        body = cls.files.get(self.path)
+        if body is None:
+            return self._send(404, b"")
+        rng = self.headers.get("Range")
+        if rng:
+            cls.ranges.append((self.path, rng))
+            start = int(rng.split("=")[1].rstrip("-"))
+            return self._send(206, body[start:])
+        self._send(200, body)
+
+    def _send(self, code, body):
+        self.send_response(code)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    _StandIn.files = {f"/{n}.png": _png(c) for n, c in
+                      [("fox", "red"), ("bear", "black"), ("flaky", "green")]}
+    _StandIn.hits, _StandIn.ranges, _StandIn.flaky_left = [], [], 1
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _StandIn)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{srv.server_port}"
+    srv.shutdown()
+
+
+def _rows(base):
+    return [{"image_url": f"{base}/{n}.png", "image_name": f"{n}.png", "label": label}
+            for n, label in [("fox", "Renard"), ("bear", "Ours"), ("flaky", "Renard")]]
+
+
+def test_parallel_download_retries_then_skips_unchanged(server, tmp_path):
+    report = download(_rows(server), tmp_path, workers=4, backoff=0.01)
+    assert report["downloaded"] == 3 and report["failed"] == 0 and report["retries"] == 1
+    assert (tmp_path / "Ours" / "bear.png").read_bytes() == _StandIn.files["/bear.png"]
+    assert (tmp_path / MANIFEST).exists()
+
+    _StandIn.hits.clear()
+    again = download(_rows(server), tmp_path, workers=4)
+    assert again["skipped"] == 3 and again["downloaded"] == 0
+    assert _StandIn.hits == []                          # no network, no decoding
+
+
+def test_partial_file_is_resumed_with_range(server, tmp_path):
+    body = _StandIn.files["/fox.png"]
+    (tmp_path / "Renard").mkdir()
+    (tmp_path / "Renard" / "fox.png.part").write_bytes(body[:40])
+
+    report = download(_rows(server)[:1], tmp_path, workers=1)
+    assert report["resumed"] == 1 and report["bytes"] == len(body) - 40
+    assert _StandIn.ranges == [("/fox.png", "bytes=40-")]
+    assert (tmp_path / "Renard" / "fox.png").read_bytes() == body
+    assert not (tmp_path / "Renard" / "fox.png.part").exists()
+
+
+def test_new_updated_at_refetches_same_url(server, tmp_path):
+    rows = [{**r, "id": 1, "updated_at": "2025-01-01"} for r in _rows(server)[:1]]
+    download(rows, tmp_path, workers=1)
+    old = tmp_path / "Renard" / "fox.png"
+    linked = tmp_path / "version-a.png"
+    os.link(old, linked)                                # as a dataset-cache version would
+
+    _StandIn.files["/fox.png"] = _png("blue")           # re-uploaded under the same url
+    assert download(rows, tmp_path, workers=1)["skipped"] == 1
+
+    report = download([{**rows[0], "updated_at": "2025-02-01"}], tmp_path, workers=1)
+    assert report["downloaded"] == 1
+    assert old.read_bytes() == _StandIn.files["/fox.png"]
+    assert linked.read_bytes() == _png("red")           # older dataset versions keep their bytes
@@ -0,0 +1,51 @@
+import torch
+from torch import nn
+from torch.utils.data import DataLoader, TensorDataset
+
+import ai.utils.fast_train as ft
+
+
+def _net():
+    return nn.Sequential(nn.Conv2d(3, 4, 3), nn.AdaptiveAvgPool2d(1), nn.Flatten(), nn.Linear(4, 2))
+
+
+def test_disabled_mode_is_plain_fp32():
+    fast  = ft.FastTrain(False)
+    model = fast.prepare(_net())
+    xb    = torch.randn(2, 3, 8, 8)
+    with fast.autocast():
+        out = fast.forward(fast.inputs(xb))
+    assert out.dtype == torch.float32 and fast.inputs(xb) is xb
+    assert fast.inference_agreement(model, [], 2) == {} and not fast.info()["fused_optimizer"]
+
+
+def test_enabled_mode_bf16_channels_last_and_inference_agreement(monkeypatch):
+    monkeypatch.setattr(ft, "COMPILE", False)
+    fast  = ft.FastTrain(True)
+    model = fast.prepare(_net())
+    opt   = fast.optimizer(model.parameters(), lr=1e-3, weight_decay=0.0)
+    xb, yb = torch.randn(4, 3, 8, 8), torch.tensor([0, 1, 0, 1])
+
+    assert fast.inputs(xb).is_contiguous(memory_format=torch.channels_last)
+    with fast.autocast():
+        logits = fast.forward(fast.inputs(xb))
+    assert logits.dtype == torch.bfloat16
+    fast.backward(nn.functional.cross_entropy(logits.float(), yb))
+    fast.step(opt)
+    assert model[0].weight.dtype == torch.float32                  # master weights stay fp32
+    assert not fast.info()["grad_scaler"]                          # bf16 needs no loss scaling
+
+    report = fast.inference_agreement(fast.finish(model),
+                                      DataLoader(TensorDataset(xb, yb), batch_size=2), 2)
+    assert set(report) == {"fp32", "autocast", "autocast_dtype", "agreement", "f1_delta"}
+
+
+def test_probe_timing_is_labelled_as_an_estimate(monkeypatch):
+    monkeypatch.setattr(ft, "COMPILE", False)
+    monkeypatch.setattr(ft, "PROBE_STEPS", 1)
+    fast  = ft.FastTrain(True)
+    model = fast.prepare(_net())
+    timing = fast.step_timing(model, nn.functional.cross_entropy,
+                              torch.randn(2, 3, 8, 8), torch.tensor([0, 1]), steps_per_epoch=10)
+    assert set(timing) == {"probe_fp32_step_ms", "probe_fast_step_ms", "probe_speedup",
+                           "estimated_epoch_delta_s"}
@@ -0,0 +1,34 @@
+import torch
+from PIL import Image
+from torch import nn
+from torch.utils.data import DataLoader, Subset, WeightedRandomSampler
+from torchvision.models import resnet18
+
+from ai.utils.shards import shard_dataset
+from ai.utils.feature_cache import feature_loaders
+
+
+def test_cached_features_feed_the_head_like_the_full_model(tmp_path):
+    for c in ("Ours", "Renard"):
+        (tmp_path / "data" / c).mkdir(parents=True)
+        for i in range(3):
+            Image.effect_noise((64, 64), 64).convert("RGB").save(tmp_path / "data" / c / f"{i}.jpg")
+    ds = shard_dataset(tmp_path / "data", shard_dir=tmp_path / "shards")
+    sampler = WeightedRandomSampler([1.0] * 4, num_samples=4)
+    train = DataLoader(Subset(ds, [0, 1, 3, 4]), batch_size=2, sampler=sampler, collate_fn=ds.collate)
+    val   = DataLoader(Subset(ds, [2, 5]), batch_size=2, collate_fn=ds.collate)
+
+    model = resnet18(weights=None)
+    model.fc = nn.Linear(512, 2)
+    train_f, val_f = feature_loaders(model, train, val)
+    assert train_f.sampler is sampler and len(train_f.dataset) == 4
+
+    xb, yb = next(iter(val))
+    fb, fy = next(iter(val_f))
+    with torch.no_grad():
+        assert torch.equal(fy, yb)
+        assert torch.allclose(model.fc(fb), model.eval()(xb), atol=1e-2)   # float16 on disk
+
+    assert len(list(ds.dir.glob("features-*.npy"))) == 1
+    again, _ = feature_loaders(model, train, val)                          # read back, not re-run
+    assert torch.equal(again.dataset.tensors[0], train_f.dataset.tensors[0])
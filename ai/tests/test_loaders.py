@@ -0,0 +1,30 @@
+import torch
+from torch.utils.data import DataLoader, TensorDataset
+
+import ai.utils.loaders as ld
+
+
+def test_auto_sizing_and_env_overrides(monkeypatch):
+    for var in ("NUM_WORKERS", "PREFETCH_FACTOR", "PERSISTENT_WORKERS", "PIN_MEMORY"):
+        monkeypatch.delenv(var, raising=False)
+    monkeypatch.setattr(ld, "available_cpus", lambda: 1)
+    assert ld.loader_config()["num_workers"] == 0                    # single core
+
+    monkeypatch.setattr(ld, "available_cpus", lambda: 16)
+    monkeypatch.setattr(ld, "available_memory_mb", lambda: 2000)     # 1000 MB / 400 MB
+    cfg = ld.loader_config()
+    assert cfg["num_workers"] == 2 and cfg["persistent_workers"] and cfg["prefetch_factor"] == 2
+
+    monkeypatch.setenv("NUM_WORKERS", "3")
+    monkeypatch.setenv("PREFETCH_FACTOR", "6")
+    monkeypatch.setenv("PERSISTENT_WORKERS", "0")
+    monkeypatch.setenv("PIN_MEMORY", "1")
+    cfg = ld.loader_config()
+    assert cfg == {"num_workers": 3, "prefetch_factor": 6,
+                   "persistent_workers": False, "pin_memory": True}
+
+
+def test_probe_counts_images():
+    loader = DataLoader(TensorDataset(torch.zeros(50, 3), torch.zeros(50)), batch_size=8)
+    out = ld.probe(loader, batches=100, warmup=1)
+    assert out["images"] == 42 and out["batches"] == 6 and out["images_per_s"] > 0
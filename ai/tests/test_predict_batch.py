@@ -0,0 +1,26 @@
+import io, logging
+
+from PIL import Image
+from torch import nn
+
+from ai.predict import predict_batch
+
+
+def _jpeg(color) -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", (320, 240), color).save(buf, "JPEG")
+    return buf.getvalue()
+
+
+def test_batch_returns_predictions_and_logs_undecodable(caplog):
+    model = nn.Sequential(nn.AdaptiveAvgPool2d(1), nn.Flatten(), nn.Linear(3, 2)).eval()
+    images = [_jpeg("red"), b"not an image", _jpeg("blue")]
+
+    with caplog.at_level(logging.WARNING, logger="ai.predict"):
+        out = predict_batch(images, model, ["Ours", "Renard"], device="cpu", batch_size=2)
+
+    assert out[1] is None
+    for result in (out[0], out[2]):
+        label, conf = result
+        assert label in ("Ours", "Renard") and 0.5 <= conf <= 1.0
+    assert "cannot decode image 1" in caplog.text
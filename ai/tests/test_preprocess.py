@@ -0,0 +1,31 @@
+import io
+import torch
+from PIL import Image
+from torchvision import transforms
+import ai.preprocess as pp
+
+
+def _jpeg(w, h):
+    buf = io.BytesIO()
+    Image.effect_noise((w, h), 64).convert("RGB").save(buf, "JPEG")
+    return buf.getvalue()
+
+
+def test_full_decode_matches_training_transform(monkeypatch):
+    monkeypatch.setattr(pp, "USE_DRAFT", False)
+    data = _jpeg(640, 480)
+    ref  = transforms.Compose([
+        transforms.Resize((224, 224)),
+        transforms.ToTensor(),
+        transforms.Normalize(pp.IMNET_MEAN, pp.IMNET_STD),
+    ])(Image.open(io.BytesIO(data)).convert("RGB"))
+    assert torch.allclose(pp.preprocess(io.BytesIO(data)), ref, atol=1e-5)
+
+
+def test_draft_decode_writes_into_batch_slot_and_times_stages():
+    timer = pp.StageTimer()
+    batch = pp.new_batch(2)
+    out   = pp.preprocess(io.BytesIO(_jpeg(2000, 1500)), out=batch[1], timer=timer)
+    assert out.data_ptr() == batch[1].data_ptr()
+    assert out.shape == (3, 224, 224)
+    assert timer.stats()["images"] == 1
@@ -0,0 +1,101 @@
+import json
+
+import pytest
+import torch
+from torch import nn
+from torch.utils.data import DataLoader, TensorDataset
+from torchvision.models import resnet18
+
+import ai.runtimes as rt
+
+
+def _net():
+    return nn.Sequential(nn.Conv2d(3, 4, 3, stride=4), nn.ReLU(), nn.AdaptiveAvgPool2d(1),
+                         nn.Flatten(), nn.Linear(4, 2)).eval()
+
+
+def _run(tmp_path):
+    model = resnet18(weights=None)
+    model.fc = nn.Linear(512, 2)
+    torch.save({"classes": ["Ours", "Renard"], "state_dict": model.state_dict()}, tmp_path / "model.pt")
+    rt._export_torchscript(model.eval(), torch.randn(1, 3, 224, 224), tmp_path / "model.ts")
+    return tmp_path
+
+
+def _table(run, **agreement):
+    rows = {n: {"agreement": a, "latency_ms_b8": 1.0} for n, a in agreement.items()}
+    rows["eager"] = {"agreement": 1.0, "latency_ms_b8": 9.0}
+    (run / "runtimes.json").write_text(json.dumps({"backends": rows, "auto": "torchscript"}))
+
+
+def test_auto_is_timed_once_per_host(tmp_path, monkeypatch):
+    run = _run(tmp_path)
+    _table(run, torchscript=1.0)                   # export host: torchscript fastest
+    timed = []
+
+    def latency(model, batch, iters=3):
+        timed.append(type(model).__name__)
+        return 1.0 if isinstance(model, torch.jit.ScriptModule) else 9.0
+    monkeypatch.setattr(rt, "_latency_ms", latency)
+    monkeypatch.setattr(rt, "host_key", lambda device="cpu": "hostA")
+    assert rt.load_backend(run, "auto")[1] == "torchscript"
+    assert len(timed) == 2 and (run / "runtimes.hostA.json").exists()
+
+    timed.clear()                                  # same host: the cached pick, no timing
+    assert rt.load_backend(run, "auto")[1] == "torchscript"
+    assert timed == []
+
+    # another host where eager wins, despite what the export host measured
+    monkeypatch.setattr(rt, "host_key", lambda device="cpu": "hostB")
+    monkeypatch.setattr(rt, "_latency_ms", lambda m, b, iters=3:
+                        9.0 if isinstance(m, torch.jit.ScriptModule) else 1.0)
+    assert rt.load_backend(run, "auto")[1] == "eager"
+
+
+def test_auto_without_host_bench_reads_the_export_choice(tmp_path, monkeypatch):
+    run = _run(tmp_path)
+    _table(run, torchscript=1.0)
+    monkeypatch.setattr(rt, "HOST_BENCH", False)
+    monkeypatch.setattr(rt, "_latency_ms", lambda *a, **k: pytest.fail("benchmarked on load"))
+    assert rt.load_backend(run, "auto")[1] == "torchscript"
+
+
+def test_auto_skips_variants_below_parity(tmp_path):
+    run = _run(tmp_path)
+    _table(run, torchscript=0.5)                   # recorded choice, but lost parity
+    assert rt.load_backend(run, "auto")[1] == "eager"
+    assert not list(run.glob("runtimes.*.json"))   # nothing to compare → nothing timed
+
+    (run / "runtimes.json").unlink()               # no parity record at all
+    assert rt.load_backend(run, "auto")[1] == "eager"
+
+
+def test_choose_auto_falls_back_to_recorded_latency():
+    table = {"backends": {"eager": {"agreement": 1.0, "latency_ms_b8": 9.0},
+                          "int8": {"agreement": 0.999, "latency_ms_b8": 2.0},
+                          "onnx": {"agreement": 1.0, "latency_ms_b8": 1.0}},
+             "auto": "onnx"}
+    assert rt.choose_auto(table, ["eager", "int8"]) == "int8"        # onnx not on this host
+    assert rt.choose_auto(table, ["eager", "int8"], min_agreement=1.0) == "eager"
+
+
+def test_explicit_model_file_is_served_as_is(tmp_path):
+    run = _run(tmp_path)
+    ts = torch.jit.trace(_net(), torch.randn(1, 3, 224, 224))
+    torch.jit.save(ts, run / "custom.pt")          # TorchScript under a .pt name
+
+    model, name = rt.load_backend(run / "custom.pt", "auto")
+    assert name == "eager" and isinstance(model, torch.jit.ScriptModule)
+    assert model(torch.randn(2, 3, 224, 224)).shape == (2, 2)
+    assert rt.load_backend(run / "model.pt", "eager")[1] == "eager"  # standard file = the run
+
+
+def test_export_persists_parity_table_and_choice(tmp_path):
+    model = _net()
+    torch.save({"classes": ["a", "b"], "state_dict": model.state_dict()}, tmp_path / "model.pt")
+    val = DataLoader(TensorDataset(torch.randn(4, 3, 224, 224), torch.tensor([0, 1, 0, 1])), batch_size=2)
+
+    rt.export_variants(model, tmp_path, val)
+    data = json.loads((tmp_path / "runtimes.json").read_text())
+    assert {"eager", "torchscript"} <= set(data["backends"])
+    assert data["auto"] == rt.choose_auto(data, list(data["backends"]))
@@ -0,0 +1,32 @@
+import torch
+from PIL import Image
+from torchvision import datasets, transforms
+
+from ai.utils.shards import shard_dataset, IMNET_MEAN, IMNET_STD
+
+
+def _tree(root):
+    for c in ("Ours", "Renard"):
+        (root / c).mkdir(parents=True)
+        for i in range(3):
+            Image.effect_noise((320, 240), 64).convert("RGB").save(root / c / f"{i}.jpg")
+    (root / "Renard" / "broken.jpg").write_bytes(b"not a jpeg")
+
+
+def test_shards_match_imagefolder_and_are_reused(tmp_path):
+    root = tmp_path / "data"
+    _tree(root)
+    ds = shard_dataset(root, shard_dir=tmp_path / "shards")
+    assert ds.classes == ["Ours", "Renard"] and len(ds) == 6      # broken image left out
+
+    ref = datasets.ImageFolder(root, transforms.Compose([
+        transforms.Resize((224, 224)), transforms.ToTensor(),
+        transforms.Normalize(IMNET_MEAN, IMNET_STD)]),
+        is_valid_file=lambda p: "broken" not in p)
+    xb, yb = ds.collate([ds[i] for i in range(len(ds))])
+    want = torch.stack([ref[i][0] for i in range(len(ref))])
+    assert xb.shape == (6, 3, 224, 224) and yb.tolist() == ref.targets
+    assert torch.allclose(xb, want, atol=1e-5)
+
+    again = shard_dataset(root, shard_dir=tmp_path / "shards")
+    assert again.dir == ds.dir and len(list(tmp_path.joinpath("shards").iterdir())) == 1
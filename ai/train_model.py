@@ -9,13 +9,15 @@ Train a WildLens footprint classifier with
 
 Artifacts are written to:
     ai/runs/<run-id>/model.pt , labels.json , metrics.json , confusion_matrix.png
+plus the runtime variants of runtimes.export_variants() (TorchScript, INT8,
+ONNX) and their parity/latency table runtimes.json – EXPORT_RUNTIMES=0 skips.
 """
 from __future__ import annotations
 
 # ───────────────────────────── imports ─────────────────────────────
 from pathlib import Path
 from datetime import datetime, UTC
-import argparse, os, json, tempfile, uuid, requests
+import argparse, os, json, tempfile, time, uuid, requests
 
 import torch, torchvision
 from torch import nn, optim
@@ -30,6 +32,13 @@ import supabase
 from dotenv import load_dotenv          # pip install python-dotenv
 
 from utils.dataset_stats import class_counts
+from utils.downloader import download, format_report
+from utils.dataset_cache import DatasetCache
+from utils.shards import shard_dataset
+from utils.loaders import loader_config, describe, probe, format_probe
+from utils.fast_train import FastTrain
+from utils.feature_cache import feature_loaders
+from runtimes import export_variants
 
 # ───────────────────────────── constants ──────────────────────────
 load_dotenv(Path(__file__).resolve().parents[1] / ".env", override=False)
@@ -49,6 +58,13 @@ PATIENCE      = int(os.getenv("EARLY_STOP_PATIENCE", 4))   # early-stop patience
 LABEL_SMOOTH  = float(os.getenv("LABEL_SMOOTH", 0.10))     # 0 → off
 WD_HEAD       = float(os.getenv("WD_HEAD", 1e-4))
 WD_FINE       = float(os.getenv("WD_FINE", 5e-5))
+DOWNLOAD_WORKERS = int(os.getenv("DOWNLOAD_WORKERS", 16))  # parallel image fetches
+DATASET_CACHE = os.getenv("DATASET_CACHE", "1") != "0"     # 0 → fresh temp dir per run
+TRAIN_SHARDS  = os.getenv("TRAIN_SHARDS", "1") != "0"      # 0 → decode JPEGs every epoch
+TRAIN_EVAL_EVERY   = int(os.getenv("TRAIN_EVAL_EVERY", 0))     # eval-mode trainF1 every K epochs (0 → off)
+TRAIN_EVAL_SAMPLES = int(os.getenv("TRAIN_EVAL_SAMPLES", 2000)) # … on this many training images
+FAST_TRAIN    = os.getenv("FAST_TRAIN", "0") != "0"        # bf16 + channels_last + compile + fused Adam
+FEATURE_CACHE = os.getenv("FEATURE_CACHE", "0") != "0"     # phase-1 head on cached backbone features
 
 
 # ──────────────────────── focal-loss helper ───────────────────────
@@ -84,23 +100,10 @@ def fetch_metadata(sb):
     return imgs
 
 def download_dataset(rows, root: Path):
-    from PIL import Image, UnidentifiedImageError
-    for r in rows:
-        tgt_dir = root / r["label"]; tgt_dir.mkdir(parents=True, exist_ok=True)
-        tgt = tgt_dir / r["image_name"]
-        if tgt.exists():
-            try:
-                with Image.open(tgt) as im: im.verify(); continue
-            except (UnidentifiedImageError, OSError): tgt.unlink(missing_ok=True)
-        try:
-            with requests.get(r["image_url"], stream=True, timeout=30) as resp:
-                resp.raise_for_status()
-                with open(tgt, "wb") as f:
-                    for chunk in resp.iter_content(1 << 16): f.write(chunk)
-            with Image.open(tgt) as im: im.verify()
-        except Exception as e:
-            print(f"[WARN] skipped {r['image_url']} – {e}")
-            tgt.unlink(missing_ok=True)
+    """Parallel, resumable, manifest-backed download (utils/downloader.py)."""
+    report = download(rows, root, workers=DOWNLOAD_WORKERS)
+    print(f"[DATA] {format_report(report)}")
+    return report
 
 def build_dataloaders(root: Path, batch: int):
     tfm = transforms.Compose([
@@ -108,7 +111,16 @@ def build_dataloaders(root: Path, batch: int):
         transforms.ToTensor(),
         transforms.Normalize(IMNET_MEAN, IMNET_STD),
     ])
-    full_ds = datasets.ImageFolder(root, tfm)
+    if TRAIN_SHARDS:                       # decoded + resized once (utils/shards.py)
+        # without the dataset cache root is a fresh temp dir every run → its
+        # key never repeats, so keep the shards next to it instead of piling
+        # up never-evicted sets under SHARD_DIR
+        shard_dir = None if DATASET_CACHE else root.parent / "shards"
+        full_ds = shard_dataset(root, IMG_SIZE, shard_dir)
+        collate = full_ds.collate
+    else:
+        full_ds = datasets.ImageFolder(root, tfm)
+        collate = None
     if len(full_ds) == 0:
         raise RuntimeError(f"ImageFolder found 0 images in {root}")
 
@@ -150,10 +162,13 @@ def build_dataloaders(root: Path, batch: int):
     print("Sampler draw (2 000 samples):", Counter(drawn))
 
 
+    # workers / prefetch / pinning sized from the host (utils/loaders.py)
+    loader_kw = loader_config(batch)
+    print("Loader       :", describe(loader_kw))
     train_loader = DataLoader(train_ds, batch_size=batch,
-                              sampler=sampler, num_workers=0)
+                              sampler=sampler, collate_fn=collate, **loader_kw)
     val_loader   = DataLoader(val_ds,   batch_size=batch,
-                              shuffle=False, num_workers=0)
+                              shuffle=False, collate_fn=collate, **loader_kw)
 
     print("Class counts :", counts)
     print("Sample wgt   :", {k: round(max_n/v,2) for k,v in counts.items()})
@@ -173,15 +188,34 @@ def evaluate(model, loader, device, n_classes):
             y_true.append(yb.cpu()); y_pred.append(preds.cpu())
     return metric.compute().item(), torch.cat(y_true).numpy(), torch.cat(y_pred).numpy()
 
+def sampled_train_loader(train, n: int):
+    """Unweighted loader over a fixed random subset of the training split."""
+    g   = torch.Generator().manual_seed(0)
+    idx = torch.randperm(len(train.dataset), generator=g)[:n].tolist()
+    return DataLoader(torch.utils.data.Subset(train.dataset, idx),
+                      batch_size=train.batch_size, collate_fn=train.collate_fn)
+
 def train_loop(train, val, n_classes, counts,
-               epochs: int, acc_steps: int, freeze_epochs: int):
+               epochs: int, acc_steps: int, freeze_epochs: int,
+               fast: FastTrain | None = None):
     """
     Two-phase training:
         phase-1 (frozen backbone)  : Adam on classifier head
         phase-2 (fine-tune entire) : Adam + cosine annealing
     Early-stops when val-macro-F1 hasn’t improved for PATIENCE epochs.
+
+    trainF1 is accumulated from the training forward passes (train mode,
+    weighted sampler); TRAIN_EVAL_EVERY=K adds an eval-mode F1 on
+    TRAIN_EVAL_SAMPLES training images every K epochs. Returns the model,
+    the best val-F1 and one history dict per epoch (losses, F1s, timings).
+
+    ``fast`` (utils/fast_train.py) switches on bf16 autocast, channels_last,
+    torch.compile and fused Adam; the schedule, loss and accumulation stay.
+    FEATURE_CACHE=1 trains phase-1 on backbone features extracted once
+    (utils/feature_cache.py) instead of running the frozen backbone per step.
     """
     device = "cuda" if torch.cuda.is_available() else "cpu"
+    fast   = fast or FastTrain(False, device)
 
     # ─── create model ───
     model = resnet18(weights=ResNet18_Weights.IMAGENET1K_V1)
@@ -190,10 +224,11 @@ def train_loop(train, val, n_classes, counts,
     for p in model.parameters():   p.requires_grad = False
     for p in model.fc.parameters(): p.requires_grad = True
     model.to(device)
+    model = fast.prepare(model)
 
     # ─── optimiser + scheduler (phase-1) ───
     lr_head = float(os.getenv("LR_HEAD", 5e-4))
-    opt  = optim.Adam(model.fc.parameters(), lr=lr_head, weight_decay=WD_HEAD)
+    opt  = fast.optimizer(model.fc.parameters(), lr=lr_head, weight_decay=WD_HEAD)
     sched = optim.lr_scheduler.ReduceLROnPlateau(
         opt, mode="max", factor=0.5, patience=2, min_lr=1e-5)
 
@@ -205,10 +240,20 @@ def train_loop(train, val, n_classes, counts,
 
     best_f1      = 0.
     epochs_since = 0                       # early-stop counter
+    history      = []
+    train_metric = MulticlassF1Score(num_classes=n_classes, average="macro").to(device)
+    train_eval   = sampled_train_loader(train, TRAIN_EVAL_SAMPLES) if TRAIN_EVAL_EVERY else None
 
     eff_batch = train.batch_size * acc_steps
     print(f"[INFO] mini-batch={train.batch_size}  acc_steps={acc_steps}  "
           f"-> effective_batch={eff_batch}")
+    feats = None                            # (train, val) feature loaders for phase-1
+    if FEATURE_CACHE and freeze_epochs > 0:
+        feats = feature_loaders(model, train, val, device)
+    if fast.enabled:
+        xb, yb = next(iter(train))
+        fast.step_timing(model, criterion, xb.to(device), yb.to(device), len(train))
+        print(f"[INFO] fast training: {fast.info()}  step timing: {fast.timing}")
 
     for ep in range(epochs):
 
@@ -216,33 +261,64 @@ def train_loop(train, val, n_classes, counts,
         if ep == freeze_epochs:
             for p in model.parameters(): p.requires_grad = True
             lr_fine = float(os.getenv("LR_FINE", 1e-4))
-            opt  = optim.Adam(model.parameters(), lr=lr_fine, weight_decay=WD_FINE)
+            opt  = fast.optimizer(model.parameters(), lr=lr_fine, weight_decay=WD_FINE)
             sched = torch.optim.lr_scheduler.CosineAnnealingLR(
                 opt, T_max=epochs-ep, eta_min=1e-6)
             print(f"[INFO] ↻ unfreezing backbone (lr={lr_fine}, wd={WD_FINE})")
 
         # ─── one epoch of training ───
+        head_only = feats is not None and ep < freeze_epochs
+        loader, val_loader = feats if head_only else (train, val)
         model.train()
         running = 0.
         opt.zero_grad()
+        train_metric.reset()
+        t_epoch = time.perf_counter()
+        data_wait = step_s = 0.
+        t_data = time.perf_counter()
 
-        for i, (xb, yb) in enumerate(train, 1):
+        for i, (xb, yb) in enumerate(loader, 1):
             xb, yb = xb.to(device), yb.to(device)
-            loss   = criterion(model(xb), yb) / acc_steps
-            loss.backward()
-
-            if i % acc_steps == 0 or i == len(train):
-                opt.step()
+            t_step = time.perf_counter()
+            data_wait += t_step - t_data
+            if head_only:                   # cached 512-d features → fc only
+                logits = model.fc(xb)
+            else:
+                with fast.autocast():
+                    logits = fast.forward(fast.inputs(xb))
+            loss   = criterion(logits.float(), yb) / acc_steps
+            fast.backward(loss)
+
+            if i % acc_steps == 0 or i == len(loader):
+                fast.step(opt)
                 opt.zero_grad()
 
             running += loss.item() * acc_steps
+            train_metric.update(logits.detach().argmax(1), yb)
+            t_data = time.perf_counter()
+            step_s += t_data - t_step
+        train_s = time.perf_counter() - t_epoch
 
         # ─── evaluate ───
-        val_f1,  _, _ = evaluate(model, val,   device, n_classes)
-        train_f1, _, _ = evaluate(model, train, device, n_classes)
+        t_val = time.perf_counter()
+        val_f1,  _, _ = evaluate(model.fc if head_only else model, val_loader, device, n_classes)
+        val_s = time.perf_counter() - t_val
+        train_f1 = train_metric.compute().item()
+        log = {"epoch": ep + 1, "loss": round(running / len(loader), 5),
+               "train_f1": round(train_f1, 5), "val_f1": round(val_f1, 5),
+               "train_s": round(train_s, 3), "step_s": round(step_s, 3),
+               "data_wait_s": round(data_wait, 3), "val_eval_s": round(val_s, 3),
+               "head_only_features": head_only}
+        if train_eval is not None and (ep + 1) % TRAIN_EVAL_EVERY == 0:
+            t_te = time.perf_counter()
+            log["train_f1_eval"] = round(evaluate(model, train_eval, device, n_classes)[0], 5)
+            log["train_eval_s"]  = round(time.perf_counter() - t_te, 3)
+        history.append(log)
         print(f"[epoch {ep+1:02d}/{epochs}] "
-              f"loss={running/len(train):.4f}  "
-              f"trainF1={train_f1:.3f}  valF1={val_f1:.3f}")
+              f"loss={log['loss']:.4f}  "
+              f"trainF1={train_f1:.3f}  valF1={val_f1:.3f}  "
+              + (f"trainF1(eval)={log['train_f1_eval']:.3f}  " if "train_f1_eval" in log else "")
+              + f"[train {train_s:.1f}s (data wait {data_wait:.1f}s) · val {val_s:.1f}s]")
 
         # update scheduler
         if isinstance(sched, optim.lr_scheduler.ReduceLROnPlateau):
@@ -261,10 +337,10 @@ def train_loop(train, val, n_classes, counts,
                       f"(no valF1 gain for {PATIENCE} epochs)")
                 break
 
-    return model, best_f1
+    return fast.finish(model), best_f1, history
 
 # ────────────────────────────── main ──────────────────────────────
-def main(run_id, batch_size, epochs, acc_steps, freeze_epochs):
+def main(run_id, batch_size, epochs, acc_steps, freeze_epochs, probe_loader=False):
 
     dummy_root = os.getenv("DUMMY_DATA_ROOT")
     use_dummy  = bool(dummy_root)
@@ -279,7 +355,22 @@ def main(run_id, batch_size, epochs, acc_steps, freeze_epochs):
         rows = fetch_metadata(sb)
 
     # 1. prepare workspace dir ------------------------------------------------
-    if use_dummy:
+    #    the dataset cache (utils/dataset_cache.py) keeps one hardlinked
+    #    version per metadata snapshot, so repeat runs / Optuna trials do
+    #    no data I/O at all
+    if not use_dummy:
+        print("[*] Fetching metadata …")
+        print(f"    → {len(rows):,} images / "
+            f"{len(set(r['label'] for r in rows))} species")
+
+    if DATASET_CACHE:
+        cache = DatasetCache()
+        if use_dummy:
+            root = cache.from_dir(data_parent)
+        else:
+            print("[*] Downloading images (dataset cache) …")
+            root = cache.from_rows(rows, download_dataset)
+    elif use_dummy:
         root = Path(tempfile.mkdtemp()) / "data"
         import shutil
         for src in data_parent.rglob("*.jpg"):
@@ -290,10 +381,6 @@ def main(run_id, batch_size, epochs, acc_steps, freeze_epochs):
         tmpdir = tempfile.TemporaryDirectory()         # keep reference!
         root   = Path(tmpdir.name) / "data"
 
-        print("[*] Fetching metadata …")
-        print(f"    → {len(rows):,} images / "
-            f"{len(set(r['label'] for r in rows))} species")
-
         print("[*] Downloading images …")
         download_dataset(rows, root)
 
@@ -301,9 +388,15 @@ def main(run_id, batch_size, epochs, acc_steps, freeze_epochs):
     print("[*] Building dataloaders …")
     train, val, classes, counts = build_dataloaders(root, batch_size)
 
+    if probe_loader:                       # input pipeline alone, then exit
+        print("[PROBE] train loader:", format_probe(probe(train)))
+        print("[PROBE] val loader  :", format_probe(probe(val)))
+        return
+
     print(f"[*] Training ({epochs} epochs)…")
-    model, _ = train_loop(train, val, len(classes),
-                        counts, epochs, acc_steps, freeze_epochs)
+    fast = FastTrain(FAST_TRAIN, "cuda" if torch.cuda.is_available() else "cpu")
+    model, _, history = train_loop(train, val, len(classes),
+                        counts, epochs, acc_steps, freeze_epochs, fast)
 
     device = "cuda" if torch.cuda.is_available() else "cpu"
     macro_f1, y_true, y_pred = evaluate(model, val, device, len(classes))
@@ -322,12 +415,24 @@ def main(run_id, batch_size, epochs, acc_steps, freeze_epochs):
     (artefacts/"metrics.json").write_text(json.dumps({
         "macro_f1": macro_f1,
         "epochs":   epochs,
-        "effective_batch": batch_size*acc_steps
+        "effective_batch": batch_size*acc_steps,
+        "epochs_run": len(history),
+        "timing_s": {k: round(sum(h[k] for h in history), 3)
+                     for k in ("train_s", "step_s", "data_wait_s", "val_eval_s")},
+        "history":  history,
+        **({"fast_train": {**fast.info(), **fast.timing,
+                           "autocast_vs_fp32_inference":
+                               fast.inference_agreement(model, val, len(classes))}}
+           if fast.enabled else {}),
     },indent=2))
 
     torch.save({"classes":classes, "state_dict":model.state_dict()},
                 artefacts/"model.pt")
     (artefacts/"labels.json").write_text(json.dumps(classes,ensure_ascii=False,indent=2))
+
+    if os.getenv("EXPORT_RUNTIMES", "1") != "0":
+        print("[*] Exporting runtime variants (accuracy parity on val split) …")
+        export_variants(model, artefacts, val)
     print("[OK] Saved model and metrics to", artefacts.relative_to(Path.cwd()))
 
 if __name__ == "__main__":
@@ -338,4 +443,6 @@ if __name__ == "__main__":
     ap.add_argument("--acc-steps",  type=int, default=ACC_STEPS_DEFAULT)
     ap.add_argument("--freeze-epochs", type=int, default=int(os.getenv("FREEZE_EPOCHS", 5)),
                     help="epochs to train head-only before fine-tuning backbone")
+    ap.add_argument("--probe-loader", action="store_true",
+                    help="print loader-only images/sec and exit (is training input-bound?)")
     main(**vars(ap.parse_args()))
@@ -0,0 +1,219 @@
+# wildlens-ai/utils/dataset_cache.py
+"""
+Versioned on-disk dataset cache shared by training runs and Optuna trials.
+
+    cache = DatasetCache()
+    root  = cache.from_rows(rows, download_dataset)     # Supabase metadata
+    root  = cache.from_dir(Path(DUMMY_DATA_ROOT))       # local dummy corpus
+
+Layout under DATASET_CACHE_DIR (default ~/.cache/wildlens/datasets):
+
+    store/<label>/<image_name>        every image ever downloaded (+ .manifest.json)
+    versions/<key>/<label>/<name>     ImageFolder view = hardlinks into store/
+    versions/<key>/version.json       key, file count, bytes, created / last used
+    shards/<key>-<size>/              decoded uint8 shards of a version (utils/shards.py)
+
+``key`` hashes the footprint_images ids + updated timestamps (+ url and
+label), or for a local directory every file's path, size and mtime. A run
+whose key already has a complete version reads it directly – no download,
+no copy, no decoding. A new key downloads only what store/ lacks and links
+the version in.
+
+``evict()`` drops versions unused for DATASET_CACHE_MAX_AGE_DAYS, then the
+least recently used ones while the cache is above DATASET_CACHE_MAX_GB
+(the newest DATASET_CACHE_KEEP always stay; a version whose files are all
+shared with others frees nothing and is kept), and finally store/ files no
+version links to any more. Shards go with their version, or on their own
+once unused for DATASET_CACHE_MAX_AGE_DAYS.
+"""
+from __future__ import annotations
+import os, json, time, shutil, hashlib
+from pathlib import Path
+
+CACHE_DIR    = Path(os.getenv("DATASET_CACHE_DIR", Path.home() / ".cache" / "wildlens" / "datasets"))
+MAX_BYTES    = int(float(os.getenv("DATASET_CACHE_MAX_GB", 20)) * 1e9)
+MAX_AGE_DAYS = float(os.getenv("DATASET_CACHE_MAX_AGE_DAYS", 30))
+KEEP         = int(os.getenv("DATASET_CACHE_KEEP", 2))
+META         = "version.json"
+IMAGE_EXTS   = {".jpg", ".jpeg", ".png"}
+
+
+def _digest(items) -> str:
+    h = hashlib.blake2b(digest_size=10)
+    for item in items:
+        h.update(repr(item).encode()); h.update(b"\0")
+    return h.hexdigest()
+
+
+def _link(src: Path, dst: Path) -> None:
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        os.link(src, dst)
+    except OSError:                                  # other filesystem / no hardlinks
+        shutil.copy2(src, dst)
+
+
+class DatasetCache:
+    def __init__(self, root: Path | None = None, max_bytes: int = MAX_BYTES,
+                 max_age_days: float = MAX_AGE_DAYS, keep: int = KEEP):
+        self.root      = Path(root or CACHE_DIR).expanduser()
+        self.store     = self.root / "store"
+        self.versions  = self.root / "versions"
+        self.max_bytes = max_bytes
+        self.max_age   = max_age_days * 86400
+        self.keep      = keep
+
+    # ─── keys ─────────────────────────────────────────────────────────
+    @staticmethod
+    def key_for_rows(rows: list[dict]) -> str:
+        return "rows-" + _digest(sorted(
+            (str(r.get("id")), str(r.get("updated_at") or r.get("created_at")),
+             r["image_url"], r["label"], r["image_name"]) for r in rows))
+
+    @staticmethod
+    def _images(src: Path) -> list[Path]:
+        return sorted(p for p in src.rglob("*")
+                      if p.suffix.lower() in IMAGE_EXTS and p.is_file())
+
+    @classmethod
+    def key_for_dir(cls, src: Path) -> str:
+        items = []
+        for p in cls._images(src):
+            st = p.stat()
+            items.append((p.relative_to(src).as_posix(), st.st_size, st.st_mtime_ns))
+        return "dir-" + _digest(items)
+
+    # ─── versions ─────────────────────────────────────────────────────
+    def _ready(self, key: str) -> Path | None:
+        path = self.versions / key
+        meta = path / META
+        if not meta.exists():
+            return None
+        info = json.loads(meta.read_text())
+        info["last_used"] = time.time()
+        meta.write_text(json.dumps(info, indent=2))
+        print(f"[DATA] cache hit {key} ({info['files']:,} files) – no data I/O")
+        return path
+
+    def _publish(self, key: str, files: list[tuple[Path, str]]) -> Path:
+        """Link (src, relative dst) pairs into versions/<key> atomically."""
+        final = self.versions / key
+        tmp   = self.versions / f".{key}.{os.getpid()}.tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        nbytes = 0
+        for src, rel in files:
+            _link(src, tmp / rel)
+            nbytes += src.stat().st_size
+        now = time.time()
+        (tmp / META).write_text(json.dumps({"key": key, "files": len(files), "bytes": nbytes,
+                                            "created": now, "last_used": now}, indent=2))
+        try:
+            os.replace(tmp, final)
+        except OSError:                              # a concurrent trial published it first
+            shutil.rmtree(tmp, ignore_errors=True)
+        self.evict(protect=key)
+        return final
+
+    def from_rows(self, rows: list[dict], fetch) -> Path:
+        """ImageFolder root for rows; ``fetch(rows, store_dir)`` fills the store on a miss."""
+        key = self.key_for_rows(rows)
+        path = self._ready(key)
+        if path is not None:
+            return path
+        self.store.mkdir(parents=True, exist_ok=True)
+        fetch(rows, self.store)
+        files = []
+        for r in rows:
+            rel = f"{r['label']}/{r['image_name']}"
+            if (self.store / rel).is_file():         # failed downloads are left out
+                files.append((self.store / rel, rel))
+        return self._publish(key, files)
+
+    def from_dir(self, src: Path) -> Path:
+        """ImageFolder root mirroring a local directory (hardlinked, not copied)."""
+        src = Path(src).expanduser().resolve()
+        key = self.key_for_dir(src)
+        path = self._ready(key)
+        if path is not None:
+            return path
+        return self._publish(key, [(p, p.relative_to(src).as_posix()) for p in self._images(src)])
+
+    # ─── eviction ─────────────────────────────────────────────────────
+    def _version_infos(self) -> list[tuple[Path, dict]]:
+        out = []
+        for meta in self.versions.glob(f"*/{META}"):
+            try:
+                out.append((meta.parent, json.loads(meta.read_text())))
+            except (OSError, ValueError):
+                continue
+        return sorted(out, key=lambda pi: pi[1].get("last_used", 0), reverse=True)
+
+    def size(self) -> int:
+        """Bytes on disk (hardlinked files counted once)."""
+        seen, total = set(), 0
+        for p in self.root.rglob("*"):
+            if p.is_file():
+                st = p.stat()
+                if (st.st_dev, st.st_ino) not in seen:
+                    seen.add((st.st_dev, st.st_ino)); total += st.st_size
+        return total
+
+    def _freeable(self, path: Path) -> int:
+        """
+        Bytes removing version ``path`` (+ its shards) would give back. A
+        version file is only freed when no other version shares its inode:
+        link count 1 (copied), or 2 with the other link being store/ (which
+        _prune_store then drops). Links into a local source dir free nothing.
+        """
+        total = 0
+        for p in path.rglob("*"):
+            if not p.is_file() or p.name == META:
+                continue
+            st = p.stat()
+            if st.st_nlink == 1:
+                total += st.st_size
+            elif st.st_nlink == 2:
+                kept = self.store / p.relative_to(path)
+                try:
+                    if kept.stat().st_ino == st.st_ino:
+                        total += st.st_size
+                except OSError:
+                    pass
+        for shard in (self.root / "shards").glob(f"{path.name}-*"):
+            total += sum(p.stat().st_size for p in shard.rglob("*") if p.is_file())
+        return total
+
+    def evict(self, protect: str | None = None) -> dict:
+        """Apply the age / size policy; returns what was removed."""
+        if not self.root.exists():
+            return {"versions": 0, "store_files": 0}
+        infos, now, dropped = self._version_infos(), time.time(), []
+        size = self.size()
+        for i, (path, info) in enumerate(infos):
+            if i >= self.keep and path.name != protect and now - info.get("last_used", 0) > self.max_age:
+                size -= self._freeable(path)
+                shutil.rmtree(path, ignore_errors=True); dropped.append(path.name)
+        infos = self._version_infos()
+        while len(infos) > self.keep and size > self.max_bytes:
+            path, _ = infos.pop()
+            if path.name == protect:
+                continue
+            freed = self._freeable(path)             # stat now: earlier drops may have freed shared files
+            if not freed:
+                continue                             # shares everything with newer versions
+            size -= freed
+            shutil.rmtree(path, ignore_errors=True); dropped.append(path.name)
+        for index in (self.root / "shards").glob("*/index.json"):
+            key = index.parent.name.rsplit("-", 1)[0]
+            if key in dropped or now - index.stat().st_mtime > self.max_age:
+                shutil.rmtree(index.parent, ignore_errors=True)
+        return {"versions": len(dropped), "store_files": self._prune_store() if dropped else 0}
+
+    def _prune_store(self) -> int:
+        """Delete store/ images that no version links to (link count 1)."""
+        removed = 0
+        if self.store.exists():
+            for p in self.store.rglob("*"):
+                if p.suffix.lower() in IMAGE_EXTS and p.is_file() and p.stat().st_nlink == 1:
+                    p.unlink(); removed += 1
+        return removed
@@ -0,0 +1,228 @@
+# wildlens-ai/utils/downloader.py
+"""
+Concurrent, resumable image downloader for the training set.
+
+    report = download(rows, root, workers=16)
+
+``rows`` are footprint_images dicts with ``image_url``, ``image_name`` and
+``label``; files land in ``root/<label>/<image_name>`` (ImageFolder layout).
+
+* a thread pool shares ONE ``requests.Session`` whose connection pool is
+  sized to the pool (keep-alive, no handshake per image)
+* transient failures (connection errors, 429, 5xx) are retried with
+  exponential backoff
+* bytes go to ``<name>.part`` first; an interrupted file is resumed with
+  ``Range: bytes=<n>-`` on the next run (a 200 reply restarts it)
+* ``root/.manifest.json`` records url, row version (id + updated_at), size,
+  mtime and a blake2b content hash per file. A file whose url / version /
+  size / mtime match is skipped without reading it; when only the mtime
+  moved the hash decides. A new ``updated_at`` re-fetches the file even
+  under the same url (an image re-uploaded in place). Only freshly
+  downloaded files (and, once, files from a run without a manifest) are
+  decoded (PIL ``verify``).
+"""
+from __future__ import annotations
+import os, json, time, random, hashlib, threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+from requests.adapters import HTTPAdapter
+
+MANIFEST     = ".manifest.json"
+CHUNK        = 1 << 16
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+def file_digest(path: Path) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _verify_image(path: Path) -> None:
+    from PIL import Image
+    with Image.open(path) as im:
+        im.verify()
+
+
+def row_version(row: dict) -> str:
+    """What a re-upload changes: the row id + its updated_at (created_at as fallback)."""
+    return f"{row.get('id')}:{row.get('updated_at') or row.get('created_at')}"
+
+
+class Manifest:
+    """{relative path: {"url", "version", "size", "mtime_ns", "blake2b"}} persisted as JSON."""
+
+    def __init__(self, root: Path):
+        self.path  = root / MANIFEST
+        self.lock  = threading.Lock()
+        self.dirty = 0
+        try:
+            self.entries = json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def unchanged(self, rel: str, url: str, tgt: Path, version: str | None = None) -> bool:
+        entry = self.entries.get(rel)
+        if entry is None or entry["url"] != url:
+            return False
+        if entry.get("version", version) != version:     # older manifests: adopt below
+            return False
+        try:
+            st = tgt.stat()
+        except OSError:
+            return False
+        if st.st_size != entry["size"]:
+            return False
+        if st.st_mtime_ns == entry["mtime_ns"] and "version" in entry:
+            return True
+        if file_digest(tgt) == entry["blake2b"]:          # touched, same bytes
+            self.record(rel, url, tgt, entry["blake2b"], version)
+            return True
+        return False
+
+    def record(self, rel: str, url: str, tgt: Path, digest: str,
+               version: str | None = None) -> None:
+        st = tgt.stat()
+        with self.lock:
+            self.entries[rel] = {"url": url, "version": version, "size": st.st_size,
+                                 "mtime_ns": st.st_mtime_ns, "blake2b": digest}
+            self.dirty += 1
+            if self.dirty >= 200:                         # survive a crash mid-run
+                self._save_locked()
+
+    def forget(self, rel: str) -> None:
+        with self.lock:
+            self.entries.pop(rel, None)
+
+    def save(self) -> None:
+        with self.lock:
+            self._save_locked()
+
+    def _save_locked(self) -> None:
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.entries, indent=0, sort_keys=True))
+        os.replace(tmp, self.path)
+        self.dirty = 0
+
+
+class Downloader:
+    def __init__(self, root: Path, workers: int = 16, retries: int = 3,
+                 timeout: float = 30.0, backoff: float = 0.5, verify: bool = True):
+        self.root     = Path(root)
+        self.workers  = max(1, workers)
+        self.retries  = retries
+        self.timeout  = (min(10.0, timeout), timeout)    # (connect, read)
+        self.backoff  = backoff
+        self.verify   = verify
+        self.session  = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.workers, pool_maxsize=self.workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.manifest = None
+        self.lock     = threading.Lock()
+        self.counts   = {}
+
+    # ─── one file ─────────────────────────────────────────────────────
+    def _fetch(self, url: str, tgt: Path) -> str:
+        """Stream url into tgt (resuming tgt.part); returns the content digest."""
+        part = tgt.with_name(tgt.name + ".part")
+        for attempt in range(self.retries + 1):
+            offset  = part.stat().st_size if part.exists() else 0
+            headers = {"Range": f"bytes={offset}-"} if offset else {}
+            try:
+                with self.session.get(url, stream=True, timeout=self.timeout,
+                                      headers=headers) as resp:
+                    if resp.status_code == 416 and offset:    # .part already complete / stale
+                        part.unlink(missing_ok=True)
+                        continue
+                    if resp.status_code in RETRY_STATUS and attempt < self.retries:
+                        raise requests.HTTPError(f"{resp.status_code}", response=resp)
+                    resp.raise_for_status()
+                    resumed = resp.status_code == 206 and offset > 0
+                    h = hashlib.blake2b(digest_size=16)
+                    if resumed:
+                        with open(part, "rb") as f:
+                            for chunk in iter(lambda: f.read(1 << 20), b""):
+                                h.update(chunk)
+                        self._count("resumed")
+                    nbytes = 0
+                    with open(part, "ab" if resumed else "wb") as f:
+                        for chunk in resp.iter_content(CHUNK):
+                            f.write(chunk); h.update(chunk); nbytes += len(chunk)
+                    self._count("bytes", nbytes)
+                os.replace(part, tgt)
+                return h.hexdigest()
+            except (requests.ConnectionError, requests.Timeout,
+                    requests.exceptions.ChunkedEncodingError, requests.HTTPError) as exc:
+                status = getattr(getattr(exc, "response", None), "status_code", None)
+                if attempt >= self.retries or (status is not None and status not in RETRY_STATUS):
+                    raise
+                self._count("retries")
+                time.sleep(self.backoff * (2 ** attempt) * (0.5 + random.random()))
+        raise RuntimeError(f"gave up on {url}")
+
+    def _one(self, row: dict) -> str:
+        rel = f"{row['label']}/{row['image_name']}"
+        tgt = self.root / rel
+        url = row["image_url"]
+        version = row_version(row)
+        if self.manifest.unchanged(rel, url, tgt, version):
+            return "skipped"
+        if rel not in self.manifest.entries and tgt.exists():
+            try:                                          # from a pre-manifest run: adopt once
+                _verify_image(tgt)
+                self.manifest.record(rel, url, tgt, file_digest(tgt), version)
+                return "skipped"
+            except Exception:
+                tgt.unlink(missing_ok=True)
+        tgt.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            digest = self._fetch(url, tgt)
+            if self.verify:
+                _verify_image(tgt)
+        except Exception as exc:
+            print(f"[WARN] skipped {url} – {exc}")
+            tgt.unlink(missing_ok=True)
+            self.manifest.forget(rel)
+            return "failed"
+        self.manifest.record(rel, url, tgt, digest, version)
+        return "downloaded"
+
+    def _count(self, key: str, n: int = 1) -> None:
+        with self.lock:
+            self.counts[key] = self.counts.get(key, 0) + n
+
+    # ─── many files ───────────────────────────────────────────────────
+    def run(self, rows: list[dict]) -> dict:
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.manifest = Manifest(self.root)
+        self.counts = {"files": len(rows), "downloaded": 0, "skipped": 0, "failed": 0,
+                       "resumed": 0, "retries": 0, "bytes": 0}
+        t0 = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(self.workers, thread_name_prefix="dl") as pool:
+                for fut in as_completed([pool.submit(self._one, r) for r in rows]):
+                    self._count(fut.result())
+        finally:
+            self.manifest.save()
+        secs = time.perf_counter() - t0
+        return {**self.counts, "seconds": round(secs, 3),
+                "files_per_s": round(len(rows) / secs, 1) if secs else 0.0,
+                "mb_per_s": round(self.counts["bytes"] / secs / 1e6, 2) if secs else 0.0}
+
+
+def download(rows: list[dict], root: Path, **kwargs) -> dict:
+    """Download rows into root (see module docstring); returns the throughput report."""
+    return Downloader(root, **kwargs).run(rows)
+
+
+def format_report(report: dict) -> str:
+    return (f"{report['files']} files: {report['downloaded']} downloaded "
+            f"({report['resumed']} resumed), {report['skipped']} unchanged, "
+            f"{report['failed']} failed, {report['retries']} retries – "
+            f"{report['bytes'] / 1e6:.1f} MB in {report['seconds']:.1f}s "
+            f"({report['files_per_s']} files/s, {report['mb_per_s']} MB/s)")
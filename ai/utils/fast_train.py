@@ -0,0 +1,176 @@
+# wildlens-ai/utils/fast_train.py
+"""
+Opt-in fast training mode (FAST_TRAIN=1), tuned for CPU.
+
+    fast  = FastTrain(FAST_TRAIN, device)
+    model = fast.prepare(model)                   # channels_last (+ compiled step module)
+    opt   = fast.optimizer(params, lr, wd)        # Adam, fused kernels when available
+    with fast.autocast():
+        logits = fast.forward(fast.inputs(xb))
+    fast.backward(loss); fast.step(opt)           # loss scaling when fp16
+
+* bfloat16 autocast – convs / matmuls in bf16 (AVX512-BF16 / AMX when the
+  CPU has them); weights, optimizer state and the loss stay fp32. bf16 has
+  fp32's exponent range, so gradients need no scaling. A CUDA device
+  without bf16 support autocasts to float16 instead, and ``backward`` /
+  ``step`` then go through a GradScaler so small gradients don't underflow
+* channels_last for the model and every batch (oneDNN's native layout)
+* ``torch.compile`` of the training forward (TRAIN_COMPILE=0 disables it);
+  a compile failure falls back to eager once, with a warning
+* ``Adam(fused=True)`` – one kernel per step instead of one per tensor
+
+``prepare`` returns the eager module; the compiled one is only used by
+``forward`` so state_dict keys, evaluate() and the exports are unchanged.
+When disabled every helper is a no-op and training is the plain fp32 path.
+"""
+from __future__ import annotations
+import os, copy, time, contextlib
+
+import torch
+from torch import optim
+
+COMPILE     = os.getenv("TRAIN_COMPILE", "1") != "0"
+PROBE_STEPS = int(os.getenv("FAST_TRAIN_PROBE_STEPS", 3))
+
+
+def bf16_native() -> bool:
+    try:
+        return bool(torch.cpu._is_avx512_bf16_supported() or torch.cpu._is_amx_tile_supported())
+    except AttributeError:                           # older torch
+        return False
+
+
+class FastTrain:
+    def __init__(self, enabled: bool, device: str = "cpu"):
+        self.enabled  = enabled
+        self.device   = device
+        self.dtype    = (torch.bfloat16 if device == "cpu" or torch.cuda.is_bf16_supported()
+                         else torch.float16)
+        self.scaler   = torch.amp.GradScaler(torch.device(device).type,
+                                             enabled=enabled and self.dtype == torch.float16)
+        self.compiled = False
+        self.fused    = False
+        self.model    = self.step_model = None
+        self.timing   = {}
+
+    # ─── model / batches ─────────────────────────────────────────────
+    def prepare(self, model):
+        self.model = self.step_model = model
+        if not self.enabled:
+            return model
+        model.to(memory_format=torch.channels_last)
+        if COMPILE and hasattr(torch, "compile"):
+            self.step_model, self.compiled = torch.compile(model), True
+        return model
+
+    def inputs(self, xb):
+        return xb.contiguous(memory_format=torch.channels_last) if self.enabled else xb
+
+    def autocast(self):
+        if not self.enabled:
+            return contextlib.nullcontext()
+        return torch.autocast(self.device, dtype=self.dtype)
+
+    def forward(self, xb):
+        try:
+            return self.step_model(xb)
+        except Exception as exc:
+            if self.step_model is self.model:
+                raise
+            print(f"[WARN] torch.compile failed ({type(exc).__name__}: {exc}) – eager mode")
+            self.step_model, self.compiled = self.model, False
+            return self.model(xb)
+
+    def backward(self, loss):
+        self.scaler.scale(loss).backward()
+
+    def step(self, opt):
+        """opt.step() – unscaled first and skipped on inf/nan grads under fp16."""
+        self.scaler.step(opt)
+        self.scaler.update()
+
+    def optimizer(self, params, lr: float, weight_decay: float):
+        params = list(params)
+        if self.enabled:
+            try:
+                opt = optim.Adam(params, lr=lr, weight_decay=weight_decay, fused=True)
+                self.fused = True
+                return opt
+            except (RuntimeError, TypeError, ValueError):     # no fused kernel here
+                return optim.Adam(params, lr=lr, weight_decay=weight_decay, foreach=True)
+        return optim.Adam(params, lr=lr, weight_decay=weight_decay)
+
+    def finish(self, model):
+        """Back to the default layout before evaluation / saving / export."""
+        if self.enabled:
+            model.to(memory_format=torch.contiguous_format)
+        return model
+
+    # ─── reporting ───────────────────────────────────────────────────
+    def info(self) -> dict:
+        return {"enabled": self.enabled, "autocast": str(self.dtype) if self.enabled else None,
+                "channels_last": self.enabled, "compiled": self.compiled,
+                "fused_optimizer": self.fused, "grad_scaler": self.scaler.is_enabled(),
+                "bf16_native": bf16_native()}
+
+    def step_timing(self, model, criterion, xb, yb, steps_per_epoch: int = 0) -> dict:
+        """
+        ms per forward+backward over PROBE_STEPS steps on one batch: fp32 eager
+        vs. this mode, on copies of model. The epoch delta is that per-step
+        difference × steps_per_epoch – an estimate, not a timed epoch.
+        """
+        if not self.enabled or PROBE_STEPS <= 0:
+            return {}
+
+        def run(m, fwd, ctx, x):
+            m.train()
+            for i in range(PROBE_STEPS + 1):                  # +1: warm-up / compile
+                if i == 1:
+                    t0 = time.perf_counter()
+                with ctx():
+                    loss = criterion(fwd(x).float(), yb)
+                loss.backward()
+                m.zero_grad(set_to_none=True)
+            return (time.perf_counter() - t0) * 1000 / PROBE_STEPS
+
+        ref  = copy.deepcopy(model).to(memory_format=torch.contiguous_format)
+        fast = copy.deepcopy(model)
+        for p in (*ref.parameters(), *fast.parameters()):     # time a fine-tuning step
+            p.requires_grad = True
+        step = torch.compile(fast) if self.compiled else fast
+        base = run(ref, ref, contextlib.nullcontext, xb.contiguous())
+        try:
+            mine = run(fast, step, self.autocast, self.inputs(xb))
+        except Exception:                                  # compile problem: eager
+            mine = run(fast, fast, self.autocast, self.inputs(xb))
+        self.timing = {"probe_fp32_step_ms": round(base, 2), "probe_fast_step_ms": round(mine, 2),
+                       "probe_speedup": round(base / mine, 3) if mine else None,
+                       "estimated_epoch_delta_s": round((mine - base) * steps_per_epoch / 1000, 2)}
+        return self.timing
+
+    def inference_agreement(self, model, loader, n_classes: int) -> dict:
+        """
+        Val accuracy / macro-F1 of ONE model (the fast-trained one) run in
+        fp32 and under autocast, plus how often the two agree. It measures
+        the low-precision inference path only – not fast vs. fp32 training.
+        """
+        if not self.enabled:
+            return {}
+        from torchmetrics.classification import MulticlassF1Score
+        out = {}
+        model.eval()
+        for name, ctx, conv in (("fp32", contextlib.nullcontext, lambda x: x),
+                                ("autocast", self.autocast, self.inputs)):
+            f1 = MulticlassF1Score(num_classes=n_classes, average="macro")
+            preds, ys = [], []
+            with torch.no_grad():
+                for xb, yb in loader:
+                    with ctx():
+                        p = model(conv(xb.to(self.device))).argmax(1).cpu()
+                    f1.update(p, yb); preds.append(p); ys.append(yb)
+            preds, ys = torch.cat(preds), torch.cat(ys)
+            out[name] = {"acc": round((preds == ys).float().mean().item(), 5),
+                         "macro_f1": round(f1.compute().item(), 5), "preds": preds}
+        agree = (out["fp32"].pop("preds") == out["autocast"].pop("preds")).float().mean().item()
+        return {**out, "autocast_dtype": str(self.dtype), "agreement": round(agree, 5),
+                "f1_delta": round(out["autocast"]["macro_f1"] - out["fp32"]["macro_f1"], 5)}
@@ -0,0 +1,93 @@
+# wildlens-ai/utils/feature_cache.py
+"""
+Head-only training on cached backbone features (FEATURE_CACHE=1).
+
+While the backbone is frozen (epochs < freeze_epochs) every training step
+used to run the full ResNet-18 forward just to feed ``model.fc``. Instead:
+
+    train_f, val_f = feature_loaders(model, train, val, device)
+    # phase 1: criterion(model.fc(feats), y) on train_f, evaluate on val_f
+
+``extract`` runs the frozen backbone once, in eval mode, over the whole
+dataset and keeps the 512-d pooled features (float16 on disk, float32 in
+memory – 2 KB / image). With a ShardDataset the array is stored next to
+the shards as ``features-<backbone digest>.npy`` and reused by later runs
+and Optuna trials with the same weights.
+
+The loaders keep the original batch size and the *same*
+WeightedRandomSampler object as the image loader, so class balancing,
+focal loss and gradient accumulation see identical batches.
+
+Unlike the old phase 1 (``model.train()``), BatchNorm uses its ImageNet
+running statistics while features are extracted and is not re-estimated
+on our data before fine-tuning starts.
+"""
+from __future__ import annotations
+import time, hashlib
+from pathlib import Path
+
+import numpy as np
+import torch
+from torch import nn
+from torch.utils.data import DataLoader, TensorDataset
+
+
+def backbone(model: nn.Module) -> nn.Module:
+    """Everything up to (not including) ``model.fc``, flattened to [N, 512]."""
+    return nn.Sequential(*[m for name, m in model.named_children() if name != "fc"], nn.Flatten())
+
+
+def weights_digest(module: nn.Module) -> str:
+    h = hashlib.blake2b(digest_size=8)
+    for name, t in module.state_dict().items():
+        h.update(name.encode()); h.update(t.detach().cpu().contiguous().numpy().tobytes())
+    return h.hexdigest()
+
+
+@torch.no_grad()
+def extract(model: nn.Module, dataset, batch_size: int, collate_fn=None,
+            num_workers: int = 0, device: str = "cpu") -> torch.Tensor:
+    """[len(dataset), 512] float32 features, in dataset order."""
+    net, was_training = backbone(model).eval(), model.training
+    loader = DataLoader(dataset, batch_size=batch_size, shuffle=False,
+                        collate_fn=collate_fn, num_workers=num_workers)
+    feats = [net(xb.to(device)).float().cpu() for xb, _ in loader]
+    model.train(was_training)
+    return torch.cat(feats) if feats else torch.empty(0, model.fc.in_features)
+
+
+def cached_features(model: nn.Module, train_loader, device: str = "cpu") -> torch.Tensor:
+    """Features for the full dataset behind ``train_loader`` (Subset of it)."""
+    full_ds = train_loader.dataset.dataset
+    store   = getattr(full_ds, "dir", None)                 # ShardDataset → next to the shards
+    path    = Path(store) / f"features-{weights_digest(backbone(model))}.npy" if store else None
+    if path is not None and path.exists():
+        feats = torch.from_numpy(np.load(path).astype(np.float32))
+        if len(feats) == len(full_ds):
+            print(f"[FEAT] {len(feats):,} cached backbone features ← {path.name}")
+            return feats
+
+    t0 = time.perf_counter()
+    feats = extract(model, full_ds, max(train_loader.batch_size, 64), train_loader.collate_fn,
+                    train_loader.num_workers, device)
+    print(f"[FEAT] {len(feats):,} × {feats.shape[1]} backbone features in "
+          f"{time.perf_counter() - t0:.1f}s")
+    compact = feats.numpy().astype(np.float16)       # first and cached runs see the same values
+    if path is not None:
+        tmp = path.with_suffix(".tmp.npy")
+        np.save(tmp, compact)
+        tmp.replace(path)
+    return torch.from_numpy(compact.astype(np.float32))
+
+
+def feature_loaders(model: nn.Module, train, val, device: str = "cpu"):
+    """(train, val) loaders over cached features, mirroring the image loaders."""
+    feats   = cached_features(model, train, device)
+    targets = torch.tensor(train.dataset.dataset.targets)
+
+    def subset(loader):
+        idx = torch.tensor(loader.dataset.indices)
+        return TensorDataset(feats[idx], targets[idx])
+
+    return (DataLoader(subset(train), batch_size=train.batch_size, sampler=train.sampler),
+            DataLoader(subset(val), batch_size=val.batch_size, shuffle=False))
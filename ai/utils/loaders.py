@@ -0,0 +1,115 @@
+# wildlens-ai/utils/loaders.py
+"""
+DataLoader settings sized from the host, plus a loader-only throughput probe.
+
+    kw = loader_config(batch_size=32)         # num_workers, prefetch_factor, …
+    DataLoader(ds, batch_size=32, **kw)
+    print(format_probe(probe(loader)))        # images/s without the model
+
+Auto sizing:
+
+    cpus        sched_getaffinity ∩ cgroup cpu.max quota (containers)
+    workers     cpus - 1 (the main process runs the training step), at most
+                8, and only as many as fit in half of MemAvailable at
+                LOADER_WORKER_MB each; 0 on a single core
+    prefetch    2 batches per worker, 4 when memory is plentiful
+    persistent  whenever there are workers (no re-fork every epoch)
+    pin_memory  only with CUDA – pinning buys nothing on CPU-only boxes
+
+Environment overrides (each one wins over the auto value): NUM_WORKERS,
+PREFETCH_FACTOR, PERSISTENT_WORKERS, PIN_MEMORY.
+"""
+from __future__ import annotations
+import os, time
+from pathlib import Path
+
+import torch
+
+WORKER_MB   = int(os.getenv("LOADER_WORKER_MB", 400))     # RSS budget per worker
+MAX_WORKERS = 8
+
+
+def available_cpus() -> int:
+    try:
+        n = len(os.sched_getaffinity(0))
+    except AttributeError:                           # macOS / Windows
+        n = os.cpu_count() or 1
+    try:                                             # cgroup v2 quota, e.g. "200000 100000"
+        quota, period = Path("/sys/fs/cgroup/cpu.max").read_text().split()
+        if quota != "max":
+            n = min(n, max(1, int(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return max(1, n)
+
+
+def available_memory_mb() -> int:
+    try:
+        for line in Path("/proc/meminfo").read_text().splitlines():
+            if line.startswith("MemAvailable:"):
+                return int(line.split()[1]) // 1024
+    except OSError:
+        pass
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE") // 2**20
+    except (ValueError, OSError, AttributeError):
+        return 4096
+
+
+def _env_bool(name: str):
+    raw = os.getenv(name)
+    return None if raw in (None, "") else raw.lower() not in ("0", "false", "no")
+
+
+def loader_config(batch_size: int = 32) -> dict:
+    """DataLoader kwargs for this host; env overrides applied."""
+    cpus, mem_mb = available_cpus(), available_memory_mb()
+    auto = min(cpus - 1, MAX_WORKERS, (mem_mb // 2) // WORKER_MB)
+    workers = int(os.getenv("NUM_WORKERS") or max(0, auto))
+
+    cfg = {"num_workers": workers,
+           "pin_memory": torch.cuda.is_available() if _env_bool("PIN_MEMORY") is None
+                         else _env_bool("PIN_MEMORY")}
+    if workers > 0:
+        plenty = mem_mb > 4 * workers * WORKER_MB
+        cfg["prefetch_factor"] = int(os.getenv("PREFETCH_FACTOR") or (4 if plenty else 2))
+        persistent = _env_bool("PERSISTENT_WORKERS")
+        cfg["persistent_workers"] = True if persistent is None else persistent
+    return cfg
+
+
+def describe(cfg: dict) -> str:
+    return (f"workers={cfg['num_workers']} prefetch={cfg.get('prefetch_factor', '-')} "
+            f"persistent={cfg.get('persistent_workers', False)} pin={cfg['pin_memory']} "
+            f"(cpus={available_cpus()}, mem_avail={available_memory_mb()} MB)")
+
+
+def probe(loader, batches: int = 50, warmup: int = 2) -> dict:
+    """Iterate the loader alone (no model) and time it."""
+    it, n_img, waits = iter(loader), 0, []
+    t_first = time.perf_counter()
+    for _ in range(warmup):                          # worker start-up, first prefetch
+        try:
+            next(it)
+        except StopIteration:
+            break
+    startup = time.perf_counter() - t_first
+    t0 = time.perf_counter()
+    for _ in range(batches):
+        t = time.perf_counter()
+        try:
+            xb, _ = next(it)
+        except StopIteration:
+            break
+        waits.append(time.perf_counter() - t)
+        n_img += len(xb)
+    secs = time.perf_counter() - t0
+    return {"batches": len(waits), "images": n_img, "seconds": round(secs, 3),
+            "images_per_s": round(n_img / secs, 1) if secs else 0.0,
+            "batch_ms_mean": round(1000 * sum(waits) / len(waits), 2) if waits else 0.0,
+            "startup_s": round(startup, 3)}
+
+
+def format_probe(result: dict) -> str:
+    return (f"{result['images_per_s']} images/s over {result['batches']} batches "
+            f"({result['batch_ms_mean']} ms/batch, start-up {result['startup_s']}s)")
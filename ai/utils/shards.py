@@ -0,0 +1,143 @@
+# wildlens-ai/utils/shards.py
+"""
+Decode once, train many epochs: resized uint8 image shards.
+
+    ds = shard_dataset(root)                 # builds on first use, then reuses
+    DataLoader(ds, batch_size=32, collate_fn=ds.collate)
+
+``build_shards`` decodes every image of an ImageFolder tree once, applies
+the training ``Resize((224, 224))`` (PIL bilinear, same pixels as the
+ImageFolder path) and stores the result as ``.npy`` shards of uint8 HWC
+images next to an ``index.json`` (classes, samples, shard / row per
+sample). Shards live in SHARD_DIR (default <DATASET_CACHE_DIR>/shards),
+keyed by the dataset version + image size, so every run and Optuna trial
+on the same data reuses them. With DATASET_CACHE=0 train_model.py puts
+them in the run's temp dir instead, as such a root is never seen twice.
+
+``ShardDataset`` memory-maps the shards lazily in each process (workers
+never pickle the arrays) and returns views; ``collate`` stacks a batch and
+applies ToTensor + Normalize to the whole batch in one fused multiply-add.
+Unreadable images are left out of the index, as ImageFolder would fail on them.
+"""
+from __future__ import annotations
+import os, json, time, shutil
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import torch
+from PIL import Image
+
+from .dataset_cache import CACHE_DIR, META, DatasetCache
+
+SHARD_DIR    = Path(os.getenv("SHARD_DIR", CACHE_DIR / "shards"))
+SHARD_IMAGES = int(os.getenv("SHARD_IMAGES", 1024))          # images per .npy file
+IMG_SIZE     = 224
+IMNET_MEAN   = (0.485, 0.456, 0.406)
+IMNET_STD    = (0.229, 0.224, 0.225)
+INDEX        = "index.json"
+
+# x_norm = (u8 / 255 - mean) / std  ==  u8 * _SCALE + _SHIFT
+_SCALE = (1.0 / (255.0 * torch.tensor(IMNET_STD))).view(1, 3, 1, 1)
+_SHIFT = (-torch.tensor(IMNET_MEAN) / torch.tensor(IMNET_STD)).view(1, 3, 1, 1)
+
+
+def _decode(path: Path, size: int) -> np.ndarray | None:
+    try:
+        with Image.open(path) as im:
+            return np.asarray(im.convert("RGB").resize((size, size), Image.BILINEAR))
+    except Exception:                                # corrupt / not an image
+        return None
+
+
+def dataset_key(root: Path) -> str:
+    """Version key of an ImageFolder root (dataset-cache versions carry theirs)."""
+    meta = Path(root) / META
+    if meta.exists():
+        return json.loads(meta.read_text())["key"]
+    return DatasetCache.key_for_dir(Path(root))
+
+
+def build_shards(root: Path, out: Path, size: int = IMG_SIZE,
+                 shard_images: int = SHARD_IMAGES, workers: int | None = None) -> dict:
+    """Decode + resize every image under root into out/ (atomically); returns the index."""
+    root = Path(root)
+    classes = sorted(d.name for d in root.iterdir() if d.is_dir() and not d.name.startswith("."))
+    files = [(p, t) for t, c in enumerate(classes)
+             for p in sorted((root / c).rglob("*")) if p.suffix.lower() in (".jpg", ".jpeg", ".png")]
+    tmp = out.with_name(f".{out.name}.{os.getpid()}.tmp")
+    shutil.rmtree(tmp, ignore_errors=True); tmp.mkdir(parents=True)
+
+    t0, samples, shards = time.perf_counter(), [], []
+    with ThreadPoolExecutor(workers or os.cpu_count() or 1) as pool:
+        for s, start in enumerate(range(0, len(files), shard_images)):
+            chunk = files[start:start + shard_images]
+            name  = f"shard-{s:05d}.npy"
+            arr   = np.lib.format.open_memmap(tmp / name, mode="w+", dtype=np.uint8,
+                                              shape=(len(chunk), size, size, 3))
+            for row, ((path, target), img) in enumerate(
+                    zip(chunk, pool.map(lambda ft: _decode(ft[0], size), chunk))):
+                if img is None:
+                    print(f"[WARN] shards: skipped unreadable {path}")
+                    continue
+                arr[row] = img
+                samples.append([path.relative_to(root).as_posix(), target, s, row])
+            arr.flush(); del arr
+            shards.append(name)
+
+    index = {"classes": classes, "size": size, "shards": shards, "samples": samples,
+             "built_s": round(time.perf_counter() - t0, 2)}
+    (tmp / INDEX).write_text(json.dumps(index))
+    try:
+        os.replace(tmp, out)
+    except OSError:                                  # built concurrently by another trial
+        shutil.rmtree(tmp, ignore_errors=True)
+    return index
+
+
+class ShardDataset(torch.utils.data.Dataset):
+    """(uint8 HWC view, target) per sample; use ``collate`` to get normalized batches."""
+
+    def __init__(self, shard_dir: Path, root: Path | None = None):
+        self.dir   = Path(shard_dir)
+        index      = json.loads((self.dir / INDEX).read_text())
+        self.classes      = index["classes"]
+        self.class_to_idx = {c: i for i, c in enumerate(self.classes)}
+        self.size         = index["size"]
+        self._files       = index["shards"]
+        self._loc         = [(s, r) for _, _, s, r in index["samples"]]
+        self.targets      = [t for _, t, _, _ in index["samples"]]
+        base = Path(root) if root is not None else self.dir
+        self.samples      = [(str(base / rel), t) for rel, t, _, _ in index["samples"]]
+        self._arrays      = None
+
+    def __getstate__(self):                          # DataLoader workers re-open the maps
+        return {**self.__dict__, "_arrays": None}
+
+    def __len__(self):
+        return len(self._loc)
+
+    def __getitem__(self, i):
+        if self._arrays is None:
+            self._arrays = [np.load(self.dir / f, mmap_mode="r") for f in self._files]
+        s, r = self._loc[i]
+        return self._arrays[s][r], self.targets[i]
+
+    @staticmethod
+    def collate(batch):
+        imgs, targets = zip(*batch)
+        x = torch.from_numpy(np.stack(imgs)).permute(0, 3, 1, 2)
+        x = x.to(torch.float32, memory_format=torch.contiguous_format).mul_(_SCALE).add_(_SHIFT)
+        return x, torch.tensor(targets)
+
+
+def shard_dataset(root: Path, size: int = IMG_SIZE, shard_dir: Path | None = None) -> ShardDataset:
+    """ShardDataset for an ImageFolder root, building the shards on first use."""
+    out = Path(shard_dir or SHARD_DIR) / f"{dataset_key(root)}-{size}"
+    if not (out / INDEX).exists():
+        print(f"[DATA] building {size}px shards → {out}")
+        index = build_shards(root, out, size)
+        print(f"[DATA] {len(index['samples']):,} images in {index['built_s']}s")
+    else:
+        os.utime(out / INDEX)                        # last use, for eviction
+    return ShardDataset(out, root)
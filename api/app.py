@@ -4,23 +4,37 @@ ai/app.py – WildLens AI micro-service
 ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
 • Streams each upload directly into RAM; prediction images are *never* saved.
-• Works with either:
-    1. a TorchScript file produced by ``torch.jit.save(model)``, or
-    2. the training script’s ``torch.save({"classes": classes, **state_dict})``
-• Uses the same normalization that the training pipeline applied.
+• Serves the runtime of the run chosen at export (``ai/runtimes.py``):
+  eager checkpoint, TorchScript, INT8-quantized or ONNX – or the one named
+  by INFERENCE_BACKEND. A MODEL_PATH other than <run>/model.pt (custom
+  name, .ts, TorchScript saved as .pt) is served as that file.
+• Uses the same Resize((224,224)) + normalization as the training pipeline
+  (``ai.preprocess``: draft-mode JPEG decode, fused normalize, stage timing).
+• ``/predict/batch`` accepts many files (or one zip/tar archive) and streams
+  NDJSON results back chunk by chunk.
+• Concurrent requests are grouped into batched forward passes by
+  ``ai.batching.MicroBatcher`` (tune with BATCH_MAX_SIZE / BATCH_MAX_WAIT_MS).
+• Re-submitted photos are answered from ``ai.cache.PredictionCache`` (keyed by
+  the upload's content hash + run-id) without decoding or inference.
 """
 
 from fastapi import FastAPI, UploadFile, File, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
+from contextlib import asynccontextmanager
 from pathlib import Path
-from PIL import Image
+import asyncio
 import io
 import os
+import tarfile
+import zipfile
 import torch
 import json
-from torchvision import transforms, models
-from ai.predict import _latest_run
+from ai.predict import _latest_run, registry
+from ai.preprocess import StageTimer, preprocess
+from ai.batching import MicroBatcher
+from ai import cache as prediction_cache
 
 from ai.api.hpsearch import router as hpsearch_router
 
@@ -36,13 +50,27 @@ else:
     MODEL_PATH = _latest_run() / "model.pt"
 DEVICE     = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 
+BATCH_MAX_SIZE    = int(os.getenv("BATCH_MAX_SIZE", 8))
+BATCH_MAX_WAIT_MS = float(os.getenv("BATCH_MAX_WAIT_MS", 10))
+BATCH_MAX_FILES   = int(os.getenv("BATCH_MAX_FILES", 512))     # per /predict/batch call
+BATCH_MAX_BYTES   = int(float(os.getenv("BATCH_MAX_MB", 256)) * 1e6)   # uncompressed, per call
+IMAGE_EXTS        = {".jpg", ".jpeg", ".png", ".bmp", ".webp", ".tif", ".tiff"}
+
 # ──────────────────────────────────────────────────────────────
 # FastAPI instance (one per process)
 # ──────────────────────────────────────────────────────────────
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # the batcher's queue must live on the server's event loop
+    await batcher.start()
+    yield
+    await batcher.stop()
+
 app = FastAPI(
     title="WildLens Footprint Classifier",
     description="Stateless species-prediction micro-service",
     version="1.0",
+    lifespan=lifespan,
 )
 
 app.include_router(hpsearch_router)
@@ -61,32 +89,67 @@ app.add_middleware(
 if not MODEL_PATH.exists():
     raise RuntimeError(f"Model weights not found: {MODEL_PATH}")
 
-ckpt = torch.load(MODEL_PATH, map_location=DEVICE)
+# eager / TorchScript / INT8 / ONNX – chosen by INFERENCE_BACKEND (default
+# "auto" = the parity-checked pick recorded at export); the variants live
+# next to MODEL_PATH, a non-standard MODEL_PATH file is served as-is
+model, classes = registry.get(DEVICE, MODEL_PATH)
 
-if isinstance(ckpt, torch.jit.ScriptModule):
-    # TorchScript path
-    model   = ckpt
-    classes = os.getenv("CLASSES", "").split(",")  # fallback if wanted
-else:
-    classes = ckpt.get("classes")
-    if classes is None:
-        labels_file = MODEL_PATH.parent / "labels.json"
-        classes = json.loads(labels_file.read_text())
+timings = StageTimer()
 
-    model = models.resnet18(weights=None)
-    model.fc = torch.nn.Linear(model.fc.in_features, len(classes))
+cache = prediction_cache.from_env("api")          # response dicts, apart from ai.predict
+cache.bind_run(MODEL_PATH.parent.name if MODEL_PATH.name == "model.pt"
+               else f"{MODEL_PATH.parent.name}-{MODEL_PATH.stem}")
 
-    # the *actual* weights live under "state_dict" in your checkpoint
-    state_dict = ckpt["state_dict"] if "state_dict" in ckpt else ckpt
-    model.load_state_dict(state_dict)
+batcher = MicroBatcher(model, max_batch_size=BATCH_MAX_SIZE,
+                       max_wait_ms=BATCH_MAX_WAIT_MS, device=DEVICE)
 
-model.to(DEVICE).eval()
+def _decode(img_bytes: bytes) -> torch.Tensor:
+    return preprocess(io.BytesIO(img_bytes), timer=timings)
+
+async def _safe_decode(img_bytes: bytes):
+    try:
+        return await run_in_threadpool(_decode, img_bytes)
+    except Exception:
+        return None
 
-transform = transforms.Compose([
-    transforms.ToTensor(),
-    transforms.Normalize([0.485, 0.456, 0.406],
-                         [0.229, 0.224, 0.225]),
-])
+def _label(idx: int):
+    return classes[idx] if classes else idx
+
+def _too_large(detail: str):
+    raise HTTPException(status_code=413, detail=detail)
+
+def _read_archive(fileobj, max_files: int = BATCH_MAX_FILES,
+                  max_bytes: int = BATCH_MAX_BYTES) -> list[tuple[str, bytes]]:
+    """
+    Pull every image member out of a zip or tar (optionally compressed).
+    Limits are checked on the headers before any member is decompressed:
+    the zip central directory up front, tar headers as they stream by.
+    """
+    items = []
+    if zipfile.is_zipfile(fileobj):
+        fileobj.seek(0)
+        with zipfile.ZipFile(fileobj) as zf:
+            infos = [i for i in zf.infolist()
+                     if not i.is_dir() and Path(i.filename).suffix.lower() in IMAGE_EXTS]
+            if len(infos) > max_files:
+                _too_large(f"At most {max_files} images in the archive")
+            if sum(i.file_size for i in infos) > max_bytes:    # reads stop at file_size
+                _too_large(f"Archive expands to more than {max_bytes / 1e6:.1f} MB")
+            for info in infos:
+                items.append((info.filename, zf.read(info)))
+    else:
+        fileobj.seek(0)
+        total = 0
+        with tarfile.open(fileobj=fileobj, mode="r:*") as tf:
+            for member in tf:
+                if member.isfile() and Path(member.name).suffix.lower() in IMAGE_EXTS:
+                    total += member.size
+                    if len(items) >= max_files:
+                        _too_large(f"At most {max_files} images in the archive")
+                    if total > max_bytes:
+                        _too_large(f"Archive expands to more than {max_bytes / 1e6:.1f} MB")
+                    items.append((member.name, tf.extractfile(member).read()))
+    return items
 
 # ──────────────────────────────────────────────────────────────
 # Routes
@@ -101,6 +164,12 @@ async def health():
     """Docker healthcheck endpoint."""
     return {"status": "ok"}
 
+@app.get("/metrics", tags=["health"])
+async def metrics():
+    """Batching counters, per-stage preprocessing latency, loaded runtime."""
+    return {"batcher": batcher.stats(), "preprocess": timings.stats(),
+            "model": registry.stats(), "cache": cache.stats()}
+
 @app.post("/predict", tags=["inference"])
 async def predict(file: UploadFile = File(...)):
     """
@@ -110,21 +179,100 @@ async def predict(file: UploadFile = File(...)):
     if file.content_type.split("/")[0] != "image":
         raise HTTPException(status_code=415, detail="File must be an image/*")
 
+    img_bytes = await file.read()
+    key = prediction_cache.digest(img_bytes)
+    hit = cache.get(key)
+    if hit is not None:
+        return JSONResponse(hit)
+
     try:
-        img_bytes = await file.read()
-        img = Image.open(io.BytesIO(img_bytes)).convert("RGB")
+        # decoding is CPU-bound → keep it off the event loop
+        tensor = await run_in_threadpool(_decode, img_bytes)
     except Exception:
         raise HTTPException(status_code=400, detail="Could not read image")
 
-    tensor = transform(img).unsqueeze(0).to(DEVICE)
+    probs = await batcher.submit(tensor)
+    conf, idx = torch.max(probs, 0)
+
+    result = {"species": _label(int(idx.item())), "confidence": round(conf.item(), 6)}
+    cache.put(key, result)
+    return JSONResponse(result)
+
+@app.post("/predict/batch", tags=["inference"])
+async def predict_batch(files: list[UploadFile] | None = File(None),
+                        archive: UploadFile | None = File(None)):
+    """
+    Accept **many** images – repeated multipart “files” fields and/or one
+    zip/tar “archive” – and stream one NDJSON line per image:
+
+        {"file": "IMG_0001.JPG", "species": "Ours", "confidence": 0.93}
+        {"file": "notes.jpg",    "error": "Could not read image"}
+
+    Images are decoded concurrently; each chunk of ``BATCH_MAX_SIZE`` images
+    goes through the batcher while the next chunk is being decoded. Images
+    already in the prediction cache skip both steps.
+    """
+    if len(files or []) > BATCH_MAX_FILES:
+        _too_large(f"At most {BATCH_MAX_FILES} images per request")
+    items: list[tuple[str, bytes]] = []
+    used = 0
+    for f in files or []:
+        # size is known once the part is spooled → refuse before reading it
+        if used + (f.size or 0) > BATCH_MAX_BYTES:
+            _too_large(f"Uploads exceed {BATCH_MAX_BYTES / 1e6:.1f} MB per request")
+        data = await f.read()
+        used += len(data)
+        if used > BATCH_MAX_BYTES:                    # part without a declared size
+            _too_large(f"Uploads exceed {BATCH_MAX_BYTES / 1e6:.1f} MB per request")
+        items.append((f.filename, data))
+    if archive is not None:
+        try:
+            items += await run_in_threadpool(_read_archive, archive.file,
+                                             BATCH_MAX_FILES - len(items), BATCH_MAX_BYTES - used)
+        except (tarfile.TarError, zipfile.BadZipFile):
+            raise HTTPException(status_code=400, detail="Archive must be zip or tar")
+
+    if not items:
+        raise HTTPException(status_code=400, detail="No images supplied")
+    if len(items) > BATCH_MAX_FILES:
+        raise HTTPException(status_code=413,
+                            detail=f"At most {BATCH_MAX_FILES} images per request")
+
+    chunks = [items[i:i + BATCH_MAX_SIZE] for i in range(0, len(items), BATCH_MAX_SIZE)]
+
+    async def _prepare(chunk):
+        """→ (keys, cache hits, tensors) – a cache hit is not decoded at all."""
+        keys = [prediction_cache.digest(b) for _, b in chunk]
+        hits = [cache.get(key) for key in keys]
+        tensors = await asyncio.gather(*(_safe_decode(b) for (_, b), hit in zip(chunk, hits)
+                                         if hit is None))
+        it = iter(tensors)
+        return keys, hits, [None if hit is not None else next(it) for hit in hits]
 
-    with torch.no_grad():
-        logits = model(tensor)
-        probs  = torch.softmax(logits, dim=1)
-        conf, idx = torch.max(probs, 1)
+    async def _stream():
+        pending = asyncio.ensure_future(_prepare(chunks[0]))
+        for k, chunk in enumerate(chunks):
+            keys, hits, tensors = await pending
+            # overlap: decode chunk k+1 while chunk k is in the model
+            if k + 1 < len(chunks):
+                pending = asyncio.ensure_future(_prepare(chunks[k + 1]))
+            ok    = [i for i, t in enumerate(tensors) if t is not None]
+            probs = await batcher.submit_many([tensors[i] for i in ok])
+            by_i  = dict(zip(ok, probs))
+            for i, (name, _) in enumerate(chunk):
+                if hits[i] is not None:
+                    row = {"file": name, **hits[i]}
+                elif i not in by_i:
+                    row = {"file": name, "error": "Could not read image"}
+                else:
+                    conf, idx = torch.max(by_i[i], 0)
+                    result = {"species": _label(idx.item()),
+                              "confidence": round(conf.item(), 6)}
+                    cache.put(keys[i], result)
+                    row = {"file": name, **result}
+                yield json.dumps(row, ensure_ascii=False) + "\n"
 
-    label = classes[idx.item()] if classes else int(idx.item())
-    return JSONResponse({"species": label, "confidence": round(conf.item(), 6)})
+    return StreamingResponse(_stream(), media_type="application/x-ndjson")
 
 # ──────────────────────────────────────────────────────────────
 # Local dev entry-point
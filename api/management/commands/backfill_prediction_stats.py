@@ -0,0 +1,39 @@
+# api/management/commands/backfill_prediction_stats.py
+"""
+Rebuild the running per-user prediction statistics (prediction_stats).
+
+    python manage.py backfill_prediction_stats              # every user
+    python manage.py backfill_prediction_stats --user <uuid>
+
+Runs rebuild_prediction_stats() (dashboard/sql/prediction_stats.sql) in
+Postgres with the service-role key – the counting never leaves the
+database. Needed once after applying the SQL, and after bulk fixes made
+with the triggers disabled.
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from postgrest.exceptions import APIError
+
+from wildlens_backend.supabase_util import client_for_token
+
+
+class Command(BaseCommand):
+    help = "Rebuild prediction_stats from the predictions table."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", help="only this user id (default: everyone)")
+        parser.add_argument("--key", default=settings.SUPABASE_SERVICE_KEY,
+                            help="service-role key (default: $SUPABASE_SERVICE_KEY)")
+
+    def handle(self, *args, user=None, key=None, **options):
+        if not key:
+            raise CommandError("SUPABASE_SERVICE_KEY (or --key) is required: "
+                               "rebuild_prediction_stats() is not granted to anon")
+        try:
+            rows = client_for_token(key).rpc("rebuild_prediction_stats",
+                                             {"p_user_id": user}).execute().data
+        except APIError as exc:
+            raise CommandError(f"rebuild_prediction_stats() failed: {exc.message} "
+                               "– is dashboard/sql/prediction_stats.sql applied?")
+        scope = f"user {user}" if user else "all users"
+        self.stdout.write(self.style.SUCCESS(f"prediction_stats rebuilt for {scope}: {rows} rows"))
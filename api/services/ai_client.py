@@ -1,12 +1,237 @@
-import httpx, os
-AI_URL = os.getenv("AI_SERVICE_URL", "http://ai:8001")  # matches compose
+"""
+api/services/ai_client.py – shared HTTP client for Django → AI service calls
+===========================================================================
+
+One keep-alive connection pool per worker process instead of a fresh TCP
+connection per call:
+
+• ``httpx.Client`` (sync views) / ``httpx.AsyncClient`` (ASGI views, one per
+  event loop) with HTTP/2 when the ``h2`` package is installed;
+• uploads are streamed from the file object – never read into one big bytes;
+• transport errors and 502/503/504 are retried with jittered exponential
+  backoff (non-idempotent calls only when the connection was never made);
+• a circuit breaker fails fast with ``CircuitOpenError`` after
+  AI_BREAKER_FAILURES consecutive failures, for AI_BREAKER_RESET seconds;
+  then ONE trial request is let through (the others keep failing fast)
+  and its outcome closes or re-opens the circuit.
+
+AI_SERVICE_URL may be the service root (compose) or the old ``…/predict``
+endpoint; both are accepted.
+"""
+
+from __future__ import annotations
+import asyncio, os, random, threading, time, weakref
+
+import httpx
+
+
+def _base_url(url: str) -> str:
+    url = url.rstrip("/")
+    return url[: -len("/predict")] if url.endswith("/predict") else url
+
+
+AI_URL = _base_url(os.getenv("AI_SERVICE_URL", "http://ai:8001"))  # matches compose
+
+TIMEOUT = httpx.Timeout(float(os.getenv("AI_TIMEOUT", 10)),
+                        connect=float(os.getenv("AI_CONNECT_TIMEOUT", 2)))
+LIMITS  = httpx.Limits(max_connections=int(os.getenv("AI_MAX_CONNECTIONS", 20)),
+                       max_keepalive_connections=int(os.getenv("AI_MAX_KEEPALIVE", 10)),
+                       keepalive_expiry=30.0)
+RETRIES = int(os.getenv("AI_RETRIES", 2))
+BACKOFF = float(os.getenv("AI_BACKOFF_SECONDS", 0.2))
+RETRY_STATUS = {502, 503, 504}
+
+try:
+    import h2  # noqa: F401 – enables httpx's HTTP/2 support
+    HTTP2 = os.getenv("AI_HTTP2", "1") != "0"
+except ImportError:
+    HTTP2 = False
+
+
+# ─────────────────────────── circuit breaker ───────────────────────────
+class CircuitOpenError(httpx.TransportError):
+    """Raised without touching the network while the breaker is open."""
+
+
+class CircuitBreaker:
+    """closed → (N failures) → open → (reset_seconds) → half-open → closed/open"""
+
+    def __init__(self, failures: int = 5, reset_seconds: float = 30.0):
+        self.max_failures  = failures
+        self.reset_seconds = reset_seconds
+        self.failures  = 0
+        self.opened_at = None
+        self.trial_at  = None                    # the half-open trial in flight
+        self.trips     = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            return "half-open"
+        return "open"
+
+    def check(self):
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return
+            if state == "half-open":
+                now = time.monotonic()
+                # one trial at a time; a trial that never reported back expires
+                if self.trial_at is None or now - self.trial_at >= self.reset_seconds:
+                    self.trial_at = now
+                    return
+        raise CircuitOpenError("AI service circuit open – failing fast")
+
+    def success(self):
+        with self._lock:
+            self.failures, self.opened_at, self.trial_at = 0, None, None
+
+    def failure(self):
+        with self._lock:
+            self.failures += 1
+            self.trial_at = None
+            if self.state == "half-open" or self.failures >= self.max_failures:
+                if self.opened_at is None or self.state == "half-open":
+                    self.trips += 1
+                self.opened_at = time.monotonic()
+
+
+breaker = CircuitBreaker(failures=int(os.getenv("AI_BREAKER_FAILURES", 5)),
+                         reset_seconds=float(os.getenv("AI_BREAKER_RESET", 30)))
+
+_counters = {"requests": 0, "retries": 0, "failures": 0}
+
+
+def _backoff(attempt: int) -> float:
+    return BACKOFF * (2 ** attempt) * random.uniform(0.5, 1.5)
+
+
+def _should_retry(exc: Exception | None, resp: httpx.Response | None, idempotent: bool) -> bool:
+    if exc is not None:
+        # a non-idempotent request may only be replayed if it never left
+        return idempotent or isinstance(exc, (httpx.ConnectError, httpx.ConnectTimeout))
+    return idempotent and resp.status_code in RETRY_STATUS
+
+
+def _rewind(kwargs):
+    for _, field in (kwargs.get("files") or {}).items():
+        fobj = field[1] if isinstance(field, tuple) else field
+        if hasattr(fobj, "seek"):
+            fobj.seek(0)
+
+
+# ─────────────────────────── sync client ───────────────────────────────
+_client: httpx.Client | None = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+
+def client() -> httpx.Client:
+    """The process-wide pooled client (re-created after a fork)."""
+    global _client, _client_pid
+    if _client is None or _client_pid != os.getpid():
+        with _client_lock:
+            if _client is None or _client_pid != os.getpid():
+                _client = httpx.Client(base_url=AI_URL, timeout=TIMEOUT,
+                                       limits=LIMITS, http2=HTTP2)
+                _client_pid = os.getpid()
+    return _client
+
+
+def request(method: str, path: str, idempotent: bool = True, **kwargs) -> httpx.Response:
+    """Pooled request with retries + circuit breaker; raises for HTTP errors."""
+    breaker.check()
+    for attempt in range(RETRIES + 1):
+        exc = resp = None
+        _rewind(kwargs)
+        _counters["requests"] += 1
+        try:
+            resp = client().request(method, path, **kwargs)
+        except httpx.TransportError as e:
+            exc = e
+        if attempt < RETRIES and _should_retry(exc, resp, idempotent):
+            _counters["retries"] += 1
+            time.sleep(_backoff(attempt))
+            continue
+        break
+    return _finish(exc, resp)
+
+
+def _finish(exc, resp) -> httpx.Response:
+    if exc is not None or resp.status_code in RETRY_STATUS:
+        _counters["failures"] += 1
+        breaker.failure()
+    else:
+        breaker.success()
+    if exc is not None:
+        raise exc
+    resp.raise_for_status()
+    return resp
+
+
+# ─────────────────────────── async client ──────────────────────────────
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = \
+    weakref.WeakKeyDictionary()
+
+
+def async_client() -> httpx.AsyncClient:
+    """Pooled client for the running event loop (connections are loop-bound)."""
+    loop = asyncio.get_running_loop()
+    ac = _async_clients.get(loop)
+    if ac is None:
+        ac = _async_clients[loop] = httpx.AsyncClient(base_url=AI_URL, timeout=TIMEOUT,
+                                                      limits=LIMITS, http2=HTTP2)
+    return ac
+
+
+async def arequest(method: str, path: str, idempotent: bool = True, **kwargs) -> httpx.Response:
+    """Async twin of ``request()``."""
+    breaker.check()
+    for attempt in range(RETRIES + 1):
+        exc = resp = None
+        _rewind(kwargs)
+        _counters["requests"] += 1
+        try:
+            resp = await async_client().request(method, path, **kwargs)
+        except httpx.TransportError as e:
+            exc = e
+        if attempt < RETRIES and _should_retry(exc, resp, idempotent):
+            _counters["retries"] += 1
+            await asyncio.sleep(_backoff(attempt))
+            continue
+        break
+    return _finish(exc, resp)
+
+
+# ─────────────────────────── endpoints ─────────────────────────────────
+def _upload(fileobj, filename, content_type):
+    # httpx streams file objects in chunks – the upload is never copied whole
+    return {"file": (filename or "upload", fileobj, content_type or "application/octet-stream")}
+
+
+def predict(fileobj, filename: str | None = None, content_type: str | None = None) -> dict:
+    return request("POST", "/predict", files=_upload(fileobj, filename, content_type)).json()
+
+
+async def apredict(fileobj, filename: str | None = None, content_type: str | None = None) -> dict:
+    resp = await arequest("POST", "/predict", files=_upload(fileobj, filename, content_type))
+    return resp.json()
+
 
 def launch_hp_search(trials: int = 20, study: str = "prod"):
-    r = httpx.post(f"{AI_URL}/hpsearch/", json={"trials": trials, "study": study}, timeout=10.0)
-    r.raise_for_status()
+    r = request("POST", "/hpsearch/", idempotent=False,
+                json={"trials": trials, "study": study})
     return r.json()
 
+
 def download_best_config(study: str = "prod") -> str:
-    r = httpx.get(f"{AI_URL}/hpsearch/{study}/best", timeout=10.0)
-    r.raise_for_status()
-    return r.text
+    return request("GET", f"/hpsearch/{study}/best").text
+
+
+def stats() -> dict:
+    return {"base_url": AI_URL, "http2": HTTP2, "breaker": breaker.state,
+            "breaker_trips": breaker.trips, **_counters}
@@ -0,0 +1,268 @@
+# api/services/geo_index.py
+"""
+Clustered prediction map backed by an in-process spatial index.
+
+``prediction_locations_v`` is read once per scope (the user, or everyone
+with MAP_INDEX_SCOPE=global when the view is public) and kept for
+MAP_INDEX_TTL seconds. Points are projected to Web Mercator [0, 1)²; for
+each grid level L (2^L × 2^L cells) the cells are aggregated on first use
+and grouped by their ancestor tile, so a bounding-box query only visits
+the tiles it covers:
+
+    zoom z  →  level min(z + CLUSTER_SHIFT, MAX_LEVEL)   (8×8 cells per 256 px tile)
+
+A cluster is ``{"lat", "lon", "count", "species": {name: n, …}}`` (centroid,
+top MAP_TOP_SPECIES names). Vector tiles need the optional
+``mapbox-vector-tile`` package; GeoJSON works without it.
+"""
+import os, math, time, asyncio, threading
+from collections import OrderedDict
+
+try:                                       # optional: Mapbox Vector Tile output
+    import mapbox_vector_tile
+except ImportError:                        # pragma: no cover
+    mapbox_vector_tile = None
+
+SCOPE         = os.getenv("MAP_INDEX_SCOPE", "user")        # "user" | "global"
+TTL           = int(os.getenv("MAP_INDEX_TTL", 120))
+MAX_INDEXES   = int(os.getenv("MAP_INDEX_CACHE", 32))
+TOP_SPECIES   = int(os.getenv("MAP_TOP_SPECIES", 3))
+CLUSTER_SHIFT = 3
+MAX_LEVEL     = 20
+MAX_ZOOM      = MAX_LEVEL - CLUSTER_SHIFT
+FETCH_PAGE    = 1000                       # PostgREST max-rows on Supabase
+MAX_LAT       = 85.05112878
+MVT_EXTENT    = 4096
+
+VIEW = "prediction_locations_v"
+
+
+# ─── projection ───────────────────────────────────────────────────────────
+def project(lat: float, lon: float) -> tuple[float, float]:
+    lat = max(-MAX_LAT, min(MAX_LAT, lat))
+    s = math.sin(math.radians(lat))
+    x = (lon + 180.0) / 360.0
+    y = 0.5 - math.log((1 + s) / (1 - s)) / (4 * math.pi)
+    return min(max(x, 0.0), 1 - 1e-12), min(max(y, 0.0), 1 - 1e-12)
+
+
+def unproject(x: float, y: float) -> tuple[float, float]:
+    lon = x * 360.0 - 180.0
+    lat = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y))))
+    return lat, lon
+
+
+def parse_bbox(raw: str) -> tuple[float, float, float, float]:
+    """"minLon,minLat,maxLon,maxLat" → floats; ValueError when malformed."""
+    parts = [float(v) for v in (raw or "").split(",")]
+    if len(parts) != 4:
+        raise ValueError("bbox must be minLon,minLat,maxLon,maxLat")
+    if not all(math.isfinite(v) for v in parts):
+        raise ValueError("bbox values must be finite numbers")
+    min_lon, min_lat, max_lon, max_lat = parts
+    if min_lat > max_lat:
+        raise ValueError("bbox minLat > maxLat")
+    return min_lon, min_lat, max_lon, max_lat
+
+
+# ─── index ────────────────────────────────────────────────────────────────
+class GeoIndex:
+    """Projected points + lazily built per-level cluster grids."""
+
+    def __init__(self, rows: list[dict]):
+        self.species: list[str] = []
+        ids, xs, ys = {}, [], []
+        sp = []
+        for r in rows:
+            try:
+                lat, lon = float(r["lat"]), float(r["lon"])
+            except (TypeError, ValueError, KeyError):
+                continue                           # skip bad rows
+            x, y = project(lat, lon)
+            name = r.get("species_name") or "?"
+            if name not in ids:
+                ids[name] = len(self.species)
+                self.species.append(name)
+            xs.append(x); ys.append(y); sp.append(ids[name])
+        self.xs, self.ys, self.sp = xs, ys, sp
+        self.built_at = time.monotonic()
+        self._levels: dict[int, dict] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.xs)
+
+    def _level(self, level: int) -> dict:
+        """{(tx, ty) at level-CLUSTER_SHIFT: [[n, sum_x, sum_y, {species_id: n}], …]}"""
+        grid = self._levels.get(level)
+        if grid is not None:
+            return grid
+        with self._lock:
+            grid = self._levels.get(level)
+            if grid is None:
+                size, cells = 1 << level, {}
+                for x, y, s in zip(self.xs, self.ys, self.sp):
+                    key = (int(x * size), int(y * size))
+                    c = cells.get(key)
+                    if c is None:
+                        cells[key] = [1, x, y, {s: 1}]
+                    else:
+                        c[0] += 1; c[1] += x; c[2] += y
+                        c[3][s] = c[3].get(s, 0) + 1
+                shift, grid = min(CLUSTER_SHIFT, level), {}
+                for (cx, cy), c in cells.items():
+                    grid.setdefault((cx >> shift, cy >> shift), []).append(c)
+                self._levels[level] = grid
+        return grid
+
+    def _clusters(self, level, x0, y0, x1, y1):
+        grid  = self._level(level)
+        shift = min(CLUSTER_SHIFT, level)
+        size  = 1 << (level - shift)                    # tiles per side
+        tx0, ty0 = int(x0 * size), int(y0 * size)
+        tx1, ty1 = min(int(x1 * size), size - 1), min(int(y1 * size), size - 1)
+        if (tx1 - tx0 + 1) * (ty1 - ty0 + 1) <= len(grid):
+            buckets = (grid.get((tx, ty), ()) for tx in range(tx0, tx1 + 1)
+                                              for ty in range(ty0, ty1 + 1))
+        else:                                           # huge box, sparse grid
+            buckets = (cells for (tx, ty), cells in grid.items()
+                       if tx0 <= tx <= tx1 and ty0 <= ty <= ty1)
+        for cells in buckets:
+            for c in cells:
+                cx, cy = c[1] / c[0], c[2] / c[0]
+                if x0 <= cx <= x1 and y0 <= cy <= y1:
+                    yield c, cx, cy
+
+    def _cluster_json(self, c, cx, cy) -> dict:
+        lat, lon = unproject(cx, cy)
+        top = sorted(c[3].items(), key=lambda kv: -kv[1])[:TOP_SPECIES]
+        out = {"lat": round(lat, 5), "lon": round(lon, 5), "count": c[0],
+               "species": {self.species[s]: n for s, n in top}}
+        if len(c[3]) > TOP_SPECIES:
+            out["species_total"] = len(c[3])
+        return out
+
+    def clusters(self, bbox, zoom: int) -> list[dict]:
+        """Clusters whose centroid lies in bbox (minLon, minLat, maxLon, maxLat) at map zoom."""
+        level = min(max(int(zoom), 0) + CLUSTER_SHIFT, MAX_LEVEL)
+        min_lon, min_lat, max_lon, max_lat = bbox
+        if max_lon - min_lon >= 360:
+            min_lon, max_lon = -180.0, 180.0
+        ranges = ([(min_lon, max_lon)] if min_lon <= max_lon else     # antimeridian
+                  [(min_lon, 180.0), (-180.0, max_lon)])
+        out = []
+        for lo, hi in ranges:
+            x0, y1 = project(min_lat, max(lo, -180.0))
+            x1, y0 = project(max_lat, min(hi, 180.0))
+            out.extend(self._cluster_json(c, cx, cy)
+                       for c, cx, cy in self._clusters(level, x0, y0, x1, y1))
+        return out
+
+    def tile(self, z: int, x: int, y: int) -> list[tuple]:
+        """(cluster, tile-local px, py in [0, MVT_EXTENT)) for tile z/x/y."""
+        size = 1 << z
+        if not (0 <= x < size and 0 <= y < size):
+            raise ValueError("tile out of range")
+        level = min(z + CLUSTER_SHIFT, MAX_LEVEL)
+        x0, y0, x1, y1 = x / size, y / size, (x + 1) / size, (y + 1) / size
+        return [(self._cluster_json(c, cx, cy),
+                 int((cx - x0) * size * MVT_EXTENT), int((cy - y0) * size * MVT_EXTENT))
+                for c, cx, cy in self._clusters(level, x0, y0, x1, y1)
+                if cx < x1 and cy < y1]                 # edges belong to one tile only
+
+    def points(self) -> list[dict]:
+        """Every point (the legacy, unclustered payload)."""
+        out = []
+        for x, y, s in zip(self.xs, self.ys, self.sp):
+            lat, lon = unproject(x, y)
+            out.append({"species_name": self.species[s], "lat": round(lat, 6), "lon": round(lon, 6)})
+        return out
+
+
+# ─── encoders ─────────────────────────────────────────────────────────────
+def geojson(clusters: list[dict]) -> dict:
+    return {"type": "FeatureCollection", "features": [
+        {"type": "Feature",
+         "geometry": {"type": "Point", "coordinates": [c["lon"], c["lat"]]},
+         "properties": {k: v for k, v in c.items() if k not in ("lat", "lon")}}
+        for c in clusters]}
+
+
+def mvt(tile_clusters: list[tuple]) -> bytes:
+    """Encode one tile as MVT (layer "predictions"); needs mapbox-vector-tile."""
+    if mapbox_vector_tile is None:
+        raise RuntimeError("mapbox-vector-tile is not installed")
+    features = []
+    for c, px, py in tile_clusters:
+        props = {"count": c["count"], "top_species": next(iter(c["species"]), "")}
+        props.update({f"species:{k}": v for k, v in c["species"].items()})
+        features.append({"geometry": f"POINT({px} {MVT_EXTENT - py})", "properties": props})
+    return mapbox_vector_tile.encode([{"name": "predictions", "features": features}],
+                                     default_options={"extents": MVT_EXTENT})
+
+
+# ─── per-scope cache ──────────────────────────────────────────────────────
+_indexes: "OrderedDict[str, GeoIndex]" = OrderedDict()
+_cache_lock = threading.Lock()
+_stats = {"builds": 0, "hits": 0, "points": 0, "build_ms": 0.0}
+
+
+def scope_for(request) -> str:
+    if SCOPE == "global":
+        return "global"
+    user = getattr(request, "supabase_user", None) or {}
+    return user.get("sub") or "anon"
+
+
+def _cached(scope):
+    with _cache_lock:
+        idx = _indexes.get(scope)
+        if idx is not None and time.monotonic() - idx.built_at < TTL:
+            _indexes.move_to_end(scope)
+            _stats["hits"] += 1
+            return idx
+    return None
+
+
+def _store(scope, rows) -> GeoIndex:
+    t0  = time.perf_counter()
+    idx = GeoIndex(rows)
+    with _cache_lock:
+        _indexes[scope] = idx
+        _indexes.move_to_end(scope)
+        while len(_indexes) > MAX_INDEXES:
+            _indexes.popitem(last=False)
+        _stats["builds"] += 1
+        _stats["points"]  = len(idx)
+        _stats["build_ms"] = round((time.perf_counter() - t0) * 1000, 2)
+    return idx
+
+
+async def aindex_for(request, sb) -> GeoIndex:
+    """The caller's index; fetched page by page and built in a thread on a miss."""
+    scope = scope_for(request)
+    idx = _cached(scope)
+    if idx is not None:
+        return idx
+    rows, start = [], 0
+    while True:
+        page = (await sb.table(VIEW).select("species_name,lat,lon")
+                        .range(start, start + FETCH_PAGE - 1).execute()).data or []
+        rows.extend(page)
+        if len(page) < FETCH_PAGE:
+            break
+        start += FETCH_PAGE
+    return await asyncio.to_thread(_store, scope, rows)
+
+
+def invalidate(uid=None) -> None:
+    """Drop the index of ``uid`` (and the shared one) after new predictions."""
+    with _cache_lock:
+        _indexes.pop("global", None)
+        if uid:
+            _indexes.pop(uid, None)
+
+
+def stats() -> dict:
+    return {**_stats, "indexes": len(_indexes), "scope": SCOPE,
+            "mvt": mapbox_vector_tile is not None}
@@ -0,0 +1,188 @@
+# api/services/history.py
+"""
+Keyset-paginated predictions history.
+
+Pages are ordered newest first on ``(created_at, id)``; a cursor is the
+opaque position of the last row of a page, so page N costs the same as
+page 1 (no OFFSET scan) and rows inserted meanwhile never shift a page.
+
+    cursor=<token>   rows strictly *older* than the token
+    since=<token>    rows strictly *newer* than the token (or an ISO
+                     timestamp) – the client fetches only what is new and
+                     merges it into what it already has
+    fields=a,b       projection, limited to LIST_FIELDS
+
+ETags come from the user's write counter: the ('version', '') row of
+``prediction_stats`` (dashboard/sql/prediction_stats.sql), bumped by the
+statement triggers on every insert, update and delete – wherever the write
+comes from (any worker, ETL, SQL console). Reading it is one primary-key
+lookup however long the history is, so a matching If-None-Match answers
+304 after that lookup and nothing else; the request parameters are
+validated first, so a malformed one never gets a 304. Until the SQL is
+applied there is no counter and list responses carry no ETag.
+"""
+import os, json, uuid, base64, hashlib, logging
+from datetime import datetime
+from postgrest.exceptions import APIError
+
+log = logging.getLogger(__name__)
+
+PAGE_SIZE     = int(os.getenv("PREDICTIONS_PAGE_SIZE", 50))
+MAX_PAGE_SIZE = int(os.getenv("PREDICTIONS_MAX_PAGE_SIZE", 200))
+
+LIST_FIELDS   = ("id", "created_at", "predicted_species", "location_text",
+                 "latitude", "longitude", "notes")
+
+STATS_TABLE   = "prediction_stats"
+MISSING_CODES = {"PGRST205", "42P01"}            # table not in schema cache / undefined
+
+
+# ─── cursors ──────────────────────────────────────────────────────────────
+def encode_cursor(row: dict) -> str:
+    raw = json.dumps([row["created_at"], row["id"]], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _timestamp(value) -> str:
+    """An ISO timestamp that is safe inside an or=(…) tree; ValueError otherwise."""
+    value = str(value)
+    if any(c in value for c in '",()\\'):           # would break out of the quoted value
+        raise ValueError(f"invalid timestamp {value!r}")
+    datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return value
+
+
+def _pk(value):
+    """Row ids are integers or UUIDs; anything else never reaches the filter."""
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    if isinstance(value, str):
+        return str(uuid.UUID(value))
+    raise ValueError(f"invalid id {value!r}")
+
+
+def decode_cursor(token: str) -> tuple:
+    """token → (created_at, id); ValueError when it is not one of ours."""
+    try:
+        created_at, pk = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+        return _timestamp(created_at), _pk(pk)
+    except (ValueError, TypeError):
+        raise ValueError(f"invalid cursor {token!r}")
+
+
+def _since(token: str) -> tuple:
+    """since= accepts a cursor or a bare ISO timestamp (id unknown → None)."""
+    try:
+        return decode_cursor(token)
+    except ValueError:
+        if token[:4].isdigit() and "-" in token:
+            try:
+                return _timestamp(token), None
+            except ValueError:
+                pass
+        raise ValueError(f"invalid since {token!r}")
+
+
+def _q(value) -> str:
+    # timestamps carry ':' '+' '.', so quote them inside or=(…) trees
+    return f'"{value}"'
+
+
+def fields(requested: str | None) -> str:
+    if not requested:
+        return ",".join(LIST_FIELDS)
+    cols = [c.strip() for c in requested.split(",") if c.strip()]
+    unknown = [c for c in cols if c not in LIST_FIELDS]
+    if unknown:
+        raise ValueError(f"unknown field(s): {', '.join(unknown)}")
+    for key in ("created_at", "id"):                 # needed to build cursors
+        if key not in cols:
+            cols.append(key)
+    return ",".join(cols)
+
+
+def page_size(requested) -> int:
+    if requested in (None, ""):
+        return PAGE_SIZE
+    return max(1, min(int(requested), MAX_PAGE_SIZE))
+
+
+# ─── query ────────────────────────────────────────────────────────────────
+def page_query(sb, uid, *, cursor=None, since=None, limit=PAGE_SIZE, columns=None):
+    """
+    PostgREST builder for one page (limit + 1 rows, to detect a next page).
+    Works for the sync and async clients alike.
+    """
+    qry = (sb.table("predictions")
+             .select(columns or ",".join(LIST_FIELDS))
+             .eq("user_id", uid))
+    bounds = []
+    if cursor:
+        ts, pk = decode_cursor(cursor)
+        bounds.append(f"or(created_at.lt.{_q(ts)},and(created_at.eq.{_q(ts)},id.lt.{pk}))")
+    if since:
+        ts, pk = _since(since)
+        bounds.append(f"created_at.gt.{_q(ts)}" if pk is None else
+                      f"or(created_at.gt.{_q(ts)},and(created_at.eq.{_q(ts)},id.gt.{pk}))")
+    if bounds:                                   # one or=(…) tree: repeated params don't AND
+        qry = qry.or_(bounds[0] if len(bounds) == 1 else f"and({','.join(bounds)})")
+    return (qry.order("created_at", desc=True)
+               .order("id", desc=True)
+               .limit(limit + 1))
+
+
+def split_page(rows: list, limit: int, since=None) -> tuple[list, str | None, str | None]:
+    """rows (limit + 1) → (page, next_cursor, since_token for the next poll)."""
+    page   = rows[:limit]
+    nxt    = encode_cursor(page[-1]) if len(rows) > limit else None
+    newest = encode_cursor(page[0]) if page else since
+    return page, nxt, newest
+
+
+# ─── ETag ─────────────────────────────────────────────────────────────────
+_warned = False
+
+
+def version_query(sb, uid):
+    """The user's write counter – one primary-key row (sync or async client)."""
+    return (sb.table(STATS_TABLE)
+              .select("n")
+              .eq("user_id", uid)
+              .eq("kind", "version")
+              .eq("label", "")
+              .limit(1))
+
+
+def version(res) -> int:
+    """Executed ``version_query`` → counter; 0 before the user's first write."""
+    return res.data[0]["n"] if res.data else 0
+
+
+def read_version(sb, uid) -> int | None:
+    """Counter for uid, or None while prediction_stats is not deployed."""
+    global _warned
+    try:
+        return version(version_query(sb, uid).execute())
+    except APIError as exc:
+        if exc.code not in MISSING_CODES:
+            raise
+        if not _warned:
+            log.warning("%s missing – predictions list served without ETag; "
+                        "apply dashboard/sql/prediction_stats.sql", STATS_TABLE)
+            _warned = True
+        return None
+
+
+def etag(uid, params: dict, counter: int) -> str:
+    """ETag of a list request: user + write counter + the request parameters."""
+    h = hashlib.blake2b(digest_size=12)
+    h.update(f"{uid}|{counter}|{sorted(params.items())}".encode())
+    return f'"{h.hexdigest()}"'
+
+
+def not_modified(if_none_match: str | None, tag: str) -> bool:
+    if not if_none_match:
+        return False
+    # weak comparison (RFC 9110 §13.1.2): a proxy may have weakened our tag
+    candidates = {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+    return "*" in candidates or tag.removeprefix("W/") in candidates
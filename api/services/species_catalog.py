@@ -0,0 +1,207 @@
+# api/services/species_catalog.py
+"""
+In-process catalogue of ``infos_especes`` (a few dozen reference rows).
+
+Species lookups used to be an ``ilike("Espèce", name)`` PostgREST round
+trip – one per prediction. The whole table now lives in memory with two
+indexes:
+
+    names  normalize(Espèce) → row    (case / accent / separator-insensitive,
+                                       difflib fallback for near misses)
+    ids    str(species_id)   → row
+
+Loaded at worker start (``preload()`` from asgi.py / wsgi.py) or on first
+use, reloaded in a background thread once SPECIES_CATALOG_TTL expires
+(lookups keep using the old copy meanwhile). ``invalidate()`` bumps a
+version in Django's cache that every worker checks at most every
+SPECIES_CATALOG_CHECK seconds – the ETL hook calls it.
+
+While the catalogue cannot be loaded the helpers fall back to the old
+PostgREST query, so a lookup never fails because of it.
+"""
+import os, time, difflib, logging, threading, unicodedata
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+
+from wildlens_backend.supabase_util import service_client
+
+log = logging.getLogger(__name__)
+
+TABLE        = "infos_especes"
+SPECIES_COL  = "Espèce"                  # EXACT column name in Supabase
+TTL          = int(os.getenv("SPECIES_CATALOG_TTL", 3600))
+CHECK_EVERY  = int(os.getenv("SPECIES_CATALOG_CHECK", 30))
+FUZZY_CUTOFF = float(os.getenv("SPECIES_FUZZY_CUTOFF", 0.88))
+FUZZY_MEMO   = 1024
+VERSION_KEY  = "species_catalog:version"
+
+_stats = {"loads": 0, "load_errors": 0, "hits": 0, "fuzzy_hits": 0, "misses": 0, "fallbacks": 0}
+
+
+def normalize(name) -> str:
+    """'Écureuil  roux' / 'ecureuil-roux' / 'ÉCUREUIL_ROUX' → 'ecureuil roux'"""
+    s = unicodedata.normalize("NFKD", str(name or ""))
+    s = "".join(ch for ch in s if not unicodedata.combining(ch))
+    return " ".join(s.casefold().replace("-", " ").replace("_", " ").split())
+
+
+class Catalog:
+    def __init__(self, rows: list[dict], version=None):
+        self.rows, self.version = rows, version
+        self.names, self.ids = {}, {}
+        for row in rows:
+            key = normalize(row.get(SPECIES_COL))
+            if key:
+                self.names.setdefault(key, row)
+            if row.get("species_id") is not None:
+                self.ids[str(row["species_id"])] = row
+        self.fuzzy      = {}                     # normalized miss → closest row (or None)
+        self.loaded_at  = time.monotonic()
+        self.checked_at = self.loaded_at
+
+    def __len__(self):
+        return len(self.rows)
+
+    def by_name(self, name, fuzzy: bool = True):
+        key = normalize(name)
+        row = self.names.get(key)
+        if row is not None:
+            _stats["hits"] += 1
+            return row
+        if fuzzy and key:
+            if key not in self.fuzzy:
+                if len(self.fuzzy) >= FUZZY_MEMO:
+                    self.fuzzy.clear()
+                close = difflib.get_close_matches(key, self.names.keys(), n=1, cutoff=FUZZY_CUTOFF)
+                self.fuzzy[key] = self.names[close[0]] if close else None
+            row = self.fuzzy[key]
+            if row is not None:
+                _stats["fuzzy_hits"] += 1
+                return row
+        _stats["misses"] += 1
+        return None
+
+    def by_id(self, species_id):
+        row = self.ids.get(str(species_id))
+        _stats["hits" if row is not None else "misses"] += 1
+        return row
+
+
+_catalog: Catalog | None = None
+_next_attempt = 0.0                      # while nothing is loaded: back off between tries
+_lock = threading.Lock()
+_refreshing = threading.Event()
+
+
+def _load() -> Catalog | None:
+    global _catalog
+    try:
+        version = cache.get(VERSION_KEY)
+        rows    = service_client().table(TABLE).select("*").execute().data or []
+    except Exception as exc:                      # network / RLS: keep what we have
+        log.warning("species catalogue load failed: %s", exc)
+        return _retry_later()
+    if not rows:                                  # anon may not see the table
+        return _retry_later()
+    _catalog = Catalog(rows, version)
+    _stats["loads"] += 1
+    return _catalog
+
+
+def _retry_later() -> Catalog | None:
+    global _next_attempt
+    _stats["load_errors"] += 1
+    _next_attempt = time.monotonic() + CHECK_EVERY     # next attempt in CHECK_EVERY s
+    if _catalog is not None:
+        _catalog.loaded_at = time.monotonic() - TTL + CHECK_EVERY
+    return _catalog
+
+
+def _refresh_in_background():
+    if _refreshing.is_set():
+        return
+    _refreshing.set()
+
+    def run():
+        try:
+            _load()
+        finally:
+            _refreshing.clear()
+    threading.Thread(target=run, name="species-catalog", daemon=True).start()
+
+
+def _stale(cat: Catalog) -> bool:
+    now = time.monotonic()
+    if now - cat.loaded_at > TTL:
+        return True
+    if now - cat.checked_at > CHECK_EVERY:
+        cat.checked_at = now
+        return cache.get(VERSION_KEY) != cat.version
+    return False
+
+
+def get() -> Catalog | None:
+    """The catalogue (loading it on first use); None when it cannot be loaded."""
+    cat = _catalog
+    if cat is None:
+        if time.monotonic() < _next_attempt:
+            return None
+        with _lock:
+            cat = _catalog or _load()
+    elif _stale(cat):
+        _refresh_in_background()
+    return cat
+
+
+async def aget() -> Catalog | None:
+    """``get()`` for async views: the first load runs in a thread."""
+    cat = _catalog
+    if cat is None:
+        if time.monotonic() < _next_attempt:
+            return None
+        return await sync_to_async(get, thread_sensitive=False)()
+    if _stale(cat):
+        _refresh_in_background()
+    return cat
+
+
+def preload() -> None:
+    """Warm the catalogue in the background when a worker starts."""
+    _refresh_in_background()
+
+
+def invalidate() -> None:
+    """Every worker reloads within SPECIES_CATALOG_CHECK seconds (this one right away)."""
+    cache.set(VERSION_KEY, time.time_ns(), None)
+    _refresh_in_background()
+
+
+# ─── lookups with the PostgREST fallback ──────────────────────────────────
+def _query(sb, name=None, species_id=None):
+    qry = sb.table(TABLE).select("*").limit(1)
+    return qry.eq("species_id", species_id) if species_id is not None else qry.ilike(SPECIES_COL, name)
+
+
+def lookup(sb, name=None, species_id=None):
+    """Row for a species name (or id), or None."""
+    cat = get()
+    if cat is not None:
+        return cat.by_id(species_id) if species_id is not None else cat.by_name(name)
+    _stats["fallbacks"] += 1
+    data = _query(sb, name, species_id).execute().data
+    return data[0] if data else None
+
+
+async def alookup(sb, name=None, species_id=None):
+    cat = await aget()
+    if cat is not None:
+        return cat.by_id(species_id) if species_id is not None else cat.by_name(name)
+    _stats["fallbacks"] += 1
+    data = (await _query(sb, name, species_id).execute()).data
+    return data[0] if data else None
+
+
+def stats() -> dict:
+    cat = _catalog
+    return {**_stats, "species": len(cat) if cat else 0,
+            "age_s": round(time.monotonic() - cat.loaded_at, 1) if cat else None}
@@ -0,0 +1,270 @@
+import os, json, time, base64
+from unittest import mock
+
+import httpx
+import jwt
+from asgiref.sync import async_to_sync
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from api.services import ai_client, geo_index, history, species_catalog
+from wildlens_backend import middleware
+
+SECRET = "test-secret-test-secret-test-secret"
+
+
+def _token(exp_offset: float) -> str:
+    return jwt.encode({"sub": "u1", "aud": "authenticated", "exp": int(time.time() + exp_offset)},
+                      SECRET, algorithm="HS256")
+
+
+@mock.patch.object(middleware, "SUPABASE_JWT_SECRET", SECRET)
+class SupabaseAuthMiddlewareTests(SimpleTestCase):
+    def setUp(self):
+        middleware.token_cache.entries.clear()
+        self.seen = []
+
+        def view(request):
+            self.seen.append(getattr(request, "supabase_user", None))
+            return HttpResponse("ok")
+        self.mw = middleware.SupabaseAuthMiddleware(view)
+
+    def _request(self, session_token=None, bearer=None):
+        headers = {"HTTP_AUTHORIZATION": f"Bearer {bearer}"} if bearer else {}
+        request = RequestFactory().post("/login/", **headers)
+        request.session = {"supabase_token": session_token} if session_token else {}
+        return request
+
+    def test_expired_session_token_is_dropped_not_401(self):
+        request = self._request(session_token=_token(-60))
+        response = self.mw(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.seen, [None])
+        self.assertNotIn("supabase_token", request.session)
+
+    def test_garbage_session_token_is_dropped(self):
+        request = self._request(session_token="not-a-jwt")
+        self.assertEqual(self.mw(request).status_code, 200)
+        self.assertNotIn("supabase_token", request.session)
+
+    def test_expired_bearer_token_still_401(self):
+        response = self.mw(self._request(bearer=_token(-60)))
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(self.seen, [])
+
+    def test_valid_session_token_authenticates(self):
+        request = self._request(session_token=_token(3600))
+        self.assertEqual(self.mw(request).status_code, 200)
+        self.assertEqual(self.seen[0]["sub"], "u1")
+        self.assertIn("supabase_token", request.session)
+
+    def test_async_stack_drops_expired_session_token(self):
+        async def view(request):
+            return HttpResponse("ok")
+        mw = middleware.SupabaseAuthMiddleware(view)
+        request = self._request(session_token=_token(-60))
+        response = async_to_sync(mw)(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("supabase_token", request.session)
+
+
+class ParseBboxTests(SimpleTestCase):
+    def test_non_finite_values_are_rejected(self):
+        for raw in ("nan,0,10,10", "0,0,inf,10", "-inf,0,10,10"):
+            with self.assertRaises(ValueError):
+                geo_index.parse_bbox(raw)
+
+    def test_valid_bbox(self):
+        self.assertEqual(geo_index.parse_bbox("-10,-5,10,5"), (-10.0, -5.0, 10.0, 5.0))
+
+
+def _raw_cursor(created_at, pk) -> str:
+    return base64.urlsafe_b64encode(json.dumps([created_at, pk]).encode()).decode().rstrip("=")
+
+
+class HistoryCursorTests(SimpleTestCase):
+    ROW = {"created_at": "2025-03-01T10:00:00.123+00:00", "id": 42}
+
+    def test_round_trip(self):
+        self.assertEqual(history.decode_cursor(history.encode_cursor(self.ROW)),
+                         ("2025-03-01T10:00:00.123+00:00", 42))
+        uid = "0f8fad5b-d9cb-469f-a165-70867728950e"
+        self.assertEqual(history.decode_cursor(history.encode_cursor({**self.ROW, "id": uid}))[1], uid)
+
+    def test_bad_cursor_is_rejected(self):
+        for token in ("not-a-cursor",
+                      _raw_cursor("2025-03-01", "1)),id.gt.0"),       # pk smuggling a filter
+                      _raw_cursor("2025-03-01", True),
+                      _raw_cursor('2025-03-01",x', 1),
+                      _raw_cursor("yesterday", 1)):
+            with self.assertRaises(ValueError):
+                history.decode_cursor(token)
+
+    def test_bare_since_with_filter_syntax_is_rejected(self):
+        self.assertEqual(history._since("2025-03-01T10:00:00Z"), ("2025-03-01T10:00:00Z", None))
+        for since in ('2025-03-01"', "2025-03-01,id.gt.0", "2025-03-01)"):
+            with self.assertRaises(ValueError):
+                history._since(since)
+
+    def test_split_page(self):
+        rows = [{"created_at": f"2025-03-0{d}", "id": d} for d in (5, 4, 3)]
+        page, nxt, newest = history.split_page(rows, 2)
+        self.assertEqual(page, rows[:2])
+        self.assertEqual(history.decode_cursor(nxt), ("2025-03-04", 4))
+        self.assertEqual(history.decode_cursor(newest), ("2025-03-05", 5))
+
+        page, nxt, newest = history.split_page([], 2, since="tok")
+        self.assertEqual((page, nxt, newest), ([], None, "tok"))     # poll again from the same point
+
+
+class HistoryETagTests(SimpleTestCase):
+    def test_tag_follows_the_write_counter(self):
+        params = {"cursor": "", "since": "", "limit": "20", "fields": ""}
+        tag = history.etag("u1", params, 7)
+        self.assertEqual(tag, history.etag("u1", params, 7))
+        self.assertNotEqual(tag, history.etag("u1", params, 8))
+        self.assertNotEqual(tag, history.etag("u1", {**params, "limit": "50"}, 7))
+
+    def test_not_modified(self):
+        tag = history.etag("u1", {}, 1)
+        self.assertTrue(history.not_modified(tag, tag))
+        self.assertTrue(history.not_modified(f'"other", {tag}', tag))
+        self.assertTrue(history.not_modified(f"W/{tag}", tag))
+        self.assertTrue(history.not_modified("*", tag))
+        self.assertFalse(history.not_modified(None, tag))
+        self.assertFalse(history.not_modified('"other"', tag))
+
+
+class AIClientTests(SimpleTestCase):
+    def setUp(self):
+        self.calls = []
+        self.replies = []                         # popped per call: status code or exception
+
+        def handler(req):
+            self.calls.append(req.method)
+            reply = self.replies.pop(0) if self.replies else 200
+            if isinstance(reply, Exception):
+                raise reply
+            return httpx.Response(reply, json={"species": "Renard"})
+
+        client = httpx.Client(base_url="http://ai", transport=httpx.MockTransport(handler))
+        for name, value in {"_client": client, "_client_pid": os.getpid(), "BACKOFF": 0.0,
+                            "RETRIES": 2, "breaker": ai_client.CircuitBreaker(2, 0.05)}.items():
+            patcher = mock.patch.object(ai_client, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_503_is_retried(self):
+        self.replies = [503, 503]
+        self.assertEqual(ai_client.request("GET", "/ping").status_code, 200)
+        self.assertEqual(len(self.calls), 3)
+
+    def test_post_read_error_is_not_replayed(self):
+        self.replies = [httpx.ReadError("reset mid-response")]
+        with self.assertRaises(httpx.ReadError):
+            ai_client.request("POST", "/hpsearch/", idempotent=False, json={})
+        self.assertEqual(self.calls, ["POST"])
+
+    def test_post_connect_error_is_retried(self):
+        self.replies = [httpx.ConnectError("refused")]
+        ai_client.request("POST", "/hpsearch/", idempotent=False, json={})
+        self.assertEqual(self.calls, ["POST", "POST"])
+
+    def test_breaker_open_half_open_closed(self):
+        breaker = ai_client.breaker
+        for _ in range(2):
+            breaker.failure()
+        self.assertEqual(breaker.state, "open")
+        with self.assertRaises(ai_client.CircuitOpenError):
+            ai_client.request("GET", "/ping")
+        self.assertEqual(self.calls, [])          # failed fast, no network
+
+        time.sleep(0.06)
+        self.assertEqual(breaker.state, "half-open")
+        breaker.check()                           # the single trial …
+        with self.assertRaises(ai_client.CircuitOpenError):
+            breaker.check()                       # … everyone else still fails fast
+        breaker.failure()                         # trial failed → open again
+        self.assertEqual(breaker.state, "open")
+
+        time.sleep(0.06)
+        self.assertEqual(ai_client.request("GET", "/ping").status_code, 200)
+        self.assertEqual(breaker.state, "closed")
+        ai_client.request("GET", "/ping")         # closed: no trial limit
+
+
+ROWS = [{"species_id": 1, "Espèce": "Écureuil roux"},
+        {"species_id": 2, "Espèce": "Renard roux"},
+        {"species_id": 3, "Espèce": "Castor"}]
+
+
+class SpeciesNormalizeTests(SimpleTestCase):
+    def test_accent_case_and_separator_variants(self):
+        for raw in ("Écureuil roux", "ecureuil-roux", "ÉCUREUIL_ROUX", "  écureuil   Roux "):
+            self.assertEqual(species_catalog.normalize(raw), "ecureuil roux")
+        self.assertEqual(species_catalog.normalize(None), "")
+
+
+class SpeciesCatalogTests(SimpleTestCase):
+    def setUp(self):
+        self.cat = species_catalog.Catalog(ROWS)
+
+    def test_exact_lookup_ignores_accents_and_case(self):
+        self.assertEqual(self.cat.by_name("ECUREUIL-ROUX")["species_id"], 1)
+        self.assertEqual(self.cat.by_id("2")["Espèce"], "Renard roux")
+
+    def test_fuzzy_near_miss_matches_above_cutoff(self):
+        self.assertEqual(self.cat.by_name("Ecureuil rous")["species_id"], 1)    # one typo
+        self.assertIsNone(self.cat.by_name("Ecureuil rous", fuzzy=False))
+
+    def test_distinct_name_below_cutoff_does_not_match(self):
+        self.assertIsNone(self.cat.by_name("Renard polaire"))    # shares a word, not a species
+        self.assertIsNone(self.cat.by_name("Blaireau"))
+
+
+class _Table:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def table(self, name):
+        return self
+
+    def select(self, *cols):
+        return self
+
+    def execute(self):
+        return mock.Mock(data=list(self.rows))
+
+
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+                                       "LOCATION": "species-catalog-tests"}})
+class SpeciesCatalogReloadTests(SimpleTestCase):
+    def setUp(self):
+        self.source = _Table(ROWS[:2])
+        for name, value in {"service_client": lambda: self.source, "_catalog": None,
+                            "_next_attempt": 0.0, "CHECK_EVERY": 0}.items():
+            patcher = mock.patch.object(species_catalog, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _settle(self):
+        for _ in range(200):                       # background reload thread
+            if not species_catalog._refreshing.is_set():
+                return
+            time.sleep(0.01)
+
+    def test_version_bump_reloads(self):
+        self.assertIsNone(species_catalog.get().by_name("Castor", fuzzy=False))
+
+        self.source.rows = ROWS                    # the ETL adds a species …
+        species_catalog.get()                      # … unchanged version: no reload
+        self._settle()
+        self.assertIsNone(species_catalog.get().by_name("Castor", fuzzy=False))
+
+        species_catalog.cache.set(species_catalog.VERSION_KEY, "v2")   # … and invalidates
+        time.sleep(0.001)
+        species_catalog.get()                      # version check → background reload
+        self._settle()
+        cat = species_catalog.get()
+        self.assertEqual(cat.version, "v2")
+        self.assertEqual(cat.by_name("castor", fuzzy=False)["species_id"], 3)
@@ -1,15 +1,18 @@
 from django.urls import path
 from rest_framework.routers import SimpleRouter
 from .views import (
-    PredictView, PredictionViewSet,
-    prediction_locations, species_info
+    predict_view, PredictionViewSet,
+    prediction_locations, prediction_clusters, prediction_tile, species_info
 )
 
 router = SimpleRouter(trailing_slash=False)
 router.register(r"predictions", PredictionViewSet, basename="predictions")
 
 urlpatterns = [
-    path("predict/",              PredictView.as_view(), name="predict"),
+    path("predict/",              predict_view,          name="predict"),
     path("prediction-locations/", prediction_locations,  name="prediction_locations"),
+    path("prediction-clusters/",  prediction_clusters,   name="prediction_clusters"),
+    path("prediction-tiles/<int:z>/<int:x>/<int:y>.<str:fmt>",
+         prediction_tile, name="prediction_tile"),
     path("species-info/",         species_info,          name="species_info"),
 ] + router.urls
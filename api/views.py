@@ -1,6 +1,7 @@
-import io, os, requests, tempfile
-from django.http import JsonResponse
+import io, os, httpx, asyncio
+from django.http import HttpResponse, JsonResponse
 from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
 from django.utils.decorators import method_decorator
 from django.conf import settings
 from rest_framework.views import APIView
@@ -9,8 +10,8 @@ from wildlens_backend.auth_decorators import supabase_login_required
 from rest_framework import viewsets, status, permissions
 from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser
-from ai.predict import predict                     # 🔸 already in repo
-from rest_framework.decorators import api_view, permission_classes
+from ai.predict import predict, predict_batch      # 🔸 already in repo
+from rest_framework.decorators import api_view, permission_classes, action
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from django.http import JsonResponse
@@ -21,39 +22,54 @@ from collections import Counter
 from django.shortcuts import render, redirect
 from django.conf import settings
 from wildlens_backend.auth_decorators import supabase_login_required
-from wildlens_backend.supabase_util import client_for_request
+from wildlens_backend.supabase_util import client_for_request, aclient_for_request
+from api.services import ai_client, history, geo_index, species_catalog
 
 
-@method_decorator(csrf_exempt, name="dispatch")
-class PredictView(APIView):
+@csrf_exempt
+@require_POST
+@supabase_login_required
+async def predict_view(request):
     """
     Accepts ONE image (multipart/form-data “file”) and
-    streams it to the AI micro-service.  Never saved to disk.
+    streams it to the AI micro-service over the pooled client
+    (``api.services.ai_client``).  Never saved to disk.
+
+    Async: the worker keeps serving other requests while the AI service
+    is busy with this one.
     """
-    permission_classes = [permissions.AllowAny]   # overridden by decorator
+    uploaded = request.FILES.get("file")
+    if not uploaded:
+        return JsonResponse({"error": "Missing ‘file’"}, status=400)
 
-    @supabase_login_required
-    def post(self, request, *args, **kwargs):
-        uploaded = request.FILES.get("file")
-        if not uploaded:
-            return JsonResponse({"error": "Missing ‘file’"}, status=400)
+    try:
+        result = await ai_client.apredict(uploaded, uploaded.name, uploaded.content_type)
+    except ai_client.CircuitOpenError as exc:
+        return JsonResponse({"error": f"AI service unavailable: {exc}"}, status=503)
+    except httpx.HTTPError as exc:
+        return JsonResponse({"error": f"AI service unreachable: {exc}"}, status=502)
+
+    return JsonResponse(result, status=status.HTTP_200_OK)
+
+MIN_CONFIDENCE = 0.03          # below this we ask the user to retake the photo
 
-        try:
-            resp = requests.post(
-                settings.AI_SERVICE_URL,
-                files={"file": (uploaded.name, uploaded.read(), uploaded.content_type)},
-                timeout=10,
-            )
-            resp.raise_for_status()
-        except requests.RequestException as exc:
-            return JsonResponse({"error": f"AI service unreachable: {exc}"}, status=502)
 
-        return JsonResponse(resp.json(), status=status.HTTP_200_OK)
+def _format_prediction(result):
+    """Turn predict()'s output into (name, confidence, '("Name",0.79)')."""
+    if isinstance(result, (list, tuple)) and len(result) == 2:
+        name, confidence = result
+    else:
+        name = str(result)
+        confidence = 1.0
+    confidence = round(float(confidence), 2)
+    return name, confidence, f'("{name}",{confidence:.2f})'
+
 
 @permission_classes([IsAuthenticated])
 class PredictionViewSet(viewsets.ViewSet):
     """
     POST /api/predictions/      – run model, store + return prediction
+    POST /api/predictions/bulk  – many “images”, one batched run + one insert
     GET  /api/predictions/      – list user’s predictions
     GET  /api/predictions/<id>/ – get one prediction
     """
@@ -61,14 +77,44 @@ class PredictionViewSet(viewsets.ViewSet):
     parser_classes = [MultiPartParser]
 
     def list(self, request):
-        sb = client_for_request(request)  
-        resp = sb.table("predictions")\
-                       .select("*")\
-                       .eq("user_id", request.supabase_user["sub"])\
-                       .order("created_at", desc=True)\
-                       .limit(50)\
-                       .execute()
-        return Response(resp.data)
+        """
+        GET /api/predictions/?limit=50&cursor=…&since=…&fields=id,created_at,…
+        Keyset pages, newest first (api/services/history.py). The body stays
+        a plain list; paging travels in headers: Link rel="next" /
+        X-Next-Cursor, X-Since-Cursor (pass back as since= to poll for new
+        rows) and an ETag honoured via If-None-Match.
+        """
+        uid    = request.supabase_user["sub"]
+        params = {k: request.query_params.get(k, "") for k in ("cursor", "since", "limit", "fields")}
+
+        try:                                        # a bad request never earns a 304
+            limit = history.page_size(params["limit"])
+            columns = history.fields(params["fields"])
+            sb  = client_for_request(request)
+            qry = history.page_query(sb, uid,
+                                     cursor=params["cursor"] or None,
+                                     since=params["since"] or None,
+                                     limit=limit,
+                                     columns=columns)
+        except ValueError as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        counter = history.read_version(sb, uid)
+        tag     = history.etag(uid, params, counter) if counter is not None else None
+        if tag and history.not_modified(request.headers.get("If-None-Match"), tag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": tag})
+
+        rows, nxt, newest = history.split_page(qry.execute().data or [], limit,
+                                               params["since"] or None)
+        headers = {"ETag": tag} if tag else {}
+        if nxt:
+            query = request.query_params.copy()
+            query["cursor"] = nxt
+            headers["X-Next-Cursor"] = nxt
+            headers["Link"] = f'<{request.build_absolute_uri("?" + query.urlencode())}>; rel="next"'
+        if newest and not params["cursor"]:
+            headers["X-Since-Cursor"] = newest
+        return Response(rows, headers=headers)
 
     def retrieve(self, request, pk=None):
         sb = client_for_request(request) 
@@ -91,29 +137,15 @@ class PredictionViewSet(viewsets.ViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # 2) Save to temp file and run AI prediction
-        suffix = os.path.splitext(uploaded.name)[1]
-        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-            for chunk in uploaded.chunks():
-                tmp.write(chunk)
-            temp_path = tmp.name
-
-        try:
-            result = predict(temp_path)    # e.g. ("Ours", 0.1369…)
-        finally:
-            os.remove(temp_path)
+        # 2) Run AI prediction straight from the in-memory upload
+        #    (FILE_UPLOAD_MAX_MEMORY_SIZE keeps phone photos off the disk)
+        result = predict(uploaded)         # e.g. ("Ours", 0.1369…)
 
         # 3) Format the prediction exactly as ("Name",0.79)
-        if isinstance(result, (list, tuple)) and len(result) == 2:
-            name, confidence = result
-        else:
-            name = str(result)
-            confidence = 1.0
-        confidence = round(float(confidence), 2)
-        species = f'("{name}",{confidence:.2f})'
+        name, confidence, species = _format_prediction(result)
         
         # 3b) If confidence < 0.03 (3%), ask user to retake photo
-        if confidence < 0.03:
+        if confidence < MIN_CONFIDENCE:
             return Response(
                 {"detail": "Confidence too low (under 3 %)—please take another picture."},
                 status=status.HTTP_400_BAD_REQUEST
@@ -132,54 +164,139 @@ class PredictionViewSet(viewsets.ViewSet):
             "notes": request.data.get("notes"),
         }
         sb.table("predictions").insert(insert_payload).execute()
+        geo_index.invalidate(uid)                   # and the map index
 
-        # 5) Fetch one matching row from infos_especes (limit 1, never .single())
-        info_res = (
-            sb.table("infos_especes")
-            .select("*")
-            .ilike("Espèce", name)
-            .limit(1)
-            .execute()
-        )
-        species_info = info_res.data[0] if (info_res.data and len(info_res.data) > 0) else {}
+        # 5) Species info from the in-process catalogue (no round trip)
+        species_info = species_catalog.lookup(sb, name) or {}
 
         return Response(
             {"prediction": species, "species_info": species_info},
             status=status.HTTP_201_CREATED
         )
+
+    @action(detail=False, methods=["post"], url_path="bulk")
+    def bulk_create(self, request):
+        """
+        Multipart with repeated “images” fields (e.g. a camera-trap card).
+        All images go through the model in batches and every accepted
+        prediction is stored with a *single* Supabase insert. Location and
+        notes fields apply to every image.
+        """
+        uploads = request.FILES.getlist("images")
+        if not uploads:
+            return Response(
+                {"detail": "images field required"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # Django's UploadedFile is file-like, PIL reads it directly
+        results = predict_batch(uploads)
+
+        uid = request.supabase_user["sub"]
+        rows, out = [], []
+        for uploaded, result in zip(uploads, results):
+            if result is None:
+                out.append({"file": uploaded.name, "detail": "Could not read image"})
+                continue
+            _, confidence, species = _format_prediction(result)
+            if confidence < MIN_CONFIDENCE:
+                out.append({"file": uploaded.name,
+                            "detail": "Confidence too low (under 3 %)"})
+                continue
+            rows.append({
+                "user_id": uid,
+                "predicted_species": species,
+                "location_text": request.data.get("location_text"),
+                "latitude": request.data.get("lat"),
+                "longitude": request.data.get("lon"),
+                "notes": request.data.get("notes"),
+            })
+            out.append({"file": uploaded.name, "prediction": species})
+
+        if rows:
+            client_for_request(request).table("predictions").insert(rows).execute()
+            geo_index.invalidate(uid)
+
+        return Response(
+            {"created": len(rows), "results": out},
+            status=status.HTTP_201_CREATED if rows else status.HTTP_400_BAD_REQUEST
+        )
     
     
     
-@api_view(["GET"])
-@permission_classes([IsAuthenticated])
-def prediction_locations(request):
-    sb = client_for_request(request)
-    res = sb.table("prediction_locations_v").select("*").execute()
-    return Response(res.data)
+@require_GET
+@supabase_login_required
+async def prediction_locations(request):
+    """
+    GET /api/prediction-locations/                       – every row (legacy)
+    GET /api/prediction-locations/?bbox=…&zoom=…         – same as prediction-clusters
+    """
+    if "bbox" in request.GET:
+        return await prediction_clusters(request)
+    sb  = await aclient_for_request(request)
+    res = await sb.table("prediction_locations_v").select("*").execute()
+    return JsonResponse(res.data, safe=False)
+
+
+@require_GET
+@supabase_login_required
+async def prediction_clusters(request):
+    """
+    GET /api/prediction-clusters/?bbox=minLon,minLat,maxLon,maxLat&zoom=6[&format=geojson]
+    Server-side clusters (count + top species per grid cell) for the
+    viewport, from the in-process spatial index (api/services/geo_index.py).
+    """
+    try:
+        bbox = geo_index.parse_bbox(request.GET.get("bbox", "-180,-85,180,85"))
+        zoom = int(request.GET.get("zoom", 2))
+    except ValueError as exc:
+        return JsonResponse({"detail": str(exc)}, status=400)
+
+    index    = await geo_index.aindex_for(request, await aclient_for_request(request))
+    clusters = await asyncio.to_thread(index.clusters, bbox, zoom)   # grid build + scan off the loop
+    if request.GET.get("format") == "geojson":
+        return JsonResponse(geo_index.geojson(clusters))
+    return JsonResponse({"zoom": zoom, "total": len(index), "clusters": clusters})
+
+
+@require_GET
+@supabase_login_required
+async def prediction_tile(request, z, x, y, fmt):
+    """
+    GET /api/prediction-tiles/<z>/<x>/<y>.mvt      – Mapbox Vector Tile, layer "predictions"
+    GET /api/prediction-tiles/<z>/<x>/<y>.geojson
+    """
+    if fmt not in ("mvt", "geojson"):
+        return JsonResponse({"detail": "format must be .mvt or .geojson"}, status=404)
+    index = await geo_index.aindex_for(request, await aclient_for_request(request))
+    try:
+        tile = await asyncio.to_thread(index.tile, z, x, y)
+    except ValueError as exc:
+        return JsonResponse({"detail": str(exc)}, status=400)
+
+    if fmt == "geojson":
+        return JsonResponse(geo_index.geojson([c for c, _, _ in tile]))
+    if geo_index.mapbox_vector_tile is None:
+        return JsonResponse({"detail": "vector tiles need mapbox-vector-tile; use .geojson"},
+                            status=501)
+    return HttpResponse(await asyncio.to_thread(geo_index.mvt, tile), content_type="application/vnd.mapbox-vector-tile")
 
 
 # ─────────────────────────────────────────────────────────────────────
-@api_view(["GET"])
-@permission_classes([IsAuthenticated])
-def species_info(request):
+@require_GET
+@supabase_login_required
+async def species_info(request):
     """
     GET /api/species-info/?name=<species_name>
-    Returns the first matching row from infos_especes.
+    Returns the matching row of infos_especes (accent / case-insensitive,
+    from the in-process catalogue).
     """
     name = request.GET.get("name")
     if not name:
         return JsonResponse({"detail": "Missing `name` parameter"}, status=400)
 
-    sb = client_for_request(request) 
-    res = (
-        sb.table("infos_especes")
-          .select("*")
-          .ilike("Espèce", name)
-          .single()
-          .execute()
-    )
-    if not res.data:
+    row = await species_catalog.alookup(await aclient_for_request(request), name)
+    if not row:
         return JsonResponse({"detail": "Species not found"}, status=404)
 
-    return JsonResponse(res.data)
-
+    return JsonResponse(row)
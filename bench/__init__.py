@@ -0,0 +1,10 @@
+"""
+WildLens micro-benchmarks.
+
+Run from the repository root, e.g.::
+
+    $ python -m bench.batching
+
+Each script is self-contained, needs no Supabase credentials and prints a
+small results table.
+"""
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Pooled AI client vs. one ``requests.post`` per call
+===================================================
+
+  $ python -m bench.ai_client --calls 300 --size-kb 3000 --concurrency 16
+
+A local stand-in for the AI service (``/predict`` drains the multipart body
+and answers a fixed JSON after ``--server-ms``) is started on a free port.
+Three ways of calling it are timed:
+
+    requests   – what PredictView did: new connection, upload read into memory
+    pooled     – ``ai_client.predict``: keep-alive pool, streamed upload
+    async      – ``ai_client.apredict`` with ``--concurrency`` calls in flight
+
+Pass ``--url`` to hit a real service instead.
+"""
+
+from __future__ import annotations
+import argparse, asyncio, io, os, statistics, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _StandIn(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"                 # keep-alive like uvicorn
+    disable_nagle_algorithm = True                # uvicorn sets TCP_NODELAY too
+    delay = 0.0
+
+    def do_POST(self):
+        remaining = int(self.headers.get("Content-Length", 0))
+        while remaining:
+            remaining -= len(self.rfile.read(min(remaining, 1 << 16)))
+        time.sleep(self.delay)
+        body = b'{"species": "Castor", "confidence": 0.93}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads     = True
+    request_queue_size = 128                      # default 5 drops bursts of SYNs
+
+
+def _serve(delay_ms: float) -> str:
+    _StandIn.delay = delay_ms / 1000
+    server = _Server(("127.0.0.1", 0), _StandIn)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}"
+
+
+def _summary(label, latencies, elapsed):
+    latencies.sort()
+    n = len(latencies)
+    print(f"{label:<9} {n / elapsed:>8.1f} {statistics.median(latencies) * 1000:>9.2f} "
+          f"{latencies[min(n - 1, int(0.99 * n))] * 1000:>9.2f}")
+
+
+def main():
+    ap = argparse.ArgumentParser("AI client benchmark")
+    ap.add_argument("--url", help="real AI service root (default: local stand-in)")
+    ap.add_argument("--calls", type=int, default=300)
+    ap.add_argument("--size-kb", type=int, default=3000, help="upload size")
+    ap.add_argument("--server-ms", type=float, default=5.0, help="stand-in latency")
+    ap.add_argument("--concurrency", type=int, default=16)
+    args = ap.parse_args()
+
+    url = (args.url or _serve(args.server_ms)).rstrip("/")
+    os.environ["AI_SERVICE_URL"] = url
+    import requests
+    from api.services import ai_client             # reads AI_SERVICE_URL on import
+
+    payload = os.urandom(args.size_kb * 1024)
+    print(f"{args.calls} calls, {args.size_kb} KB upload → {url}/predict")
+    print(f"{'client':<9} {'calls/s':>8} {'p50 ms':>9} {'p99 ms':>9}")
+
+    lat = []
+    t0 = time.perf_counter()
+    for _ in range(args.calls):
+        s = time.perf_counter()
+        upload = io.BytesIO(payload)
+        r = requests.post(f"{url}/predict", timeout=10,
+                          files={"file": ("x.jpg", upload.read(), "image/jpeg")})
+        r.raise_for_status()
+        lat.append(time.perf_counter() - s)
+    _summary("requests", lat, time.perf_counter() - t0)
+
+    lat = []
+    t0 = time.perf_counter()
+    for _ in range(args.calls):
+        s = time.perf_counter()
+        ai_client.predict(io.BytesIO(payload), "x.jpg", "image/jpeg")
+        lat.append(time.perf_counter() - s)
+    _summary("pooled", lat, time.perf_counter() - t0)
+
+    async def run_async():
+        lat, sem = [], asyncio.Semaphore(args.concurrency)
+
+        async def one():
+            async with sem:
+                s = time.perf_counter()
+                await ai_client.apredict(io.BytesIO(payload), "x.jpg", "image/jpeg")
+                lat.append(time.perf_counter() - s)
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(args.calls)))
+        _summary("async", lat, time.perf_counter() - t0)
+        await ai_client.async_client().aclose()
+
+    asyncio.run(run_async())
+    print(ai_client.stats())
+
+
+if __name__ == "__main__":
+    main()
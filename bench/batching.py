@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Throughput of ``ai.batching.MicroBatcher`` vs. one forward pass per request
+=========================================================================
+
+  $ python -m bench.batching --clients 1 8 32 --requests 256
+
+Both modes run the forward pass in a worker thread (so the event loop stays
+free); the baseline simply issues one ``[1, 3, 224, 224]`` pass per request.
+A randomly initialised ResNet-18 stands in for the trained checkpoint.
+"""
+
+from __future__ import annotations
+import argparse, asyncio, time
+from concurrent.futures import ThreadPoolExecutor
+
+import torch, torchvision
+
+from ai.batching import MicroBatcher
+
+
+def _model():
+    m = torchvision.models.resnet18(weights=None)
+    m.fc = torch.nn.Linear(m.fc.in_features, 13)
+    return m.eval()
+
+
+async def _run_unbatched(model, clients: int, n_requests: int) -> float:
+    pool = ThreadPoolExecutor(max_workers=1)
+    loop = asyncio.get_running_loop()
+    x    = torch.randn(3, 224, 224)
+
+    @torch.inference_mode()
+    def forward(t):
+        return torch.softmax(model(t.unsqueeze(0)), 1)[0]
+
+    async def client(n):
+        for _ in range(n):
+            await loop.run_in_executor(pool, forward, x)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(client(n_requests // clients) for _ in range(clients)))
+    pool.shutdown()
+    return (n_requests // clients * clients) / (time.perf_counter() - t0)
+
+
+async def _run_batched(model, clients: int, n_requests: int,
+                       max_batch: int, max_wait_ms: float) -> tuple[float, float]:
+    batcher = MicroBatcher(model, max_batch_size=max_batch, max_wait_ms=max_wait_ms)
+    await batcher.start()
+    x = torch.randn(3, 224, 224)
+
+    async def client(n):
+        for _ in range(n):
+            await batcher.submit(x)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(client(n_requests // clients) for _ in range(clients)))
+    rps = (n_requests // clients * clients) / (time.perf_counter() - t0)
+    mean_batch = batcher.stats()["mean_batch"]
+    await batcher.stop()
+    return rps, mean_batch
+
+
+def main():
+    ap = argparse.ArgumentParser("micro-batching benchmark")
+    ap.add_argument("--clients",  type=int, nargs="+", default=[1, 8, 32])
+    ap.add_argument("--requests", type=int, default=256)
+    ap.add_argument("--max-batch", type=int, default=8)
+    ap.add_argument("--max-wait-ms", type=float, default=10.0)
+    args = ap.parse_args()
+
+    model = _model()
+    with torch.inference_mode():                        # warm-up
+        model(torch.randn(args.max_batch, 3, 224, 224))
+
+    print(f"{'clients':>8} {'unbatched img/s':>16} {'batched img/s':>14} "
+          f"{'mean batch':>11} {'speed-up':>9}")
+    for c in args.clients:
+        base = asyncio.run(_run_unbatched(model, c, args.requests))
+        rps, mean_b = asyncio.run(_run_batched(model, c, args.requests,
+                                               args.max_batch, args.max_wait_ms))
+        print(f"{c:>8} {base:>16.1f} {rps:>14.1f} {mean_b:>11.2f} {rps/base:>8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
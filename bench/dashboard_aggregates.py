@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Dashboard aggregation: client-side Counter loops vs. server-side RPCs
+=====================================================================
+
+  $ python -m bench.dashboard_aggregates --sizes 1000 10000 100000 --latency-ms 5
+
+A SQLite-backed stand-in for PostgREST holds ``species_summary_v``,
+``predictions`` and ``data_quality_log`` with N rows each. It understands the
+GET filters the views use (select / eq / order / limit) and answers
+POST /rpc/<fn> with SQLite translations of dashboard/sql/dashboard_aggregates.sql,
+so the aggregation really runs in the database. Per dashboard and size:
+
+    before   – the pre-RPC views: fetch every row, count in Python
+    fallback – dashboard/services/aggregates.py with the RPCs not deployed
+    rpc      – dashboard/services/aggregates.py with the RPCs
+
+Reported: mean latency and bytes on the wire per page load.
+"""
+
+from __future__ import annotations
+import argparse, json, random, sqlite3, statistics, threading, time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+USER = "00000000-0000-0000-0000-000000000001"
+
+SCHEMA = """
+create table species_summary_v (species_id int, species_name text, family text, taille text,
+    description text, total_images int, completeness_percentage real, region_bucket text);
+create table predictions (id int, user_id text, predicted_species text, created_at text,
+    latitude real, longitude real, image_url text);
+create table data_quality_log (id int, table_name text, execution_time text,
+    test_results text, error_description text);
+create index predictions_user_created_idx on predictions (user_id, created_at desc);
+create index data_quality_log_table_time_idx on data_quality_log (table_name, execution_time desc);
+"""
+
+# SQLite stand-ins for the Postgres functions (json_group_array ≈ json_agg)
+RPC_SQL = {
+    "dashboard_species_summary": """
+        with mv as (
+          select species_id, min(species_name) species_name, min(family) family,
+                 min(taille) taille, min(description) description,
+                 max(total_images) total_images,
+                 max(completeness_percentage) completeness_percentage,
+                 json_group_array(distinct region_bucket) regions
+          from species_summary_v group by species_id)
+        select json_object(
+          'rows', (select json_group_array(json_object(
+                      'species_id', species_id, 'species_name', species_name, 'family', family,
+                      'taille', taille, 'description', description, 'total_images', total_images,
+                      'completeness_percentage', completeness_percentage, 'regions', json(regions)))
+                   from mv),
+          'family_counts', (select json_group_array(json_object('label', family, 'n', n))
+                            from (select family, count(*) n from mv group by family
+                                  order by n desc, family)),
+          'region_counts', (select json_group_array(json_object('label', region_bucket, 'n', n))
+                            from (select region_bucket, count(distinct species_id) n
+                                  from species_summary_v group by region_bucket
+                                  order by n desc, region_bucket)))""",
+    "user_prediction_counts": """
+        with recent as (
+          select predicted_species, created_at from predictions
+          where user_id = :p_user_id order by created_at desc limit :p_limit)
+        select json_object(
+          'species', (select json_group_array(json_object('label', predicted_species, 'n', n))
+                      from (select predicted_species, count(*) n from recent
+                            where predicted_species is not null
+                            group by predicted_species order by n desc, predicted_species)),
+          'days', (select json_group_array(json_object('label', day, 'n', n))
+                   from (select substr(created_at, 1, 10) day, count(*) n from recent
+                         group by day order by day)))""",
+    "data_quality_latest": """
+        select json_group_array(json_object(
+                 'id', id, 'table_name', table_name, 'execution_time', execution_time,
+                 'test_results', test_results, 'error_description', error_description))
+        from data_quality_log d
+        where execution_time = (select max(execution_time) from data_quality_log
+                                where table_name = d.table_name)""",
+}
+
+
+class _StandIn(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    db        = None
+    lock      = threading.Lock()
+    delay     = 0.0
+    rpc       = True
+    bytes_out = 0
+
+    def _send(self, code, body: bytes):
+        time.sleep(self.delay)
+        type(self).bytes_out += len(body)
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url   = urlparse(self.path)
+        table = url.path.rsplit("/", 1)[-1]
+        sql, args = f"select {{cols}} from {table}", []
+        where, order, limit, cols = [], "", "", "*"
+        for key, (val,) in parse_qs(url.query).items():
+            if key == "select":
+                cols = val
+            elif key == "order":
+                col, _, direction = val.partition(".")
+                order = f" order by {col} {'desc' if direction == 'desc' else 'asc'}"
+            elif key == "limit":
+                limit = f" limit {int(val)}"
+            elif val.startswith("eq."):
+                where.append(f"{key} = ?"); args.append(val[3:])
+        sql = sql.format(cols=cols) + (" where " + " and ".join(where) if where else "") + order + limit
+        with self.lock:
+            cur  = self.db.execute(sql, args)
+            names = [d[0] for d in cur.description]
+            rows = [dict(zip(names, r)) for r in cur.fetchall()]
+        self._send(200, json.dumps(rows).encode())
+
+    def do_POST(self):
+        fn     = urlparse(self.path).path.rsplit("/", 1)[-1]
+        params = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if not self.rpc or fn not in RPC_SQL:
+            return self._send(404, json.dumps({"code": "PGRST202", "message": f"function {fn} not found",
+                                               "details": None, "hint": None}).encode())
+        with self.lock:
+            (out,) = self.db.execute(RPC_SQL[fn], params).fetchone()
+        self._send(200, out.encode())
+
+    def log_message(self, *args):
+        pass
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+
+def _fixture(n: int) -> sqlite3.Connection:
+    rnd = random.Random(n)
+    db  = sqlite3.connect(":memory:", check_same_thread=False)
+    db.executescript(SCHEMA)
+    n_species = max(1, n // 6)
+    db.executemany("insert into species_summary_v values (?,?,?,?,?,?,?,?)", [
+        (s, f"Species {s}", f"Family {s % 12}", "40-60 cm", "Lorem ipsum " * 20,
+         100 + s, 50 + s % 50, f"Region {(s + r) % 15}")
+        for s in range(n_species) for r in range(6)])
+    db.executemany("insert into predictions values (?,?,?,?,?,?,?)", [
+        (i, USER, f'("Species {rnd.randrange(40)}",0.{rnd.randrange(10, 99)})',
+         f"2025-{1 + i * 12 // n:02d}-{1 + i % 28:02d}T10:00:00+00:00",
+         45 + rnd.random(), 5 + rnd.random(), f"https://img.example/{i}.jpg")
+        for i in range(n)])
+    db.executemany("insert into data_quality_log values (?,?,?,?,?)", [
+        (i, f"table_{i % 5}", f"2025-01-01T00:00:{i:08d}",
+         f"[{rnd.randrange(100)}, {rnd.randrange(100)}, {rnd.randrange(100)}]", None)
+        for i in range(n)])
+    db.commit()
+    return db
+
+
+# ─── "before": the view code as it was ─────────────────────────────────────
+def _before_species(sb):
+    from dashboard.services import species_summary
+    species_summary.aggregate(sb.table("species_summary_v").select("*").execute().data)
+
+
+def _before_user(sb):
+    rows = (sb.table("predictions").select("*").eq("user_id", USER)
+              .order("created_at", desc=True).limit(200).execute().data)
+    species, daily = Counter(r["predicted_species"] for r in rows), Counter(r["created_at"][:10] for r in rows)
+    return rows[:25], species, sorted(daily)
+
+
+def _before_quality(sb):
+    logs = sb.table("data_quality_log").select("*").order("execution_time", desc=True).execute().data
+    latest = {}
+    for row in logs:
+        latest.setdefault(row["table_name"], row)
+    return latest, [r for r in reversed(logs) if r["table_name"] == "table_0"]
+
+
+def _time(fn, repeat):
+    _StandIn.bytes_out = 0
+    out = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        out.append((time.perf_counter() - t0) * 1000)
+    return statistics.mean(out), _StandIn.bytes_out / repeat
+
+
+def main():
+    ap = argparse.ArgumentParser("dashboard aggregation pushdown benchmark")
+    ap.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    ap.add_argument("--latency-ms", type=float, default=5.0, help="simulated round trip per request")
+    ap.add_argument("--repeat", type=int, default=10)
+    args = ap.parse_args()
+
+    _StandIn.delay = args.latency_ms / 1000
+    server = _Server(("127.0.0.1", 0), _StandIn)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    from django.conf import settings
+    settings.configure(SUPABASE_URL=f"http://127.0.0.1:{server.server_port}", SUPABASE_KEY="anon")
+    from dashboard.services import aggregates, species_summary
+    from wildlens_backend.supabase_util import service_client
+    sb = service_client()
+
+    def user_new():
+        sb.table("predictions").select("*").eq("user_id", USER) \
+          .order("created_at", desc=True).limit(25).execute()
+        aggregates.prediction_charts(sb, USER)
+
+    def quality_new():
+        aggregates.latest_quality(sb)
+        aggregates.quality_trend(sb, "table_0")
+
+    pages = [
+        ("species summary", lambda: _before_species(sb), lambda: species_summary._compute(sb)),
+        ("user dashboard",  lambda: _before_user(sb),    user_new),
+        ("data quality",    lambda: _before_quality(sb), quality_new),
+    ]
+
+    print(f"{args.latency_ms:.0f} ms simulated round trip, mean of {args.repeat} page loads")
+    print(f"{'rows':>7}  {'page':<16} {'path':<9} {'ms':>9} {'KB':>10}")
+    for n in args.sizes:
+        _StandIn.db = _fixture(n)
+        for name, before, after in pages:
+            results = [("before", _time(before, args.repeat))]
+            for mode in ("fallback", "rpc"):
+                _StandIn.rpc = mode == "rpc"
+                aggregates._missing.clear()
+                results.append((mode, _time(after, args.repeat)))
+            for mode, (ms, nbytes) in results:
+                print(f"{n:>7}  {name:<16} {mode:<9} {ms:>9.2f} {nbytes / 1024:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+In-memory upload path vs. the old NamedTemporaryFile round trip
+==============================================================
+
+  $ python -m bench.inmemory_upload --repeat 50 --tmpdir /tmp
+
+Times what ``PredictionViewSet.create`` does *before* the forward pass:
+
+    tempfile  – write upload chunks to a temp file, PIL re-opens it, unlink
+    in-memory – PIL decodes straight from the upload's buffer
+
+A synthetic 4000×3000 JPEG stands in for a phone photo. Point ``--tmpdir``
+at an overlay-fs directory to reproduce the container numbers.
+"""
+
+from __future__ import annotations
+import argparse, io, os, statistics, tempfile, time
+
+from PIL import Image
+
+from ai.predict import _load_tensor
+
+
+def _photo(w: int, h: int) -> bytes:
+    buf = io.BytesIO()
+    # gradient + noise so the JPEG is not trivially compressible
+    img = Image.effect_noise((w, h), 64).convert("RGB")
+    img.save(buf, "JPEG", quality=90)
+    return buf.getvalue()
+
+
+def _tempfile_path(data: bytes, tmpdir: str | None):
+    src = io.BytesIO(data)
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".jpg", dir=tmpdir) as tmp:
+        for chunk in iter(lambda: src.read(64 * 1024), b""):
+            tmp.write(chunk)
+        path = tmp.name
+    try:
+        return _load_tensor(path)
+    finally:
+        os.remove(path)
+
+
+def _in_memory(data: bytes, tmpdir: str | None):
+    return _load_tensor(io.BytesIO(data))
+
+
+def main():
+    ap = argparse.ArgumentParser("in-memory vs tempfile upload benchmark")
+    ap.add_argument("--repeat", type=int, default=30)
+    ap.add_argument("--size", type=int, nargs=2, default=[4000, 3000])
+    ap.add_argument("--tmpdir", default=None)
+    args = ap.parse_args()
+
+    data = _photo(*args.size)
+    print(f"payload: {len(data)/1e6:.1f} MB JPEG {args.size[0]}x{args.size[1]}")
+    print(f"{'path':>10} {'median ms':>10} {'p90 ms':>8}")
+    for name, fn in (("tempfile", _tempfile_path), ("in-memory", _in_memory)):
+        fn(data, args.tmpdir)                                  # warm-up
+        times = []
+        for _ in range(args.repeat):
+            t0 = time.perf_counter()
+            fn(data, args.tmpdir)
+            times.append((time.perf_counter() - t0) * 1000)
+        times.sort()
+        print(f"{name:>10} {statistics.median(times):>10.1f} "
+              f"{times[int(0.9 * (len(times) - 1))]:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
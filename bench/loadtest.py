@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Load test for the AI service: p50 / p99 latency and RPS as workers scale
+=======================================================================
+
+Against a running service:
+
+  $ python -m bench.loadtest --url http://localhost:8001 --concurrency 32
+
+Or let the harness start ``python -m ai.serve`` itself for each worker count
+(MODEL_PATH / INFERENCE_BACKEND are passed through):
+
+  $ MODEL_PATH=ai/runs/<run>/model.pt python -m bench.loadtest --workers 1 2 4 8
+
+Every client loops ``POST /predict`` for ``--duration`` seconds, twice per
+service:
+
+  uncached   every request carries distinct bytes (a unique tail after the
+             JPEG's end marker – same pixels, new content hash), so each one
+             misses the PredictionCache and runs decode + inference
+  cached     the same JPEG over and over – after the first request this
+             measures the cache hit path, not the model
+
+``--mode`` limits the run to one of them.
+"""
+
+from __future__ import annotations
+import argparse, asyncio, io, itertools, os, socket, statistics, subprocess, sys, time, uuid
+
+import httpx
+from PIL import Image
+
+
+def _jpeg(path: str | None) -> bytes:
+    if path:
+        return open(path, "rb").read()
+    buf = io.BytesIO()
+    Image.effect_noise((1600, 1200), 64).convert("RGB").save(buf, "JPEG", quality=90)
+    return buf.getvalue()
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def _wait_healthy(url: str, timeout: float = 120.0):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get(f"{url}/health")).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.5)
+    raise RuntimeError(f"{url} did not become healthy")
+
+
+def _payloads(payload: bytes, cached: bool):
+    """Endless request bodies: one JPEG, or the JPEG + a unique trailer each time."""
+    if cached:
+        return itertools.repeat(payload)
+    nonce = uuid.uuid4().hex.encode()              # no hits on a disk tier left by older runs
+    return (payload + b"\0" + nonce + str(i).encode() for i in itertools.count())
+
+
+async def _load(url: str, payload: bytes, concurrency: int, duration: float,
+                cached: bool = False) -> dict:
+    latencies, errors = [], 0
+    bodies = _payloads(payload, cached)
+    limits = httpx.Limits(max_connections=concurrency,
+                          max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=60.0) as client:
+        stop_at = time.monotonic() + duration
+
+        async def worker():
+            nonlocal errors
+            while time.monotonic() < stop_at:
+                t0 = time.perf_counter()
+                try:
+                    r = await client.post(f"{url}/predict",
+                                          files={"file": ("x.jpg", next(bodies), "image/jpeg")})
+                    r.raise_for_status()
+                    latencies.append(time.perf_counter() - t0)
+                except httpx.HTTPError:
+                    errors += 1
+
+        t0 = time.monotonic()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.monotonic() - t0
+
+    latencies.sort()
+    n = len(latencies)
+    return {
+        "requests": n,
+        "errors":   errors,
+        "rps":      n / elapsed,
+        "p50_ms":   statistics.median(latencies) * 1000 if n else float("nan"),
+        "p99_ms":   latencies[min(n - 1, int(0.99 * n))] * 1000 if n else float("nan"),
+    }
+
+
+def _row(label, mode, res):
+    print(f"{label:>8} {mode:>9} {res['requests']:>9} {res['errors']:>7} {res['rps']:>8.1f} "
+          f"{res['p50_ms']:>9.1f} {res['p99_ms']:>9.1f}", flush=True)
+
+
+def _run_modes(label, url, payload, args):
+    for mode in args.mode:
+        _row(label, mode, asyncio.run(_load(url, payload, args.concurrency, args.duration,
+                                            cached=mode == "cached")))
+
+
+def main():
+    ap = argparse.ArgumentParser("WildLens AI load test")
+    ap.add_argument("--url", help="existing service; omit to spawn ai.serve")
+    ap.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    ap.add_argument("--concurrency", type=int, default=16)
+    ap.add_argument("--duration", type=float, default=20.0)
+    ap.add_argument("--image", help="JPEG to send (default: synthetic 1600×1200)")
+    ap.add_argument("--mode", nargs="+", choices=["uncached", "cached"],
+                    default=["uncached", "cached"])
+    args = ap.parse_args()
+
+    payload = _jpeg(args.image)
+    print(f"{'workers':>8} {'mode':>9} {'requests':>9} {'errors':>7} {'rps':>8} "
+          f"{'p50 ms':>9} {'p99 ms':>9}")
+
+    if args.url:
+        _run_modes("-", args.url, payload, args)
+        return
+
+    for n in args.workers:
+        port = _free_port()
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "ai.serve", "--host", "127.0.0.1",
+             "--port", str(port), "--workers", str(n), "--log-level", "warning"],
+            env=os.environ.copy())
+        url = f"http://127.0.0.1:{port}"
+        try:
+            asyncio.run(_wait_healthy(url))
+            _run_modes(str(n), url, payload, args)
+        finally:
+            proc.terminate()
+            proc.wait(timeout=30)
+
+
+if __name__ == "__main__":
+    main()
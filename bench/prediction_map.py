@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Prediction map payload: every point vs. server-side clusters
+============================================================
+
+  $ python -m bench.prediction_map --points 1000 10000 100000 --zooms 2 6 10 14
+
+Synthetic observations around ``--hotspots`` centres (Europe-heavy, like
+the real data). For each point count:
+
+    all points – what user_predictions_map embedded / prediction-locations returned
+    zoom z     – GeoIndex.clusters() for a 1280×800 px viewport centred on a
+                 hotspot at that zoom (cold = first query of the level, warm = cached)
+
+Reported: JSON bytes, number of clusters and latency.
+"""
+
+from __future__ import annotations
+import argparse, json, math, random, time
+
+from api.services.geo_index import GeoIndex, unproject, project
+
+VIEW_W, VIEW_H = 1280, 800
+
+
+def _points(n: int, hotspots: int, seed: int = 0) -> list[dict]:
+    rnd = random.Random(seed)
+    centres = [(rnd.uniform(42, 55), rnd.uniform(-5, 15)) if i % 3 else
+               (rnd.uniform(-40, 65), rnd.uniform(-120, 150)) for i in range(hotspots)]
+    species = [f"Species {i}" for i in range(40)]
+    out = []
+    for _ in range(n):
+        lat, lon = rnd.choice(centres)
+        out.append({"species_name": rnd.choice(species),
+                    "lat": f"{lat + rnd.gauss(0, 0.5):.6f}", "lon": f"{lon + rnd.gauss(0, 0.5):.6f}"})
+    return out
+
+
+def _viewport(lat: float, lon: float, zoom: int):
+    """bbox of a VIEW_W × VIEW_H px map centred on (lat, lon)."""
+    x, y = project(lat, lon)
+    world = 256 * 2 ** zoom
+    dx, dy = VIEW_W / 2 / world, VIEW_H / 2 / world
+    top, left = unproject(max(x - dx, 0), max(y - dy, 0))
+    bottom, right = unproject(min(x + dx, 1 - 1e-12), min(y + dy, 1 - 1e-12))
+    return (left, bottom, right, top)
+
+
+def _ms(fn):
+    t0 = time.perf_counter()
+    out = fn()
+    return out, (time.perf_counter() - t0) * 1000
+
+
+def main():
+    ap = argparse.ArgumentParser("prediction map payload benchmark")
+    ap.add_argument("--points", type=int, nargs="+", default=[1000, 10000, 100000])
+    ap.add_argument("--zooms", type=int, nargs="+", default=[2, 6, 10, 14])
+    ap.add_argument("--hotspots", type=int, default=60)
+    args = ap.parse_args()
+
+    print(f"{'points':>7}  {'request':<12} {'KB':>9} {'clusters':>9} {'cold ms':>8} {'warm ms':>8}")
+    for n in args.points:
+        rows = _points(n, args.hotspots)
+        index, build_ms = _ms(lambda: GeoIndex(rows))
+        legacy = len(json.dumps([{"species_name": r["species_name"], "lat": float(r["lat"]),
+                                  "lon": float(r["lon"])} for r in rows]))
+        print(f"{n:>7}  {'all points':<12} {legacy / 1024:>9.1f} {'-':>9} {build_ms:>8.1f} {'-':>8}")
+        centre = (float(rows[0]["lat"]), float(rows[0]["lon"]))
+        for z in args.zooms:
+            bbox = _viewport(*centre, z) if z > 2 else (-180, -85, 180, 85)
+            clusters, cold = _ms(lambda: index.clusters(bbox, z))
+            _, warm = _ms(lambda: index.clusters(bbox, z))
+            size = len(json.dumps({"zoom": z, "total": len(index), "clusters": clusters}))
+            print(f"{n:>7}  {'zoom ' + str(z):<12} {size / 1024:>9.1f} {len(clusters):>9} "
+                  f"{cold:>8.1f} {warm:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+ai.preprocess vs. the old torchvision ToTensor/Normalize path
+============================================================
+
+  $ python -m bench.preprocess --size 4032 3024 --repeat 20
+
+Prints mean latency per image for both pipelines plus the per-stage split
+(open / decode / resize / normalize) of the new one.
+"""
+
+from __future__ import annotations
+import argparse, io, time
+
+from PIL import Image
+from torchvision import transforms
+
+import ai.preprocess as pp
+
+
+def main():
+    ap = argparse.ArgumentParser("preprocessing benchmark")
+    ap.add_argument("--size", type=int, nargs=2, default=[4032, 3024])
+    ap.add_argument("--repeat", type=int, default=20)
+    args = ap.parse_args()
+
+    buf = io.BytesIO()
+    Image.effect_noise(tuple(args.size), 64).convert("RGB").save(buf, "JPEG", quality=90)
+    data = buf.getvalue()
+
+    old = transforms.Compose([
+        transforms.Resize((pp.IMG_SIZE, pp.IMG_SIZE)),
+        transforms.ToTensor(),
+        transforms.Normalize(pp.IMNET_MEAN, pp.IMNET_STD),
+    ])
+    timer = pp.StageTimer()
+    runs  = {
+        "torchvision": lambda: old(Image.open(io.BytesIO(data)).convert("RGB")),
+        "preprocess":  lambda: pp.preprocess(io.BytesIO(data), timer=timer),
+    }
+    print(f"JPEG {args.size[0]}x{args.size[1]}  ({len(data)/1e6:.1f} MB)")
+    for name, fn in runs.items():
+        fn()
+        t0 = time.perf_counter()
+        for _ in range(args.repeat):
+            fn()
+        print(f"{name:>12}: {(time.perf_counter() - t0) / args.repeat * 1000:7.1f} ms/img")
+    print("stages:", timer.stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Species lookup: PostgREST ilike round trip vs. in-process catalogue
+===================================================================
+
+  $ python -m bench.species_catalog --species 60 --latency-ms 20
+
+A local stand-in for PostgREST serves ``infos_especes`` (``--species``
+rows) after ``--latency-ms``. Timed per lookup:
+
+    ilike     – what species_info / PredictionViewSet.create did
+    exact     – species_catalog.lookup() with the stored spelling
+    accents   – upper-case, accents stripped ('ECUREUIL ROUX')
+    fuzzy     – one typo ('Ecureuil rouxx'), difflib fallback
+"""
+
+from __future__ import annotations
+import argparse, json, statistics, threading, time, unicodedata
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs, unquote
+
+NAMES = ["Écureuil roux", "Renard roux", "Castor d'Europe", "Blaireau européen", "Loup gris",
+         "Lynx boréal", "Chevreuil", "Sanglier", "Hérisson", "Loutre d'Europe"]
+
+
+class _StandIn(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    rows  = []
+    delay = 0.0
+
+    def do_GET(self):
+        time.sleep(self.delay)
+        q = parse_qs(urlparse(self.path).query)
+        rows = self.rows
+        if "Espèce" in q:
+            needle = unquote(q["Espèce"][0]).removeprefix("ilike.").casefold()
+            rows = [r for r in rows if r["Espèce"].casefold() == needle]
+        body = json.dumps(rows[: int(q.get("limit", ["1000"])[0])]).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def _time(fn, repeat):
+    out = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        out.append((time.perf_counter() - t0) * 1e6)
+    return statistics.mean(out), statistics.median(out)
+
+
+def main():
+    ap = argparse.ArgumentParser("species catalogue benchmark")
+    ap.add_argument("--species", type=int, default=60)
+    ap.add_argument("--latency-ms", type=float, default=20.0)
+    ap.add_argument("--repeat", type=int, default=200)
+    args = ap.parse_args()
+
+    _StandIn.rows = [{"species_id": i, "Espèce": NAMES[i] if i < len(NAMES) else f"Espèce {i}",
+                      "Famille": "Famille", "Description": "Lorem ipsum " * 30}
+                     for i in range(args.species)]
+    _StandIn.delay = args.latency_ms / 1000
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StandIn)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    from django.conf import settings
+    settings.configure(SUPABASE_URL=f"http://127.0.0.1:{server.server_port}", SUPABASE_KEY="anon")
+    from api.services import species_catalog
+    from wildlens_backend.supabase_util import service_client
+    sb = service_client()
+    stripped = unicodedata.normalize("NFKD", NAMES[0]).encode("ascii", "ignore").decode().upper()
+
+    t0 = time.perf_counter()
+    species_catalog.get()
+    print(f"{args.species} species, {args.latency_ms:.0f} ms upstream latency, "
+          f"catalogue load {(time.perf_counter() - t0) * 1000:.1f} ms")
+    print(f"{'lookup':<10} {'mean µs':>10} {'p50 µs':>10}")
+    cases = [
+        ("ilike",   lambda: sb.table("infos_especes").select("*").ilike("Espèce", NAMES[0]).limit(1).execute(), 20),
+        ("exact",   lambda: species_catalog.lookup(sb, NAMES[0]), args.repeat),
+        ("accents", lambda: species_catalog.lookup(sb, stripped), args.repeat),
+        ("fuzzy",   lambda: species_catalog.lookup(sb, "Ecureuil rouxx"), args.repeat),
+    ]
+    for label, fn, repeat in cases:
+        mean, p50 = _time(fn, repeat)
+        print(f"{label:<10} {mean:>10.1f} {p50:>10.1f}")
+    print(species_catalog.stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+species_summary_v aggregation: cold vs. warm cache
+==================================================
+
+  $ python -m bench.species_summary --species 400 --regions 6 --latency-ms 40
+
+A local stand-in for PostgREST serves a species_summary_v of
+``--species × --regions`` rows after ``--latency-ms``. Timed per request:
+
+    uncached – what every dashboard view did: fetch the view + aggregate
+    cold     – get_summary() right after invalidate() (fetch, aggregate, store)
+    warm     – get_summary() served from the cache
+
+for the locmem and file cache backends.
+"""
+
+from __future__ import annotations
+import argparse, json, statistics, tempfile, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _StandIn(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    body  = b"[]"
+    delay = 0.0
+
+    def do_GET(self):
+        time.sleep(self.delay)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, *args):
+        pass
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+
+def _rows(n_species: int, n_regions: int) -> list[dict]:
+    return [{"species_id": s, "species_name": f"Species {s}", "family": f"Family {s % 12}",
+             "taille": "40-60 cm", "description": "Lorem ipsum " * 20,
+             "total_images": 100 + s, "completeness_percentage": 50 + s % 50,
+             "region_bucket": f"Region {(s + r) % 15}"}
+            for s in range(n_species) for r in range(n_regions)]
+
+
+def _time(fn, repeat: int) -> list[float]:
+    out = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        out.append((time.perf_counter() - t0) * 1000)
+    return out
+
+
+def _row(label, ms):
+    print(f"{label:<16} {statistics.mean(ms):>9.2f} {statistics.median(ms):>9.2f} {max(ms):>9.2f}")
+
+
+def main():
+    ap = argparse.ArgumentParser("species summary cache benchmark")
+    ap.add_argument("--species", type=int, default=400)
+    ap.add_argument("--regions", type=int, default=6)
+    ap.add_argument("--latency-ms", type=float, default=40.0)
+    ap.add_argument("--repeat", type=int, default=30)
+    args = ap.parse_args()
+
+    _StandIn.body  = json.dumps(_rows(args.species, args.regions)).encode()
+    _StandIn.delay = args.latency_ms / 1000
+    server = _Server(("127.0.0.1", 0), _StandIn)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    from django.conf import settings
+    settings.configure(
+        SUPABASE_URL=f"http://127.0.0.1:{server.server_port}", SUPABASE_KEY="anon",
+        CACHES={
+            "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+            "file":    {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+                        "LOCATION": tempfile.mkdtemp(prefix="wl-cache-")},
+        })
+    from dashboard.services import species_summary as svc
+    from wildlens_backend.supabase_util import service_client
+
+    def uncached():
+        svc.aggregate(service_client().table(svc.VIEW).select("*").execute().data)
+
+    print(f"{args.species * args.regions} rows ({len(_StandIn.body) / 1024:.0f} KB), "
+          f"{args.latency_ms:.0f} ms upstream latency")
+    print(f"{'path':<16} {'mean ms':>9} {'p50 ms':>9} {'max ms':>9}")
+    _row("uncached", _time(uncached, args.repeat))
+    for alias in ("default", "file"):
+        svc.CACHE_ALIAS = alias
+        name = "locmem" if alias == "default" else alias
+
+        def cold():
+            svc.invalidate()
+            svc.get_summary()
+
+        _row(f"cold ({name})", _time(cold, args.repeat))
+        _row(f"warm ({name})", _time(svc.get_summary, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
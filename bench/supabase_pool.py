@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Per-request Supabase overhead: create_client + set_session vs. pooled PostgREST
+==============================================================================
+
+  $ python -m bench.supabase_pool --calls 300 --connect-ms 20 --users 10
+
+A local stand-in for Supabase answers ``/auth/v1/user`` and any
+``/rest/v1/<table>`` GET with a few rows. ``--connect-ms`` is slept once per
+*new* TCP connection to mimic the TCP + TLS handshake to a hosted project.
+
+    per-request – what client_for_request did: create_client(),
+                  auth.set_session() (GoTrue round trip), then the query
+    pooled      – wildlens_backend.supabase_util.client_for_request()
+
+Requests rotate over ``--users`` distinct JWTs.
+"""
+
+from __future__ import annotations
+import argparse, json, statistics, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import jwt as pyjwt
+
+SECRET   = "wildlens-bench-secret-0123456789abcdef"
+ANON_KEY = pyjwt.encode({"role": "anon"}, SECRET, algorithm="HS256")
+ROWS = json.dumps([{"id": i, "predicted_species": '("Castor",0.91)'} for i in range(25)]).encode()
+USER = json.dumps({"id": "u", "aud": "authenticated", "role": "authenticated",
+                   "app_metadata": {}, "user_metadata": {},
+                   "created_at": "2025-01-01T00:00:00Z"}).encode()
+
+
+class _StandIn(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    connect_delay = 0.0
+    connections = 0
+
+    def setup(self):
+        super().setup()
+        type(self).connections += 1
+        time.sleep(self.connect_delay)           # handshake cost of a new connection
+
+    def do_GET(self):
+        body = USER if self.path.startswith("/auth/v1/user") else ROWS
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads     = True
+    request_queue_size = 128
+
+
+def _serve(connect_ms: float) -> str:
+    _StandIn.connect_delay = connect_ms / 1000
+    server = _Server(("127.0.0.1", 0), _StandIn)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}"
+
+
+def _tokens(n: int) -> list[str]:
+    exp = int(time.time()) + 3600
+    return [pyjwt.encode({"sub": f"user-{i}", "aud": "authenticated", "role": "authenticated",
+                          "exp": exp}, SECRET, algorithm="HS256") for i in range(n)]
+
+
+def _run(label, fn, tokens, calls):
+    _StandIn.connections = 0
+    lat = []
+    for i in range(calls):
+        t0 = time.perf_counter()
+        fn(tokens[i % len(tokens)])
+        lat.append(time.perf_counter() - t0)
+    lat.sort()
+    print(f"{label:<12} {statistics.mean(lat) * 1000:>8.2f} {lat[len(lat) // 2] * 1000:>8.2f} "
+          f"{lat[min(len(lat) - 1, int(0.99 * len(lat)))] * 1000:>8.2f} {_StandIn.connections:>6}")
+
+
+def main():
+    ap = argparse.ArgumentParser("Supabase client pooling benchmark")
+    ap.add_argument("--calls", type=int, default=300)
+    ap.add_argument("--connect-ms", type=float, default=20.0,
+                    help="simulated TCP+TLS handshake per new connection")
+    ap.add_argument("--users", type=int, default=10)
+    args = ap.parse_args()
+
+    url = _serve(args.connect_ms)
+    from django.conf import settings
+    settings.configure(SUPABASE_URL=url, SUPABASE_KEY=ANON_KEY)
+    from supabase import create_client
+    from wildlens_backend.supabase_util import client_for_request, pool_stats
+
+    def per_request(token):
+        sb = create_client(url, ANON_KEY)
+        sb.auth.set_session(access_token=token, refresh_token="")
+        sb.table("predictions").select("*").limit(25).execute()
+
+    def pooled(token):
+        request = SimpleNamespace(META={"HTTP_AUTHORIZATION": f"Bearer {token}"}, session={})
+        client_for_request(request).table("predictions").select("*").limit(25).execute()
+
+    tokens = _tokens(args.users)
+    print(f"{args.calls} calls, {args.users} users, {args.connect_ms:.0f} ms per new connection")
+    print(f"{'client':<12} {'mean ms':>8} {'p50 ms':>8} {'p99 ms':>8} {'conns':>6}")
+    _run("per-request", per_request, tokens, args.calls)
+    _run("pooled", pooled, tokens, args.calls)
+    print(pool_stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Training epoch: ImageFolder (decode every epoch) vs. uint8 shards
+=================================================================
+
+  $ python -m bench.training_data --images 600 --size 1024 768 --epochs 3
+
+Writes ``--images`` synthetic JPEGs (``--classes`` folders) to a temp dir
+and times what one train_model epoch reads: the weighted-sampled training
+pass plus the val pass and the training-set re-evaluation train_loop runs
+(``--passes`` full passes over the data per epoch).
+
+    imagefolder – datasets.ImageFolder + Resize/ToTensor/Normalize (old path)
+    shards      – utils.shards.ShardDataset + batch collate; the one-off
+                  build time is reported separately
+
+``--model`` adds a ResNet-18 forward (no grad) per batch to show how much
+of an epoch the input pipeline is.
+"""
+
+from __future__ import annotations
+import argparse, tempfile, time
+from pathlib import Path
+
+import torch
+from PIL import Image
+from torch.utils.data import DataLoader
+from torchvision import datasets, transforms
+
+from ai.utils.shards import build_shards, ShardDataset, IMNET_MEAN, IMNET_STD
+
+
+def _corpus(root: Path, n: int, classes: int, size):
+    for i in range(n):
+        d = root / f"class{i % classes}"
+        d.mkdir(parents=True, exist_ok=True)
+        Image.effect_noise(tuple(size), 64).convert("RGB").save(d / f"{i}.jpg", quality=90)
+
+
+def _epoch(loader, passes: int, model) -> float:
+    t0 = time.perf_counter()
+    with torch.no_grad():
+        for _ in range(passes):
+            for xb, _ in loader:
+                if model is not None:
+                    model(xb)
+    return time.perf_counter() - t0
+
+
+def main():
+    ap = argparse.ArgumentParser("training data-path benchmark")
+    ap.add_argument("--images", type=int, default=600)
+    ap.add_argument("--classes", type=int, default=6)
+    ap.add_argument("--size", type=int, nargs=2, default=[1024, 768])
+    ap.add_argument("--epochs", type=int, default=3)
+    ap.add_argument("--passes", type=int, default=3, help="data passes per epoch (train + 2 evals)")
+    ap.add_argument("--batch", type=int, default=32)
+    ap.add_argument("--model", action="store_true")
+    args = ap.parse_args()
+
+    model = None
+    if args.model:
+        from torchvision.models import resnet18
+        model = resnet18(weights=None).eval()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp) / "data"
+        _corpus(root, args.images, args.classes, args.size)
+
+        tfm = transforms.Compose([transforms.Resize((224, 224)), transforms.ToTensor(),
+                                  transforms.Normalize(IMNET_MEAN, IMNET_STD)])
+        old = DataLoader(datasets.ImageFolder(root, tfm), batch_size=args.batch, shuffle=True)
+
+        t0 = time.perf_counter()
+        build_shards(root, Path(tmp) / "shards")
+        build = time.perf_counter() - t0
+        ds  = ShardDataset(Path(tmp) / "shards", root)
+        new = DataLoader(ds, batch_size=args.batch, shuffle=True, collate_fn=ds.collate)
+
+        print(f"{args.images} × {args.size[0]}×{args.size[1]} JPEG, {args.passes} passes/epoch"
+              f"{', + resnet18 forward' if model else ''}")
+        print(f"shard build (once): {build:.2f}s")
+        print(f"{'path':<12} {'epoch s (mean)':>15} {'img/s':>9} {'total s':>9}")
+        for name, loader in (("imagefolder", old), ("shards", new)):
+            times = [_epoch(loader, args.passes, model) for _ in range(args.epochs)]
+            mean = sum(times) / len(times)
+            total = sum(times) + (build if name == "shards" else 0)
+            print(f"{name:<12} {mean:>15.2f} {args.images * args.passes / mean:>9.0f} {total:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+# dashboard/services/aggregates.py
+"""
+Dashboard aggregates computed by Postgres instead of Python.
+
+The functions in dashboard/sql/dashboard_aggregates.sql return a few small
+rows (labels + counts) through PostgREST's /rpc endpoint, so the views no
+longer download every row of species_summary_v / predictions /
+data_quality_log to count them with Counter loops:
+
+    dashboard_species_summary()          rows + family / region counts
+    user_prediction_counts(uid, limit)   species pie + per-day line
+    data_quality_latest()                latest result per table
+    refresh_species_summary()            rebuild species_summary_mv (ETL hook)
+
+Per-user charts first read ``prediction_stats`` (dashboard/sql/
+prediction_stats.sql): running counts kept by a trigger on predictions, so
+the read is one small query however long the user's history is.
+
+Until the SQL file has been applied the RPC answers "function not found";
+each helper then falls back to the old client-side aggregation (once per
+process, see ``_missing``) so a deploy can precede the migration.
+"""
+import ast, os, logging
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from postgrest.exceptions import APIError
+
+log = logging.getLogger(__name__)
+
+RECENT_PREDICTIONS = int(os.getenv("DASHBOARD_RECENT_PREDICTIONS", 200))
+
+STATS_DAYS         = int(os.getenv("DASHBOARD_STATS_DAYS", 365))
+
+# PostgREST: function / table not in schema cache, undefined function / relation
+MISSING_CODES = {"PGRST202", "PGRST205", "42883", "42P01"}
+
+_missing: set[str] = set()                 # RPCs / tables known to be absent in this process
+_stats = {"rpc_calls": 0, "fallbacks": 0}
+
+
+def _absent(fn: str, exc: APIError) -> bool:
+    if exc.code not in MISSING_CODES:
+        return False
+    if fn not in _missing:
+        log.warning("%s missing – aggregating client-side; apply "
+                    "the files in dashboard/sql/", fn)
+    _missing.add(fn)
+    return True
+
+
+def _rpc(sb, fn, params=None):
+    """Sync RPC call; None when the function is not deployed."""
+    if fn in _missing:
+        return None
+    try:
+        _stats["rpc_calls"] += 1
+        return sb.rpc(fn, params or {}).execute().data
+    except APIError as exc:
+        if _absent(fn, exc):
+            return None
+        raise
+
+
+async def _arpc(sb, fn, params=None):
+    if fn in _missing:
+        return None
+    try:
+        _stats["rpc_calls"] += 1
+        return (await sb.rpc(fn, params or {}).execute()).data
+    except APIError as exc:
+        if _absent(fn, exc):
+            return None
+        raise
+
+
+def _series(pairs) -> tuple[list, list]:
+    """[{"label": l, "n": n}, …] → ([l, …], [n, …])"""
+    pairs = pairs or []
+    return [p["label"] for p in pairs], [p["n"] for p in pairs]
+
+
+def parse_tests(raw) -> list:
+    """test_results is stored as text like "[1, 0, 1]" (or already a list)."""
+    if isinstance(raw, list):
+        return raw
+    try:
+        vec = ast.literal_eval(raw)
+    except (ValueError, SyntaxError, TypeError):
+        return []
+    return list(vec) if isinstance(vec, (list, tuple)) else []
+
+
+# ─── species_summary_v ─────────────────────────────────────────────────────
+SPECIES_RPC = "dashboard_species_summary"
+
+
+def species_from_rollup(payload: dict) -> dict:
+    """dashboard_species_summary() JSON → the dict species_summary.aggregate() builds."""
+    rows = []
+    for r in payload.get("rows") or []:
+        regions = sorted(r.pop("regions", None) or [])
+        rows.append({**r, "region_set": regions, "region": ", ".join(regions)})
+    family_labels, family_values = _series(payload.get("family_counts"))
+    region_labels, region_values = _series(payload.get("region_counts"))
+    return {
+        "rows":          rows,
+        "species_names": [r["species_name"] for r in rows],
+        "images_count":  [r["total_images"] for r in rows],
+        "completeness":  [r["completeness_percentage"] for r in rows],
+        "family_labels": family_labels,
+        "family_values": family_values,
+        "region_labels": region_labels,
+        "region_values": region_values,
+    }
+
+
+REFRESH_RPC = "refresh_species_summary"
+
+
+def refresh_species(sb) -> bool:
+    """REFRESH species_summary_mv (service role); False when it is not deployed."""
+    _rpc(sb, REFRESH_RPC)
+    return REFRESH_RPC not in _missing
+
+
+def species_rollup(sb):
+    """Server-side species summary, or None when the RPC is not deployed."""
+    payload = _rpc(sb, SPECIES_RPC)
+    return None if payload is None else species_from_rollup(payload)
+
+
+async def aspecies_rollup(sb):
+    payload = await _arpc(sb, SPECIES_RPC)
+    return None if payload is None else species_from_rollup(payload)
+
+
+# ─── predictions: pie + per-day line ───────────────────────────────────────
+PREDICTIONS_RPC = "user_prediction_counts"
+STATS_TABLE     = "prediction_stats"
+
+
+def count_predictions(rows: list[dict]) -> dict:
+    """Client-side fallback; same shape as user_prediction_counts()."""
+    species, days = Counter(), Counter()
+    for r in rows:
+        if r.get("predicted_species"):
+            species[r["predicted_species"]] += 1
+        if r.get("created_at"):
+            days[r["created_at"][:10]] += 1            # YYYY-MM-DD
+    return {
+        "species": [{"label": k, "n": n} for k, n in species.most_common()],
+        "days":    [{"label": d, "n": days[d]} for d in sorted(days)],
+    }
+
+
+def _charts(counts: dict) -> dict:
+    pie_labels, pie_values   = _series(counts.get("species"))
+    line_labels, line_values = _series(counts.get("days"))
+    return {"pie_labels": pie_labels, "pie_values": pie_values,
+            "line_labels": line_labels, "line_values": line_values}
+
+
+def _recent(sb, user_id):
+    return (sb.table("predictions")
+              .select("predicted_species,created_at")
+              .eq("user_id", user_id)
+              .order("created_at", desc=True)
+              .limit(RECENT_PREDICTIONS))
+
+
+def _stats_query(sb, user_id):
+    cutoff = (datetime.now(timezone.utc) - timedelta(days=STATS_DAYS)).strftime("%Y-%m-%d")
+    return (sb.table(STATS_TABLE)
+              .select("kind,label,n")
+              .eq("user_id", user_id)
+              .or_(f"kind.eq.species,and(kind.eq.day,label.gte.{cutoff})"))
+
+
+def from_stats(rows: list[dict]) -> dict:
+    """prediction_stats rows → the shape of user_prediction_counts()."""
+    species = sorted((r for r in rows if r["kind"] == "species" and r["n"] > 0),
+                     key=lambda r: (-r["n"], r["label"]))
+    days    = sorted((r for r in rows if r["kind"] == "day" and r["n"] > 0),
+                     key=lambda r: r["label"])
+    return {"species": [{"label": r["label"], "n": r["n"]} for r in species],
+            "days":    [{"label": r["label"], "n": r["n"]} for r in days]}
+
+
+def _read_stats(sb, user_id):
+    if STATS_TABLE in _missing:
+        return None
+    try:
+        return from_stats(_stats_query(sb, user_id).execute().data or [])
+    except APIError as exc:
+        if _absent(STATS_TABLE, exc):
+            return None
+        raise
+
+
+async def _aread_stats(sb, user_id):
+    if STATS_TABLE in _missing:
+        return None
+    try:
+        return from_stats((await _stats_query(sb, user_id).execute()).data or [])
+    except APIError as exc:
+        if _absent(STATS_TABLE, exc):
+            return None
+        raise
+
+
+def prediction_charts(sb, user_id) -> dict:
+    """
+    pie_labels/pie_values/line_labels/line_values for one user: running
+    totals from prediction_stats, else user_prediction_counts() over the
+    latest predictions, else counted here.
+    """
+    counts = _read_stats(sb, user_id)
+    if counts is None:
+        counts = _rpc(sb, PREDICTIONS_RPC, {"p_user_id": user_id, "p_limit": RECENT_PREDICTIONS})
+    if counts is None:
+        _stats["fallbacks"] += 1
+        counts = count_predictions(_recent(sb, user_id).execute().data or [])
+    return _charts(counts)
+
+
+async def aprediction_charts(sb, user_id) -> dict:
+    counts = await _aread_stats(sb, user_id)
+    if counts is None:
+        counts = await _arpc(sb, PREDICTIONS_RPC, {"p_user_id": user_id, "p_limit": RECENT_PREDICTIONS})
+    if counts is None:
+        _stats["fallbacks"] += 1
+        counts = count_predictions((await _recent(sb, user_id).execute()).data or [])
+    return _charts(counts)
+
+
+# ─── data_quality_log ──────────────────────────────────────────────────────
+QUALITY_COLUMNS = "table_name,execution_time,test_results,error_description"
+
+
+def latest_per_table(rows: list[dict]) -> list[dict]:
+    """Client-side fallback of data_quality_latest(); rows newest first."""
+    latest = {}
+    for row in rows:
+        latest.setdefault(row["table_name"], row)
+    return list(latest.values())
+
+
+def latest_quality(sb) -> list[dict]:
+    rows = _rpc(sb, "data_quality_latest")
+    if rows is None:
+        _stats["fallbacks"] += 1
+        rows = latest_per_table(sb.table("data_quality_log").select(QUALITY_COLUMNS)
+                                  .order("execution_time", desc=True).execute().data or [])
+    return rows
+
+
+def quality_trend(sb, table_name: str) -> dict:
+    """Exhaustivité / Pertinence / Exactitude over time for one table (ascending)."""
+    rows = (sb.table("data_quality_log").select("execution_time,test_results")
+              .eq("table_name", table_name).order("execution_time").execute().data or [])
+    times, exhaust, pertinence, exactitude = [], [], [], []
+    for row in rows:
+        vec = parse_tests(row["test_results"])
+        if len(vec) == 3:
+            times.append(row["execution_time"])
+            exhaust.append(vec[0]); pertinence.append(vec[1]); exactitude.append(vec[2])
+    return {"times": times, "exhaust": exhaust,
+            "pertinence": pertinence, "exactitude": exactitude}
+
+
+def stats() -> dict:
+    return {**_stats, "missing_rpcs": sorted(_missing)}
@@ -0,0 +1,153 @@
+# dashboard/services/species_summary.py
+"""
+One aggregation of ``species_summary_v`` for every dashboard view.
+
+The view yields one row per (species, region bucket); every page used to
+refetch it and rebuild the same species / family / region counters per
+request. ``get_summary()`` (sync views) and ``aget_summary()`` (async
+views) compute it once and keep the result in Django's cache framework
+(settings.CACHES – locmem by default, file or Redis via DJANGO_CACHE):
+
+    key  = species_summary:<version>      TTL = SPECIES_SUMMARY_TTL (600 s)
+
+``invalidate()`` bumps the version, so with a shared backend every worker
+drops the old aggregate at once. It runs when an ETL is triggered and via
+POST /admin-dashboard/species-summary/invalidate/ (for the ETL job to call
+when it finishes) through ``refresh_and_invalidate()``, which first
+refreshes species_summary_mv with the service-role key (SUPABASE_SERVICE_KEY).
+
+The aggregate itself comes from the ``dashboard_species_summary()`` RPC
+(see aggregates.py) – one row per species plus the family / region counts;
+``aggregate()`` over the raw view is the fallback until it is deployed.
+"""
+import os, threading, logging
+from collections import Counter
+from django.conf import settings
+from django.core.cache import caches
+from postgrest.exceptions import APIError
+
+from wildlens_backend.supabase_util import service_client, aservice_client, client_for_token
+from dashboard.services import aggregates
+
+log = logging.getLogger(__name__)
+
+CACHE_ALIAS  = os.getenv("SPECIES_SUMMARY_CACHE", "default")
+TTL          = int(os.getenv("SPECIES_SUMMARY_TTL", 600))
+VERSION_KEY  = "species_summary:version"
+VIEW         = "species_summary_v"
+
+_lock = threading.Lock()               # one recompute per process at a time
+
+
+def _cache():
+    return caches[CACHE_ALIAS]
+
+
+def aggregate(data: list[dict]) -> dict:
+    """Dedupe species, merge their region buckets and build the chart series."""
+    species_map = {}
+    for row in data:
+        sid = row["species_id"]
+        info = species_map.setdefault(sid, {
+            "species_id":   sid,
+            "species_name": row["species_name"],
+            "family":       row["family"],
+            "taille":       row.get("taille"),
+            "description":  row.get("description"),
+            "total_images": row.get("total_images"),
+            "completeness_percentage": row.get("completeness_percentage"),
+            "region_set":   set(),
+        })
+        bucket = row.get("region_bucket") or row.get("region") or ""
+        if bucket:
+            info["region_set"].add(bucket)
+
+    rows, family_counter, region_counter = [], Counter(), Counter()
+    for info in species_map.values():
+        regions = sorted(info["region_set"])
+        rows.append({**info, "region_set": regions, "region": ", ".join(regions)})
+        family_counter[info["family"]] += 1
+        for r in regions:
+            region_counter[r] += 1
+
+    return {
+        "rows":          rows,
+        "species_names": [r["species_name"] for r in rows],
+        "images_count":  [r["total_images"] for r in rows],
+        "completeness":  [r["completeness_percentage"] for r in rows],
+        "family_labels": list(family_counter.keys()),
+        "family_values": list(family_counter.values()),
+        "region_labels": list(region_counter.keys()),
+        "region_values": list(region_counter.values()),
+    }
+
+
+def _key(version) -> str:
+    return f"species_summary:{version}"
+
+
+def _compute(sb) -> dict:
+    summary = aggregates.species_rollup(sb)
+    if summary is None:
+        summary = aggregate(sb.table(VIEW).select("*").execute().data or [])
+    return summary
+
+
+async def _acompute(sb) -> dict:
+    summary = await aggregates.aspecies_rollup(sb)
+    if summary is None:
+        summary = aggregate((await sb.table(VIEW).select("*").execute()).data or [])
+    return summary
+
+
+def get_summary() -> dict:
+    cache   = _cache()
+    version = cache.get_or_set(VERSION_KEY, 1, None)
+    summary = cache.get(_key(version))
+    if summary is None:
+        with _lock:
+            summary = cache.get(_key(version))        # filled while we waited
+            if summary is None:
+                summary = _compute(service_client())
+                cache.set(_key(version), summary, TTL)
+    return summary
+
+
+async def aget_summary() -> dict:
+    cache   = _cache()
+    version = await cache.aget_or_set(VERSION_KEY, 1, None)
+    summary = await cache.aget(_key(version))
+    if summary is None:
+        summary = await _acompute(await aservice_client())
+        await cache.aset(_key(version), summary, TTL)
+    return summary
+
+
+def invalidate() -> int:
+    """Drop the cached aggregate in every worker sharing the cache; returns the new version."""
+    cache = _cache()
+    try:
+        return cache.incr(VERSION_KEY)
+    except ValueError:                                  # key missing / evicted
+        cache.set(VERSION_KEY, 2, None)
+        return 2
+
+
+def refresh_and_invalidate() -> dict:
+    """
+    ETL hook: REFRESH species_summary_mv, then drop the cached aggregate.
+    execute on refresh_species_summary() is revoked from the API roles, so
+    this needs the service-role key; the cache is invalidated either way.
+    """
+    out = {"mv_refreshed": False}
+    key = settings.SUPABASE_SERVICE_KEY
+    if not key:
+        out["detail"] = "SUPABASE_SERVICE_KEY is not set – species_summary_mv not refreshed"
+    else:
+        try:
+            out["mv_refreshed"] = aggregates.refresh_species(client_for_token(key))
+        except APIError as exc:
+            log.warning("refresh_species_summary failed: %s %s", exc.code, exc.message)
+            out["detail"] = f"refresh_species_summary failed: {exc.message} ({exc.code})"
+    out["version"] = invalidate()
+    return out
@@ -0,0 +1,104 @@
+-- dashboard/sql/dashboard_aggregates.sql
+-- ---------------------------------------------------------------------------
+-- Server-side aggregates for the dashboards (dashboard/services/aggregates.py).
+-- Apply once in the Supabase SQL editor or with
+--   psql "$SUPABASE_DB_URL" -f dashboard/sql/dashboard_aggregates.sql
+-- The Python side falls back to client-side aggregation while these
+-- functions are missing, so deploying the code first is safe.
+-- ---------------------------------------------------------------------------
+
+-- 1) species_summary_v rolled up to one row per species ---------------------
+--    (the view has one row per species × region bucket; a row without a
+--    bucket falls back to its plain "region" column, as aggregate() does –
+--    read through to_jsonb so the MV also builds where that column is absent)
+drop materialized view if exists species_summary_mv;
+create materialized view species_summary_mv as
+select species_id,
+       min(species_name)            as species_name,
+       min(family)                  as family,
+       min(taille)                  as taille,
+       min(description)             as description,
+       max(total_images)            as total_images,
+       max(completeness_percentage) as completeness_percentage,
+       coalesce(array_agg(distinct r.region)
+                filter (where r.region <> ''), '{}') as regions
+from species_summary_v v
+cross join lateral (select coalesce(nullif(v.region_bucket, ''),
+                                    to_jsonb(v) ->> 'region') as region) r
+group by species_id;
+
+create unique index if not exists species_summary_mv_pk on species_summary_mv (species_id);
+
+-- rows + family / region distributions in ONE round trip
+create or replace function dashboard_species_summary()
+returns json
+language sql stable
+as $$
+  select json_build_object(
+    'rows', coalesce((select json_agg(m order by m.species_id) from species_summary_mv m), '[]'),
+    'family_counts', coalesce((
+        select json_agg(json_build_object('label', family, 'n', n) order by n desc, family)
+        from (select family, count(*) as n from species_summary_mv group by family) f), '[]'),
+    'region_counts', coalesce((
+        select json_agg(json_build_object('label', region, 'n', n) order by n desc, region)
+        from (select unnest(regions) as region, count(*) as n
+              from species_summary_mv group by 1) r), '[]')
+  );
+$$;
+
+-- called by POST /admin-dashboard/species-summary/invalidate/ (the ETL
+-- job's hook) right before the cached aggregate is dropped
+create or replace function refresh_species_summary()
+returns void
+language sql
+security definer
+set search_path = public, pg_temp
+as $$
+  refresh materialized view concurrently species_summary_mv;
+$$;
+revoke execute on function refresh_species_summary() from public, anon, authenticated;
+
+-- 2) per-user prediction distribution + per-day counts ----------------------
+--    security invoker: RLS on predictions still limits rows to auth.uid()
+create index if not exists predictions_user_created_idx
+  on predictions (user_id, created_at desc);
+
+--    p_limit keeps the window of the old client-side charts (latest 200)
+create or replace function user_prediction_counts(p_user_id uuid, p_limit int default 200)
+returns json
+language sql stable
+as $$
+  with recent as (
+    select predicted_species, created_at
+    from predictions
+    where user_id = p_user_id
+    order by created_at desc
+    limit p_limit
+  )
+  select json_build_object(
+    'species', coalesce((
+        select json_agg(json_build_object('label', predicted_species, 'n', n) order by n desc, predicted_species)
+        from (select predicted_species, count(*) as n
+              from recent
+              where predicted_species is not null
+              group by predicted_species) s), '[]'),
+    'days', coalesce((
+        select json_agg(json_build_object('label', day, 'n', n) order by day)
+        from (select to_char(created_at at time zone 'utc', 'YYYY-MM-DD') as day, count(*) as n
+              from recent
+              group by 1) d), '[]')
+  );
+$$;
+
+-- 3) latest data-quality result per table -----------------------------------
+create index if not exists data_quality_log_table_time_idx
+  on data_quality_log (table_name, execution_time desc);
+
+create or replace function data_quality_latest()
+returns setof data_quality_log
+language sql stable
+as $$
+  select distinct on (table_name) *
+  from data_quality_log
+  order by table_name, execution_time desc;
+$$;
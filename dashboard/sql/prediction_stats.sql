@@ -0,0 +1,140 @@
+-- dashboard/sql/prediction_stats.sql
+-- ---------------------------------------------------------------------------
+-- Running per-user prediction statistics (dashboard/services/aggregates.py).
+-- Apply after dashboard_aggregates.sql, then fill the table once with
+--   python manage.py backfill_prediction_stats
+-- ---------------------------------------------------------------------------
+
+-- one row per (user, species label) and per (user, UTC day), plus one
+-- ('version', '') row per user bumped by every write to their predictions:
+-- the cheap source of the predictions list ETag (api/services/history.py)
+create table if not exists prediction_stats (
+  user_id uuid   not null,
+  kind    text   not null,
+  label   text   not null,
+  n       bigint not null default 0,
+  primary key (user_id, kind, label)
+);
+alter table prediction_stats drop constraint if exists prediction_stats_kind_check;
+alter table prediction_stats add constraint prediction_stats_kind_check
+  check (kind in ('species', 'day', 'version'));
+
+alter table prediction_stats enable row level security;
+drop policy if exists prediction_stats_own on prediction_stats;
+create policy prediction_stats_own on prediction_stats
+  for select using (user_id = auth.uid());
+
+-- statement-level: a bulk insert of N rows is one grouped upsert, not N.
+-- security definer → pin search_path so an object in a caller-writable
+-- schema cannot shadow prediction_stats
+create or replace function prediction_stats_apply()
+returns trigger
+language plpgsql
+security definer
+set search_path = public, pg_temp
+as $$
+begin
+  if tg_op = 'INSERT' then
+    insert into prediction_stats (user_id, kind, label, n)
+    select user_id, 'species', predicted_species, count(*)
+    from new_rows where predicted_species is not null
+    group by 1, 3
+    union all
+    select user_id, 'day', to_char(created_at at time zone 'utc', 'YYYY-MM-DD'), count(*)
+    from new_rows
+    group by 1, 3
+    on conflict (user_id, kind, label) do update set n = prediction_stats.n + excluded.n;
+    insert into prediction_stats (user_id, kind, label, n)
+    select distinct user_id, 'version', '', 1 from new_rows
+    on conflict (user_id, kind, label) do update set n = prediction_stats.n + 1;
+  elsif tg_op = 'UPDATE' then
+    -- a relabel (predicted_species), a moved created_at or user_id: apply
+    -- the net change per key, so rows whose counted columns did not change
+    -- cancel out and write nothing
+    insert into prediction_stats (user_id, kind, label, n)
+    select user_id, kind, label, sum(n)
+    from (select user_id, 'species' as kind, predicted_species as label, 1 as n
+          from new_rows where predicted_species is not null
+          union all
+          select user_id, 'day', to_char(created_at at time zone 'utc', 'YYYY-MM-DD'), 1
+          from new_rows
+          union all
+          select user_id, 'species', predicted_species, -1
+          from old_rows where predicted_species is not null
+          union all
+          select user_id, 'day', to_char(created_at at time zone 'utc', 'YYYY-MM-DD'), -1
+          from old_rows) d
+    group by 1, 2, 3
+    having sum(n) <> 0
+    on conflict (user_id, kind, label) do update set n = prediction_stats.n + excluded.n;
+    delete from prediction_stats where n <= 0;
+    -- any update (notes, location …) changes the list → bump every owner
+    insert into prediction_stats (user_id, kind, label, n)
+    select user_id, 'version', '', 1
+    from (select user_id from new_rows union select user_id from old_rows) u
+    on conflict (user_id, kind, label) do update set n = prediction_stats.n + 1;
+  else
+    update prediction_stats s set n = s.n - d.n
+    from (select user_id, 'species' as kind, predicted_species as label, count(*) as n
+          from old_rows where predicted_species is not null group by 1, 3
+          union all
+          select user_id, 'day', to_char(created_at at time zone 'utc', 'YYYY-MM-DD'), count(*)
+          from old_rows group by 1, 3) d
+    where s.user_id = d.user_id and s.kind = d.kind and s.label = d.label;
+    delete from prediction_stats where n <= 0;
+    insert into prediction_stats (user_id, kind, label, n)
+    select distinct user_id, 'version', '', 1 from old_rows
+    on conflict (user_id, kind, label) do update set n = prediction_stats.n + 1;
+  end if;
+  return null;
+end;
+$$;
+
+drop trigger if exists predictions_stats_ins on predictions;
+create trigger predictions_stats_ins
+  after insert on predictions
+  referencing new table as new_rows
+  for each statement execute function prediction_stats_apply();
+
+drop trigger if exists predictions_stats_del on predictions;
+create trigger predictions_stats_del
+  after delete on predictions
+  referencing old table as old_rows
+  for each statement execute function prediction_stats_apply();
+
+-- no column list (UPDATE OF predicted_species): Postgres does not allow
+-- transition tables on column-specific triggers
+drop trigger if exists predictions_stats_upd on predictions;
+create trigger predictions_stats_upd
+  after update on predictions
+  referencing old table as old_rows new table as new_rows
+  for each statement execute function prediction_stats_apply();
+
+-- rebuild from scratch (all users, or one) – backfill_prediction_stats
+create or replace function rebuild_prediction_stats(p_user_id uuid default null)
+returns bigint
+language sql
+security definer
+set search_path = public, pg_temp
+as $$
+  -- version rows survive (and are bumped below): a reset could repeat an ETag
+  delete from prediction_stats
+  where kind <> 'version' and (p_user_id is null or user_id = p_user_id);
+  insert into prediction_stats (user_id, kind, label, n)
+  select user_id, 'species', predicted_species, count(*)
+  from predictions
+  where predicted_species is not null and (p_user_id is null or user_id = p_user_id)
+  group by 1, 3
+  union all
+  select user_id, 'day', to_char(created_at at time zone 'utc', 'YYYY-MM-DD'), count(*)
+  from predictions
+  where p_user_id is null or user_id = p_user_id
+  group by 1, 3;
+  insert into prediction_stats (user_id, kind, label, n)
+  select distinct user_id, 'version', '', 1
+  from predictions
+  where p_user_id is null or user_id = p_user_id
+  on conflict (user_id, kind, label) do update set n = prediction_stats.n + 1;
+  select count(*) from prediction_stats where p_user_id is null or user_id = p_user_id;
+$$;
+revoke execute on function rebuild_prediction_stats(uuid) from public, anon, authenticated;
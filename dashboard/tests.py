@@ -0,0 +1,48 @@
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+from postgrest.exceptions import APIError
+
+from dashboard.services import aggregates, species_summary
+
+
+class _Denied:
+    """PostgREST stub: the RPC answers 42501 like an API role would get."""
+    def __init__(self):
+        self.calls = []
+
+    def rpc(self, fn, params):
+        self.calls.append(fn)
+        return self
+
+    def execute(self):
+        raise APIError({"code": "42501", "message": "permission denied for function refresh_species_summary",
+                        "details": None, "hint": None})
+
+
+class RefreshAndInvalidateTests(SimpleTestCase):
+    def setUp(self):
+        aggregates._missing.discard(aggregates.REFRESH_RPC)
+        self.version = species_summary._cache().get_or_set(species_summary.VERSION_KEY, 1, None)
+
+    @override_settings(SUPABASE_SERVICE_KEY="service-key")
+    def test_permission_denied_still_invalidates(self):
+        stub = _Denied()
+        with mock.patch.object(species_summary, "client_for_token", return_value=stub) as for_token:
+            out = species_summary.refresh_and_invalidate()
+
+        for_token.assert_called_once_with("service-key")
+        self.assertEqual(stub.calls, [aggregates.REFRESH_RPC])
+        self.assertFalse(out["mv_refreshed"])
+        self.assertIn("42501", out["detail"])
+        self.assertEqual(out["version"], self.version + 1)
+
+    @override_settings(SUPABASE_SERVICE_KEY=None)
+    def test_without_service_key_reports_and_invalidates(self):
+        with mock.patch.object(species_summary, "client_for_token") as for_token:
+            out = species_summary.refresh_and_invalidate()
+
+        for_token.assert_not_called()
+        self.assertFalse(out["mv_refreshed"])
+        self.assertIn("SUPABASE_SERVICE_KEY", out["detail"])
+        self.assertEqual(out["version"], self.version + 1)
@@ -1,7 +1,8 @@
 from django.urls import path
 from .views import (
     admin_dashboard, data_quality_dashboard, run_etl_via_github,
-    run_training, admin_stats_api, data_quality_api, logs_api, run_hpsearch, hpsearch_best_config
+    run_training, admin_stats_api, data_quality_api, logs_api, run_hpsearch, hpsearch_best_config,
+    metrics_api, species_summary_invalidate,
 )
 
 urlpatterns = [
@@ -14,4 +15,7 @@ urlpatterns = [
     path("run-hpsearch/",        run_hpsearch,         name="run_hpsearch"),
     path("hpsearch-best/",       hpsearch_best_config, name="hpsearch_best"),
     path("server-logs/", logs_api, name="server_logs_api"),
+    path("metrics/",     metrics_api, name="metrics_api"),
+    path("species-summary/invalidate/", species_summary_invalidate,
+         name="species_summary_invalidate"),
 ]
@@ -1,10 +1,13 @@
 # dashboard/views.py
 
-import os, jwt, httpx
+import os, jwt, httpx, asyncio
 import requests
 from django.shortcuts import render, redirect
 from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
-from wildlens_backend.supabase_util import client_for_request
+from wildlens_backend.supabase_util import client_for_request, aclient_for_request, aservice_client, pool_stats
+from asgiref.sync import sync_to_async
+from wildlens_backend.middleware import auth_stats
+from dashboard.services import species_summary, aggregates
 from wildlens_backend.auth_decorators import supabase_admin_required
 from django.views.decorators.csrf import csrf_exempt
 from wildlens_backend.local_runner import start_training
@@ -24,9 +27,15 @@ from collections import Counter
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 
+from api.services import ai_client, history, geo_index, species_catalog
 from api.services.ai_client import launch_hp_search, download_best_config
+from ai.predict import registry as model_registry, prediction_cache
 
 LOG_FILE = os.getenv("GUNICORN_LOG", "/app/logs/gunicorn.log")
+INITIAL_MAP_ZOOM = 2
+
+# template context processors may touch the session/user (DB) → thread
+arender = sync_to_async(render)
 
 # ─── GitHub / workflow settings ────────────────────────────────────────────
 GITHUB_TOKEN  = os.getenv("GITHUB_TOKEN", None)           # same var you already use
@@ -117,136 +126,36 @@ def admin_dashboard(request):
     """
 
     try:
-        # Query the multi-row view
-        res_obj = settings.SUPABASE_CLIENT.table("species_summary_v").select("*").execute()
-        data = res_obj.data  # List of dicts, each possibly a different region token
+        # Deduped species + chart series, shared by every summary view
+        summary = species_summary.get_summary()
     except Exception as e:
         return render(request, "dashboard/admin_dashboard.html", {
             "error": f"Supabase query failed: {str(e)}"
         })
 
-    if not data:
+    if not summary["rows"]:
         return render(request, "dashboard/admin_dashboard.html", {
             "error": "No data returned from 'species_summary_v'."
         })
 
-    # ------------------------------------------------------
-    # 1) Build a dictionary so each species is stored only once
-    #    We'll merge the region tokens into a set so we can display them all.
-    # ------------------------------------------------------
-    species_map = {}
-    for row in data:
-        sid = row["species_id"]
-
-        # If we haven't seen this species yet, initialize a record
-        if sid not in species_map:
-            species_map[sid] = {
-                "species_id": sid,
-                "species_name": row["species_name"],
-                "family": row["family"],
-                "taille": row["taille"],
-                "description": row["description"],
-                "total_images": row["total_images"],
-                "completeness_percentage": row["completeness_percentage"],
-                # We'll collect region buckets in a set:
-                "region_set": set()
-            }
-
-        # Add this row's region bucket (or region token) to the set
-        # If your view has a column "region_bucket", use that. Otherwise, it might be "region" or "region_token".
-        # Example: if you named it "region_bucket" in the final SELECT...
-        # species_map[sid]["region_set"].add(row["region_bucket"])
-
-        # If your final column is just "region" but actually splitted:
-        # species_map[sid]["region_set"].add(row["region"])
-
-        # Let's assume the final splitted column is named "region_bucket"
-        # If it's named differently, adjust here:
-        if "region_bucket" in row and row["region_bucket"]:
-            species_map[sid]["region_set"].add(row["region_bucket"])
-        else:
-            # fallback if your splitted column is called "region"
-            # or if there's no splitted column but you want that text
-            if row.get("region"):
-                species_map[sid]["region_set"].add(row["region"])
-
-    # ------------------------------------------------------
-    # 2) Convert species_map -> a list of unique species for the table
-    #    We'll join the region set to display multiple regions in one cell.
-    # ------------------------------------------------------
-    unique_species_list = []
-    for sid, info in species_map.items():
-        # join all region tokens into one string
-        region_str = ", ".join(sorted(info["region_set"]))
-
-        rowdict = {
-            "species_id": sid,
-            "species_name": info["species_name"],
-            "family": info["family"],
-            "taille": info["taille"],
-            "description": info["description"],
-            "total_images": info["total_images"],
-            "completeness_percentage": info["completeness_percentage"],
-            "region": region_str,
-        }
-        unique_species_list.append(rowdict)
-
-    # ------------------------------------------------------
-    # 3) Prepare the "Images by Species" bar chart
-    #    (1 bar per species)
-    # ------------------------------------------------------
-    species_names = []
-    images_count = []
-    for sid, info in species_map.items():
-        species_names.append(info["species_name"])
-        images_count.append(info["total_images"])
-
-    # ------------------------------------------------------
-    # 4) Prepare "Species Count by Family" (pie chart)
-    #    Also 1 record per species
-    # ------------------------------------------------------
-    family_counter = Counter(info["family"] for info in species_map.values())
-    family_labels = list(family_counter.keys())
-    family_values = list(family_counter.values())
-
-    # ------------------------------------------------------
-    # 5) Prepare "Completeness by Species"
-    # ------------------------------------------------------
-    completeness_list = [info["completeness_percentage"] for info in species_map.values()]
-
-    # ------------------------------------------------------
-    # 6) Region distribution: how many species in each region
-    #    Each species can be counted once per region in region_set
-    # ------------------------------------------------------
-    region_counter = Counter()
-    for info in species_map.values():
-        for reg in info["region_set"]:
-            region_counter[reg] += 1
-
-    region_labels = list(region_counter.keys())
-    region_values = list(region_counter.values())
-
-    # ------------------------------------------------------
-    # 7) Pass to the template
-    # ------------------------------------------------------
     context = {
         # For chart #1
-        "species_names_json": json.dumps(species_names),
-        "images_count_json": json.dumps(images_count),
+        "species_names_json": json.dumps(summary["species_names"]),
+        "images_count_json": json.dumps(summary["images_count"]),
 
         # For chart #2
-        "family_labels_json": json.dumps(family_labels),
-        "family_values_json": json.dumps(family_values),
+        "family_labels_json": json.dumps(summary["family_labels"]),
+        "family_values_json": json.dumps(summary["family_values"]),
 
         # For chart #3
-        "completeness_json": json.dumps(completeness_list),
+        "completeness_json": json.dumps(summary["completeness"]),
 
         # For region distribution chart
-        "region_labels_json": json.dumps(region_labels),
-        "region_values_json": json.dumps(region_values),
+        "region_labels_json": json.dumps(summary["region_labels"]),
+        "region_values_json": json.dumps(summary["region_values"]),
 
         # For the details table (unique species only)
-        "species_summary": unique_species_list,
+        "species_summary": summary["rows"],
     }
 
     return render(request, "dashboard/admin_dashboard.html", context)
@@ -265,83 +174,35 @@ def data_quality_dashboard(request):
     table_requested = request.GET.get("table_name", "infos_especes")
 
     try:
-        # 2) Fetch ALL logs. We'll filter in Python (or do a second query if you prefer).
-        res = client_for_request(request).table("data_quality_log") \
-            .select("*") \
-            .order("execution_time", desc=True) \
-            .execute()
-
-        logs = res.data or []
+        # 2) Latest row per table + the selected table's history, both
+        #    filtered server-side (see dashboard/services/aggregates.py)
+        sb     = client_for_request(request)
+        latest = aggregates.latest_quality(sb)
+        trend  = aggregates.quality_trend(sb, table_requested)
     except Exception as e:
         return render(request, "dashboard/data_quality_dashboard.html", {
             "error": f"Supabase query failed: {str(e)}"
         })
 
-    if not logs:
+    if not latest:
         return render(request, "dashboard/data_quality_dashboard.html", {
             "error": "No data in data_quality_log."
         })
 
-    # 3) Build "latest" map for display in table, just like before
-    latest_map = {}
-    full_history = []
-    for row in logs:
-        tname = row["table_name"]
-        test_str = row["test_results"]
-        dt = row["execution_time"]
-        err_desc = row["error_description"]
-
-        # parse the vector from something like "[1, 2, 1]"
-        try:
-            tests = eval(test_str)  # or safer parse
-        except:
-            tests = []
-
-        full_history.append({
-            "table_name": tname,
-            "execution_time": dt,
-            "tests": tests,
-            "error_description": err_desc,
-        })
-
-        if tname not in latest_map:
-            latest_map[tname] = {
-                "execution_time": dt,
-                "tests": tests,
-                "error_description": err_desc,
-            }
-
-    # 4) Build lists for the selected table
-    #    We'll assume we want 3 test dimensions (Exhaustivité, Pertinence, Exactitude),
-    #    so we only chart rows that have exactly 3 entries in 'tests'.
-    dimension_times = []
-    dimension_exhaust = []
-    dimension_pertinence = []
-    dimension_exactitude = []
-
-    # We'll reverse() so we go ascending in time
-    for row in reversed(full_history):
-        if row["table_name"] == table_requested and len(row["tests"]) == 3:
-            dimension_times.append(row["execution_time"])
-            dimension_exhaust.append(row["tests"][0])       # index 0 = Exhaustivité
-            dimension_pertinence.append(row["tests"][1])    # index 1 = Pertinence
-            dimension_exactitude.append(row["tests"][2])    # index 2 = Exactitude
-
-    # 5) Convert to JSON
-    times_json = json.dumps(dimension_times)
-    exhaust_json = json.dumps(dimension_exhaust)
-    pertinence_json = json.dumps(dimension_pertinence)
-    exactitude_json = json.dumps(dimension_exactitude)
-
-    # 6) Convert 'latest_map' to a list for the "latest results" table
-    latest_list = []
-    for tbl_name, info in latest_map.items():
-        latest_list.append({
-            "table_name": tbl_name,
-            "execution_time": info["execution_time"],
-            "tests": info["tests"],
-            "error_description": info["error_description"],
-        })
+    # 3) "latest results" table
+    latest_list = [{
+        "table_name": row["table_name"],
+        "execution_time": row["execution_time"],
+        "tests": aggregates.parse_tests(row["test_results"]),
+        "error_description": row["error_description"],
+    } for row in latest]
+
+    # 4) Trend for the selected table: 3 test dimensions
+    #    (Exhaustivité, Pertinence, Exactitude), ascending in time
+    times_json = json.dumps(trend["times"])
+    exhaust_json = json.dumps(trend["exhaust"])
+    pertinence_json = json.dumps(trend["pertinence"])
+    exactitude_json = json.dumps(trend["exactitude"])
 
     context = {
         "table_requested": table_requested,  # so we know which option to highlight
@@ -364,46 +225,22 @@ def data_quality_api(request):
     """
     table_name = request.GET.get("table_name", "infos_especes")
 
-    # Pull all logs, same query as before
-    res = client_for_request(request).table("data_quality_log") \
-          .select("*").order("execution_time", desc=True).execute()
-    logs = res.data or []
+    sb     = client_for_request(request)
+    latest = aggregates.latest_quality(sb)
 
-    if not logs:
+    if not latest:
         return Response({"latest_rows": [], "times": []})   # empty payload
 
-    # ─── latest rows (one per table) ───────────────────────
-    latest_map = {}
-    for row in logs:
-        tbl = row["table_name"]
-        latest_map.setdefault(tbl, {
-            "table_name": tbl,
-            "execution_time": row["execution_time"],
-            "tests":   row["test_results"],
-            "error_description": row["error_description"],
-        })
-
-    latest_rows = list(latest_map.values())
+    # ─── latest rows (one per table, computed by Postgres) ──
+    latest_rows = [{
+        "table_name": row["table_name"],
+        "execution_time": row["execution_time"],
+        "tests":   row["test_results"],
+        "error_description": row["error_description"],
+    } for row in latest]
 
     # ─── trend vectors for the requested table ─────────────
-    times, exa, per, exa2 = [], [], [], []
-    for row in reversed(logs):                # ascending time
-        if row["table_name"] == table_name:
-            try:
-                vec = eval(row["test_results"])     # [Exh, Per, Exa]
-            except Exception:
-                vec = []
-            if len(vec) == 3:
-                times.append(row["execution_time"])
-                exa.append(vec[0]);  per.append(vec[1]);  exa2.append(vec[2])
-
-    return Response({
-        "latest_rows": latest_rows,
-        "times":       times,
-        "exhaust":     exa,
-        "pertinence":  per,
-        "exactitude":  exa2,
-    })
+    return Response({"latest_rows": latest_rows, **aggregates.quality_trend(sb, table_name)})
 
 
 @csrf_exempt
@@ -438,6 +275,8 @@ def run_etl_via_github(request):
         response = requests.post(url, json=payload, headers=headers)
         if response.status_code == 204:
             # 204 means "No Content" but success from GitHub
+            species_summary.invalidate()       # the workflow calls the hook again when done
+            species_catalog.invalidate()
             return JsonResponse({"message": "ETL workflow triggered successfully."})
         else:
             return JsonResponse({
@@ -468,73 +307,26 @@ def run_training(request):
 
 # ─── API: /admin-dashboard/stats-api/ ────────────────────────────────
 
-@api_view(["GET"])
+@require_GET
 @supabase_admin_required          # ← only admins can hit this route
-def admin_stats_api(request):
+async def admin_stats_api(request):
     """
     Pure-JSON version of admin_dashboard().
     React calls this to obtain all the numbers for charts + table.
     """
-    # 1) Pull every row from the materialised view
-    res_obj = (
-        settings.SUPABASE_CLIENT
-        .table("species_summary_v")
-        .select("*")
-        .execute()
-    )
-    data = res_obj.data or []
-    if not data:
-        return Response({"detail": "No data"}, status=404)
-
-    # 2) Aggregate exactly the same way the HTML template did
-    species_map   = {}
-    family_counter, region_counter = Counter(), Counter()
-
-    for row in data:
-        sid = row["species_id"]
-        bucket = row.get("region_bucket") or row.get("region") or ""
-
-        species_map.setdefault(sid, {
-            "species_id":  sid,
-            "species_name":row["species_name"],
-            "family":      row["family"],
-            "taille":      row["taille"],
-            "description": row["description"],
-            "total_images":row["total_images"],
-            "completeness_percentage": row["completeness_percentage"],
-            "region_set":  set()
-        })
+    summary = await species_summary.aget_summary()
+    if not summary["rows"]:
+        return JsonResponse({"detail": "No data"}, status=404)
 
-        if bucket:
-            species_map[sid]["region_set"].add(bucket)
-
-    # 3) Flatten for the table and chart arrays
-    table_rows      = []
-    images_count    = []
-    completeness_pc = []
-
-    for info in species_map.values():
-        table_rows.append({
-            **info,
-            "region": ", ".join(sorted(info["region_set"])),
-        })
-        images_count.append(info["total_images"])
-        completeness_pc.append(info["completeness_percentage"])
-
-        family_counter[info["family"]] += 1
-        for r in info["region_set"]:
-            region_counter[r] += 1
-
-    # 4) Ship JSON
-    return Response({
-        "rows":            table_rows,
-        "species_names":   [r["species_name"] for r in table_rows],
-        "images_count":    images_count,
-        "family_labels":   list(family_counter.keys()),
-        "family_values":   list(family_counter.values()),
-        "completeness":    completeness_pc,
-        "region_labels":   list(region_counter.keys()),
-        "region_values":   list(region_counter.values()),
+    return JsonResponse({
+        "rows":            summary["rows"],
+        "species_names":   summary["species_names"],
+        "images_count":    summary["images_count"],
+        "family_labels":   summary["family_labels"],
+        "family_values":   summary["family_values"],
+        "completeness":    summary["completeness"],
+        "region_labels":   summary["region_labels"],
+        "region_values":   summary["region_values"],
     })
     
     
@@ -556,38 +348,24 @@ def user_dashboard(request):
 
     sb = client_for_request(request)
     try:
-        res = (
+        # table (last 25)
+        table_rows = (
             sb.table("predictions")
-              .select("*")
+              .select(",".join(history.LIST_FIELDS))
               .eq("user_id", user_id)
               .order("created_at", desc=True)
-              .limit(200)               # enough for the charts
+              .limit(25)
               .execute()
-        )
-        rows = res.data or []
+        ).data or []
+        # pie (species distribution) + line (predictions per day) from the
+        # running per-user totals in prediction_stats (aggregates.py)
+        charts = aggregates.prediction_charts(sb, user_id)
     except Exception as e:
         return render(request, "dashboard/user_dashboard.html",
                       {"error": f"Supabase query failed: {e}"})
 
-    # ---------- build datasets ----------
-    # table (last 25)
-    table_rows = rows[:25]
-
-    # pie – how many times each species was predicted
-    species_counter = {}
-    for r in rows:
-        label = r["predicted_species"]
-        species_counter[label] = species_counter.get(label, 0) + 1
-    pie_labels  = list(species_counter.keys())
-    pie_values  = list(species_counter.values())
-
-    # line – # predictions per day
-    daily_counter = {}
-    for r in rows:
-        day = r["created_at"][:10]            # YYYY-MM-DD
-        daily_counter[day] = daily_counter.get(day, 0) + 1
-    line_labels = sorted(daily_counter.keys())
-    line_values = [daily_counter[d] for d in line_labels]
+    pie_labels,  pie_values  = charts["pie_labels"],  charts["pie_values"]
+    line_labels, line_values = charts["line_labels"], charts["line_values"]
 
     context = {
         "table_rows"     : table_rows,
@@ -598,9 +376,8 @@ def user_dashboard(request):
     }
     return render(request, "dashboard/user_dashboard.html", context)
 
-@csrf_exempt
-@api_view(["GET"])
-def user_stats_api(request):
+@require_GET
+async def user_stats_api(request):
     """
     JSON endpoint for React to fetch exactly the same data
     your old user_dashboard template used to render.
@@ -624,50 +401,23 @@ def user_stats_api(request):
         return JsonResponse({"detail": "Not authenticated."}, status=401)
 
     # 3) Use the Supabase client from settings
-    sb = client_for_request(request)
+    sb = await aclient_for_request(request)
 
     try:
-        res = (
+        # latest 25 rows + server-side pie / line series, fetched concurrently
+        res, charts = await asyncio.gather(
             sb.table("predictions")
-              .select("*")
+              .select(",".join(history.LIST_FIELDS))
               .eq("user_id", user_id)
               .order("created_at", desc=True)
-              .limit(200)
-              .execute()
+              .limit(25)
+              .execute(),
+            aggregates.aprediction_charts(sb, user_id),
         )
-        rows = res.data or []
     except Exception as e:
         return JsonResponse({"detail": f"Supabase query failed: {e}"}, status=500)
 
-    # Build the “table_rows” (latest 25)
-    table_rows = rows[:25]
-
-    # Build the pie‐chart data (species distribution)
-    species_counter = {}
-    for r in rows:
-        label = r.get("predicted_species")
-        if label:
-            species_counter[label] = species_counter.get(label, 0) + 1
-    pie_labels = list(species_counter.keys())
-    pie_values = list(species_counter.values())
-
-    # Build the line‐chart data (# predictions per day)
-    daily_counter = {}
-    for r in rows:
-        created_at = r.get("created_at", "")
-        day = created_at[:10]  # “YYYY-MM-DD”
-        if day:
-            daily_counter[day] = daily_counter.get(day, 0) + 1
-    line_labels = sorted(daily_counter.keys())
-    line_values = [daily_counter[d] for d in line_labels]
-
-    return JsonResponse({
-        "table_rows": table_rows,
-        "pie_labels": pie_labels,
-        "pie_values": pie_values,
-        "line_labels": line_labels,
-        "line_values": line_values,
-    })
+    return JsonResponse({"table_rows": res.data or [], **charts})
 
 # ──────────────────────────────────────────────────────────
 @supabase_login_required
@@ -677,13 +427,7 @@ def user_species_summary(request):
     and open to all authenticated users.
     """
     try:
-        res_obj = (
-            client_for_request(request)
-            .table("species_summary_v")
-            .select("*")
-            .execute()
-        )
-        data = res_obj.data or []
+        summary = species_summary.get_summary()
     except Exception as e:
         return render(
             request,
@@ -691,51 +435,20 @@ def user_species_summary(request):
             {"error": f"Supabase query failed: {e}"}
         )
 
-    if not data:
+    if not summary["rows"]:
         return render(
             request,
             "dashboard/user_species_summary.html",
             {"error": "No data returned from 'species_summary_v'."}
         )
 
-    # ────── Deduplicate & merge region buckets ──────
-    species_map = {}
-    for row in data:
-        sid = row["species_id"]
-        species_map.setdefault(sid, {
-            "species_id": sid,
-            "species_name": row["species_name"],
-            "family": row["family"],
-            "taille": row["taille"],
-            "description": row["description"],
-            "total_images": row["total_images"],
-            "completeness_percentage": row["completeness_percentage"],
-            "region_set": set()
-        })
-        bucket = row.get("region_bucket") or row.get("region") or ""
-        if bucket:
-            species_map[sid]["region_set"].add(bucket)
-
-    # ────── Build the table and aggregation counters ──────
-    unique_species = []
-    family_counter, region_counter = Counter(), Counter()
-
-    for s in species_map.values():
-        unique_species.append({
-            **s,
-            "region": ", ".join(sorted(s["region_set"]))
-        })
-        family_counter[s["family"]] += 1
-        for r in s["region_set"]:
-            region_counter[r] += 1
-
     # ────── Prepare context (only family & region) ──────
     context = {
-        "species_summary": unique_species,
-        "family_labels_json": json.dumps(list(family_counter.keys())),
-        "family_values_json": json.dumps(list(family_counter.values())),
-        "region_labels_json": json.dumps(list(region_counter.keys())),
-        "region_values_json": json.dumps(list(region_counter.values())),
+        "species_summary": summary["rows"],
+        "family_labels_json": json.dumps(summary["family_labels"]),
+        "family_values_json": json.dumps(summary["family_values"]),
+        "region_labels_json": json.dumps(summary["region_labels"]),
+        "region_values_json": json.dumps(summary["region_values"]),
     }
     return render(request, "dashboard/user_species_summary.html", context)
 
@@ -754,81 +467,43 @@ def species_summary_api(request):
         "region_values":   [...]
       }
     """
-    # ----- fetch data exactly like the template view -----
-    res = (
-        client_for_request(request)
-        .table("species_summary_v")
-        .select("*")
-        .execute()
-    )
-    data = res.data or []
-
-    # ----- dedupe + aggregation (identical logic) --------
-    species_map, family_counter, region_counter = {}, Counter(), Counter()
-    for row in data:
-        sid = row["species_id"]
-        bucket = row.get("region_bucket") or row.get("region") or ""
-        species_map.setdefault(sid, {
-            "species_id": sid,
-            "species_name": row["species_name"],
-            "family": row["family"],
-            "region_set": set()
-        })
-        if bucket:
-            species_map[sid]["region_set"].add(bucket)
-
-    rows = []
-    for info in species_map.values():
-        rows.append({
-            **info,
-            "region": ", ".join(sorted(info["region_set"]))
-        })
-        family_counter[info["family"]] += 1
-        for r in info["region_set"]:
-            region_counter[r] += 1
-
+    summary = species_summary.get_summary()
     return Response({
-        "rows":            rows,
-        "family_labels":   list(family_counter.keys()),
-        "family_values":   list(family_counter.values()),
-        "region_labels":   list(region_counter.keys()),
-        "region_values":   list(region_counter.values()),
+        "rows":            summary["rows"],
+        "family_labels":   summary["family_labels"],
+        "family_values":   summary["family_values"],
+        "region_labels":   summary["region_labels"],
+        "region_values":   summary["region_values"],
     })
 
 @supabase_login_required
-@cache_page(60)              # 1-minute cache; map data doesn’t change often
-def user_predictions_map(request):
+async def user_predictions_map(request):
     """
-    World map with every prediction's lat/lon + species label.
+    World map of predictions. Only the clusters of the initial world view
+    are embedded; Leaflet then asks /api/prediction-clusters/ for the
+    visible box on every pan / zoom (api/services/geo_index.py). The index
+    is kept per user (MAP_INDEX_SCOPE).
     """
     try:
-        res = (
-            client_for_request(request) 
-            .table("prediction_locations_v")
-            .select("species_name,lat,lon")
-            .execute()
-        )
-        # cast lat/lon to float to avoid JS "1E-5" strings
-        points = [
-            {"species_name": p["species_name"],
-             "lat": float(p["lat"]), "lon": float(p["lon"])}
-            for p in (res.data or [])
-        ]
+        index = await geo_index.aindex_for(request, await aclient_for_request(request))
     except Exception as e:
-        return render(
+        return await arender(
             request, "dashboard/user_map.html",
             {"error": f"Supabase query failed: {e}"}
         )
 
-    return render(request, "dashboard/user_map.html",
-                  {"points_json": json.dumps(points)})
+    clusters = await asyncio.to_thread(index.clusters, (-180, -85, 180, 85), INITIAL_MAP_ZOOM)
+    return await arender(request, "dashboard/user_map.html", {
+        "clusters_json": json.dumps(clusters),
+        "initial_zoom":  INITIAL_MAP_ZOOM,
+    })
     
     
     
     
 @require_GET
 @supabase_login_required
-def species_info_api(request):
+async def species_info_api(request):
     """
     GET /api/species-info?name=Red%20Fox
     or   /api/species-info?id=123
@@ -840,22 +515,12 @@ def species_info_api(request):
     if not name and not sid:
         return JsonResponse({"detail": "name or id required"}, status=400)
 
-    sb = client_for_request(request) 
-    SPECIES_COL = 'Espèce'              # ← EXACT column name in Supabase
-
-    qry = sb.table("infos_especes").select("*").limit(1)
-    if sid:
-        qry = qry.eq("species_id", sid)
-    else:
-        # For case-insensitive match you can use .ilike()
-        # If the accent causes trouble, strip it or lowercase both sides.
-        qry = qry.ilike(SPECIES_COL, name)
-
-    res = qry.single().execute()
-    if not res.data:
+    sb  = await aclient_for_request(request)
+    row = await species_catalog.alookup(sb, name, species_id=sid)
+    if not row:
         return JsonResponse({"detail": "Not found"}, status=404)
 
-    return JsonResponse(res.data)
+    return JsonResponse(row)
 
 
 
@@ -941,4 +606,37 @@ def hpsearch_best_config(request):
         if exc.response.status_code == 404:
             return Response({"detail": "study still running"}, status=404)
         raise
-    return Response(yaml_text, content_type="application/x-yaml")
\ No newline at end of file
+    return Response(yaml_text, content_type="application/x-yaml")
+
+
+# ───────────────────────────────────────────────────────────
+@api_view(["POST"])
+@supabase_admin_required
+def species_summary_invalidate(request):
+    """
+    Admin API: POST /admin-dashboard/species-summary/invalidate/
+    Called by the ETL workflow once species_summary_v has been refreshed.
+    The rollup MV is refreshed first (service-role key), else the new
+    version re-reads stale rows; "mv_refreshed" / "detail" report the outcome.
+    """
+    species_catalog.invalidate()             # infos_especes may have changed too
+    return Response(species_summary.refresh_and_invalidate())
+
+
+@api_view(["GET"])
+@supabase_admin_required
+def metrics_api(request):
+    """
+    Admin API: GET /admin-dashboard/metrics/
+    In-process counters of *this* worker (model loads, cache hits, …).
+    """
+    return Response({
+        "model_registry":   model_registry.stats(),
+        "prediction_cache": prediction_cache.stats(),
+        "ai_client":        ai_client.stats(),
+        "supabase_pool":    pool_stats(),
+        "auth":             auth_stats(),
+        "aggregates":       aggregates.stats(),
+        "geo_index":        geo_index.stats(),
+        "species_catalog":  species_catalog.stats(),
+    })
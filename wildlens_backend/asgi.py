@@ -2,6 +2,8 @@
 ASGI config for wildlens_backend project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+This is the production entry point (gunicorn + uvicorn workers, see the
+Dockerfile); ``async def`` views run on the worker's event loop.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
@@ -14,3 +16,7 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'wildlens_backend.settings')
 
 application = get_asgi_application()
+
+# reference data (infos_especes) is loaded before the first request needs it
+from api.services import species_catalog  # noqa: E402
+species_catalog.preload()
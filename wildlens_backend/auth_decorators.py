@@ -1,32 +1,54 @@
 # mysite/auth_decorators.py
 from functools import wraps
+from asgiref.sync import iscoroutinefunction, sync_to_async
 from django.http import JsonResponse
 import logging
 log = logging.getLogger("supabase")
 
-def supabase_login_required(view_func):
-    @wraps(view_func)
-    def _wrapped(request, *args, **kwargs):
+
+def _remember_uid(request):
+    # Keep UID in session for old code that reads request.session['supabase_uid']
+    request.session["supabase_uid"] = request.supabase_user["sub"]
+
+
+def _not_admin(request):
+    app_meta = request.supabase_user.get("app_metadata", {}) or {}
+    return app_meta.get("role") != "admin"
+
+
+def _guard(view_func, admin: bool):
+    """Wrap sync *and* async views; the session write never blocks the loop."""
+    def _denied(request):
         if not hasattr(request, "supabase_user"):
             log.debug("Decorator – no user on request")
             return JsonResponse({"detail": "Not authenticated"}, status=401)
+        if admin and _not_admin(request):
+            return JsonResponse({"detail": "Not authorized"}, status=403)
+        return None
 
-        # Keep UID in session for old code that reads request.session['supabase_uid']
-        request.session["supabase_uid"] = request.supabase_user["sub"]
+    if iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def _async_wrapped(request, *args, **kwargs):
+            denied = _denied(request)
+            if denied:
+                return denied
+            await sync_to_async(_remember_uid)(request)
+            return await view_func(request, *args, **kwargs)
+        return _async_wrapped
+
+    @wraps(view_func)
+    def _wrapped(request, *args, **kwargs):
+        denied = _denied(request)
+        if denied:
+            return denied
+        _remember_uid(request)
         return view_func(request, *args, **kwargs)
     return _wrapped
 
 
-def supabase_admin_required(view_func):
-    @wraps(view_func)
-    def _wrapped(request, *args, **kwargs):
-        if not hasattr(request, "supabase_user"):
-            return JsonResponse({"detail": "Not authenticated"}, status=401)
+def supabase_login_required(view_func):
+    return _guard(view_func, admin=False)
 
-        app_meta = request.supabase_user.get("app_metadata", {}) or {}
-        if app_meta.get("role") != "admin":
-            return JsonResponse({"detail": "Not authorized"}, status=403)
 
-        request.session["supabase_uid"] = request.supabase_user["sub"]
-        return view_func(request, *args, **kwargs)
-    return _wrapped
+def supabase_admin_required(view_func):
+    return _guard(view_func, admin=True)
@@ -6,9 +6,12 @@ import concurrent.futures
 import threading
 
 import subprocess
+from ai.predict import registry
 
 def _run_script(cmd):
     subprocess.run(cmd, check=True)
+    # the new run is on disk → serve it from this worker right away
+    registry.reload()
 
 _RUNNING = False
 _LOCK = threading.Lock()
@@ -0,0 +1,48 @@
+# wildlens_backend/metrics.py
+"""
+Tiny in-process metrics for /admin-dashboard/metrics/ (per worker, reset on
+restart). No Prometheus dependency – the admin endpoint just serialises
+``snapshot()``.
+"""
+import bisect, threading
+
+
+class Histogram:
+    """Fixed-bucket latency histogram in milliseconds (cumulative counts)."""
+
+    def __init__(self, buckets_ms=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25)):
+        self.buckets = tuple(buckets_ms)
+        self.counts  = [0] * (len(self.buckets) + 1)          # last = +Inf
+        self.count   = 0
+        self.sum_ms  = 0.0
+        self._lock   = threading.Lock()
+
+    def observe(self, ms: float):
+        with self._lock:
+            self.counts[bisect.bisect_left(self.buckets, ms)] += 1
+            self.count  += 1
+            self.sum_ms += ms
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-quantile."""
+        if not self.count:
+            return 0.0
+        rank, seen = q * self.count, 0
+        for bound, n in zip(self.buckets + (float("inf"),), self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def snapshot(self) -> dict:
+        cumulative, running = {}, 0
+        for bound, n in zip(self.buckets + ("+Inf",), self.counts):
+            running += n
+            cumulative[f"le_{bound}"] = running
+        return {
+            "count":   self.count,
+            "mean_ms": round(self.sum_ms / self.count, 4) if self.count else 0.0,
+            "p50_ms":  self.quantile(0.50),
+            "p99_ms":  self.quantile(0.99),
+            "buckets": cumulative,
+        }
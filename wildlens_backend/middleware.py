@@ -1,53 +1,168 @@
 # mysite/middleware.py
-import os
+import os, hashlib, threading, time
+from collections import OrderedDict
 import jwt, logging
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
 from django.http import JsonResponse
+from wildlens_backend.metrics import Histogram
 
 log = logging.getLogger("supabase")
 
 SUPABASE_JWT_SECRET = os.getenv("SUPABASE_JWT_SECRET")    # copy from Supabase → Settings → API
+TOKEN_CACHE_SIZE    = int(os.getenv("JWT_CACHE_SIZE", 1024))
+
+# per-request time spent finding + verifying the token (exposed on /metrics)
+auth_latency = Histogram()
+
+
+class TokenCache:
+    """
+    Verified tokens by digest → claims. A hit skips the HMAC + claim checks
+    but still honours ``exp``; only tokens that passed ``jwt.decode`` are
+    stored, so a forged token can never be served from here.
+    """
+
+    def __init__(self, size: int = TOKEN_CACHE_SIZE):
+        self.size    = size
+        self.entries = OrderedDict()
+        self.lock    = threading.Lock()
+        self.hits = self.misses = 0
+
+    @staticmethod
+    def key(token: str) -> bytes:
+        return hashlib.blake2b(token.encode(), digest_size=16).digest()
+
+    def get(self, key):
+        with self.lock:
+            payload = self.entries.get(key)
+            if payload is None:
+                self.misses += 1
+                return None
+            exp = payload.get("exp")
+            if exp is not None and exp <= time.time():
+                del self.entries[key]
+                raise jwt.ExpiredSignatureError("Signature has expired")
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return payload
+
+    def put(self, key, payload):
+        if self.size <= 0:
+            return
+        with self.lock:
+            self.entries[key] = payload
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        return {"size": len(self.entries), "hits": self.hits, "misses": self.misses}
+
+
+token_cache = TokenCache()
+
+
+def verify(token: str) -> dict:
+    """Claims of a valid Supabase access token; raises ``jwt.InvalidTokenError``."""
+    key = TokenCache.key(token)
+    payload = token_cache.get(key)
+    if payload is None:
+        payload = jwt.decode(
+            token,
+            SUPABASE_JWT_SECRET,
+            algorithms=["HS256"],
+            audience="authenticated",
+        )
+        token_cache.put(key, payload)
+    return payload
+
+
+def _bearer(request):
+    auth_header = request.META.get("HTTP_AUTHORIZATION", "")
+    if auth_header.startswith("Bearer "):
+        log.debug("Found Bearer header")
+        return auth_header.split(" ", 1)[1]
+    return None
+
 
 class SupabaseAuthMiddleware:
+    """
+    Decodes the Supabase JWT – ``Authorization: Bearer`` header first, the
+    login session as fallback – into ``request.supabase_user``. Works in both
+    the WSGI and the ASGI stack, so async views are not pushed onto a thread.
+
+    Only a bad *Bearer* token is answered with 401. An expired / invalid
+    session token is dropped from the session and the request continues
+    unauthenticated, so the browser can still reach the login page.
+    """
+    sync_capable  = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
 
     def __call__(self, request):
-        token = None
-
-        auth_header = request.META.get("HTTP_AUTHORIZATION", "")
-        if auth_header.startswith("Bearer "):
-            token = auth_header.split(" ", 1)[1]
-            log.debug("Found Bearer header")
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        t0 = time.perf_counter()
+        token = _bearer(request)
+        if token:
+            error = self._authenticate(request, token)
+        else:
+            error = self._authenticate(request, self._session_token(request), from_session=True)
+        auth_latency.observe((time.perf_counter() - t0) * 1000)
+        return error or self.get_response(request)
 
-        if not token:
-            token = request.session.get("supabase_token")
-        auth_header = request.META.get("HTTP_AUTHORIZATION", "")
-        if auth_header.startswith("Bearer "):
-            token = auth_header.split(" ", 1)[1]
+    async def __acall__(self, request):
+        t0 = time.perf_counter()
+        token = _bearer(request)
+        if token:
+            error = self._authenticate(request, token)
         else:
-            token = None
-            if token:
-                log.debug("Using token from session")
+            # the session may hit the database → keep it off the event loop
+            token = await sync_to_async(self._session_token)(request)
+            error = self._authenticate(request, token, from_session=True)
+        auth_latency.observe((time.perf_counter() - t0) * 1000)
+        return error or await self.get_response(request)
+
+    @staticmethod
+    def _session_token(request):
+        token = request.session.get("supabase_token")
+        if token:
+            log.debug("Using token from session")
+        return token
 
+    def _authenticate(self, request, token, from_session=False):
+        """Attach the decoded claims; returns a 401 response for a bad Bearer token."""
         if not token:
             log.debug("❌ No token in header *or* session")
-        else:
-            try:
-                payload = jwt.decode(
-                    token,
-                    SUPABASE_JWT_SECRET,
-                    algorithms=["HS256"],
-                    audience="authenticated",
-                )
-                request.supabase_user = payload
-                log.debug("✅ Token OK – sub=%s  role=%s",
-                          payload.get("sub"),
-                          payload.get("app_metadata", {}).get("role"))
-            except jwt.ExpiredSignatureError:
-                log.warning("❌ Token expired")
-                return JsonResponse({"error": "Token expired"}, status=401)
-            except jwt.InvalidTokenError as e:
-                log.warning("❌ Invalid token: %s", e)
-                return JsonResponse({"error": "Invalid token"}, status=401)
-
-        return self.get_response(request)
\ No newline at end of file
+            return None
+        try:
+            payload = verify(token)
+            request.supabase_user = payload
+            log.debug("✅ Token OK – sub=%s  role=%s",
+                      payload.get("sub"),
+                      payload.get("app_metadata", {}).get("role"))
+        except jwt.ExpiredSignatureError:
+            if from_session:
+                return self._drop_session_token(request, "expired")
+            log.warning("❌ Token expired")
+            return JsonResponse({"error": "Token expired"}, status=401)
+        except jwt.InvalidTokenError as e:
+            if from_session:
+                return self._drop_session_token(request, e)
+            log.warning("❌ Invalid token: %s", e)
+            return JsonResponse({"error": "Invalid token"}, status=401)
+        return None
+
+    @staticmethod
+    def _drop_session_token(request, reason):
+        # session already loaded by _session_token → no I/O here
+        log.info("Dropping session token (%s) – continuing unauthenticated", reason)
+        request.session.pop("supabase_token", None)
+        return None
+
+
+def auth_stats() -> dict:
+    return {"latency": auth_latency.snapshot(), "token_cache": token_cache.stats()}
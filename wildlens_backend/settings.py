@@ -23,6 +23,8 @@ load_dotenv(os.path.join(BASE_DIR, ".env"))  # or just load_dotenv()
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 SUPABASE_JWT_SECRET = os.getenv("SUPABASE_JWT_SECRET")
+# service-role key: management commands only (backfills), never request paths
+SUPABASE_SERVICE_KEY = os.getenv("SUPABASE_SERVICE_KEY")
 
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -93,7 +95,15 @@ CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
 ]
 
-AI_SERVICE_URL = os.getenv("AI_SERVICE_URL", "http://ai:8001/predict")
+# paging / caching headers of GET /api/predictions (api/services/history.py)
+CORS_EXPOSE_HEADERS = ["ETag", "Link", "X-Next-Cursor", "X-Since-Cursor"]
+
+# service root; a trailing /predict is tolerated (api/services/ai_client.py)
+AI_SERVICE_URL = os.getenv("AI_SERVICE_URL", "http://ai:8001")
+
+# Uploads up to this size stay in RAM (InMemoryUploadedFile) instead of being
+# spooled to a temp file – 12 MP phone photos are 3-8 MB.
+FILE_UPLOAD_MAX_MEMORY_SIZE = int(os.getenv("FILE_UPLOAD_MAX_MEMORY_SIZE", 20 * 1024 * 1024))
 
 ROOT_URLCONF = 'wildlens_backend.urls'
 
@@ -127,6 +137,23 @@ DATABASES = {
 }
 
 
+# Cache (dashboard aggregates, cache_page)
+# locmem is per worker; "file" or "redis" share entries – and invalidations –
+# across all gunicorn workers. DJANGO_CACHE_LOCATION overrides the default.
+_CACHE_BACKENDS = {
+    "locmem": ("django.core.cache.backends.locmem.LocMemCache", "wildlens"),
+    "file":   ("django.core.cache.backends.filebased.FileBasedCache", "/tmp/wildlens-cache"),
+    "redis":  ("django.core.cache.backends.redis.RedisCache", "redis://redis:6379/1"),
+}
+_cache_backend, _cache_location = _CACHE_BACKENDS[os.getenv("DJANGO_CACHE", "locmem")]
+CACHES = {
+    "default": {
+        "BACKEND":  _cache_backend,
+        "LOCATION": os.getenv("DJANGO_CACHE_LOCATION", _cache_location),
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
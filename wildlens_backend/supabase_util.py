@@ -1,39 +1,179 @@
 # wildlens_backend/supabase_util.py
-import os
-from supabase import create_client, Client
+"""
+Pooled PostgREST access for views.
+
+Every worker keeps ONE keep-alive HTTP transport to Supabase (one per event
+loop for async views). ``client_for_request`` hands out a PostgREST client
+that rides on it, authenticated with the *end-user's* JWT as a request
+header – no ``create_client`` / ``auth.set_session`` (and its round trip to
+GoTrue) per request. The middleware has already verified the token and
+PostgREST verifies it again, so RLS still sees auth.uid().
+
+Per-token clients are kept in a small LRU (SUPABASE_CLIENT_CACHE) because
+the SDK binds headers to the client object; they are cheap views onto the
+shared transport.
+"""
+import os, asyncio, inspect, threading, weakref
+from collections import OrderedDict
+import httpx
+from asgiref.sync import sync_to_async
+from postgrest import SyncPostgrestClient, AsyncPostgrestClient
 from django.conf import settings
 
 SUPABASE_URL      = settings.SUPABASE_URL
 SUPABASE_ANON_KEY = settings.SUPABASE_KEY        # anon key, NOT service key
+REST_URL          = f"{SUPABASE_URL}/rest/v1" if SUPABASE_URL else ""
+
+CLIENT_CACHE_SIZE = int(os.getenv("SUPABASE_CLIENT_CACHE", 256))
+POOL_LIMITS       = httpx.Limits(max_connections=int(os.getenv("SUPABASE_MAX_CONNECTIONS", 50)),
+                                 max_keepalive_connections=20, keepalive_expiry=60.0)
+TIMEOUT           = httpx.Timeout(float(os.getenv("SUPABASE_TIMEOUT", 30)), connect=5.0)
+
+# postgrest-py ≥ 1.1 accepts the httpx client; older versions build their own
+_ACCEPTS_HTTP_CLIENT = "http_client" in inspect.signature(SyncPostgrestClient.__init__).parameters
+
+_stats = {"requests": 0, "connections": 0, "clients_built": 0, "client_hits": 0}
+
+
+def _headers(jwt):
+    return {"apikey": SUPABASE_ANON_KEY, "Authorization": f"Bearer {jwt or SUPABASE_ANON_KEY}"}
+
+
+def _bearer(request):
+    auth_header = request.META.get("HTTP_AUTHORIZATION", "")
+    return auth_header.split(" ", 1)[1] if auth_header.startswith("Bearer ") else None
+
+
+# ─── shared transports (count requests vs. new TCP/TLS connections) ───────
+def _trace(event, info):
+    if event == "connection.connect_tcp.complete":
+        _stats["connections"] += 1
+
+
+async def _atrace(event, info):
+    _trace(event, info)
+
+
+class _PooledTransport(httpx.HTTPTransport):
+    def handle_request(self, request):
+        _stats["requests"] += 1
+        request.extensions = {**request.extensions, "trace": _trace}
+        return super().handle_request(request)
+
+
+class _AsyncPooledTransport(httpx.AsyncHTTPTransport):
+    async def handle_async_request(self, request):
+        _stats["requests"] += 1
+        request.extensions = {**request.extensions, "trace": _atrace}
+        return await super().handle_async_request(request)
+
+
+class _ClientLRU:
+    """token → PostgREST client, all sharing one transport."""
+
+    def __init__(self, transport, postgrest_cls, http_cls):
+        self.transport     = transport
+        self.postgrest_cls = postgrest_cls
+        self.http_cls      = http_cls
+        self.clients       = OrderedDict()
+        self.lock          = threading.Lock()
+
+    def get(self, jwt):
+        with self.lock:
+            pg = self.clients.get(jwt)
+            if pg is not None:
+                self.clients.move_to_end(jwt)
+                _stats["client_hits"] += 1
+                return pg
+        pg = self._build(jwt)
+        with self.lock:
+            self.clients[jwt] = pg
+            while len(self.clients) > CLIENT_CACHE_SIZE:
+                self.clients.popitem(last=False)      # shared transport stays open
+        return pg
+
+    def _build(self, jwt):
+        _stats["clients_built"] += 1
+        headers = _headers(jwt)
+        session = self.http_cls(base_url=REST_URL, headers=headers, timeout=TIMEOUT,
+                                transport=self.transport)
+        if _ACCEPTS_HTTP_CLIENT:
+            return self.postgrest_cls(REST_URL, headers=headers, http_client=session)
+        pg = self.postgrest_cls(REST_URL, headers=headers)
+        pg.session = session                          # swap in the pooled session
+        return pg
 
-def client_for_request(request) -> Client:
+
+_sync_pool = None
+_sync_pool_pid = None
+_sync_lock = threading.Lock()
+
+
+def _pool() -> _ClientLRU:
+    global _sync_pool, _sync_pool_pid
+    if _sync_pool is None or _sync_pool_pid != os.getpid():   # re-create after fork
+        with _sync_lock:
+            if _sync_pool is None or _sync_pool_pid != os.getpid():
+                _sync_pool = _ClientLRU(_PooledTransport(limits=POOL_LIMITS),
+                                        SyncPostgrestClient, httpx.Client)
+                _sync_pool_pid = os.getpid()
+    return _sync_pool
+
+
+# async connections are bound to their event loop
+_async_pools: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _ClientLRU]" = \
+    weakref.WeakKeyDictionary()
+
+
+def _apool() -> _ClientLRU:
+    loop = asyncio.get_running_loop()
+    pool = _async_pools.get(loop)
+    if pool is None:
+        pool = _async_pools[loop] = _ClientLRU(_AsyncPooledTransport(limits=POOL_LIMITS),
+                                               AsyncPostgrestClient, httpx.AsyncClient)
+    return pool
+
+
+# ─── public API ───────────────────────────────────────────────────────────
+def client_for_request(request) -> SyncPostgrestClient:
     """
-    Return a fresh Supabase client whose PostgREST layer is authenticated
-    with the *end-user's* JWT (so RLS policies see auth.uid()).
+    PostgREST client authenticated with the *end-user's* JWT (so RLS
+    policies see auth.uid()). Header first, session fallback; without a
+    token the anon key is used and RLS applies as usual.
     """
-    # 1) Get the JWT – header first, session fallback
-    auth_header = request.META.get("HTTP_AUTHORIZATION", "")
-    if auth_header.startswith("Bearer "):
-        jwt = auth_header.split(" ", 1)[1]
-    else:
-        jwt = request.session.get("supabase_token")
-
-    if not jwt:
-        # Caller forgot the header → you’ll hit RLS anyway
-        return create_client(SUPABASE_URL, SUPABASE_ANON_KEY)
-
-    # 2) New client per request (thread-safe)
-    sb: Client = create_client(SUPABASE_URL, SUPABASE_ANON_KEY)
-
-    # 3) Attach the token so PostgREST sends `Authorization: Bearer …`
-    #
-    #   • v2 SDK ➜ sb.auth.set_session({"access_token": jwt, "refresh_token": None})
-    #   • v1 SDK ➜ sb.auth.session = {"access_token": jwt, "token_type": "bearer"}
-    #
-    # Adjust depending on the version you installed:
-    try:                         # works for v2
-        sb.auth.set_session(access_token=jwt, refresh_token="") 
-    except TypeError:            # fallback for v1
-        sb.auth.session = {"access_token": jwt, "token_type": "bearer"}
-
-    return sb
+    jwt = _bearer(request) or request.session.get("supabase_token")
+    return _pool().get(jwt)
+
+
+async def aclient_for_request(request) -> AsyncPostgrestClient:
+    """
+    Async twin of ``client_for_request`` for ``async def`` views: the
+    PostgREST calls are awaited instead of blocking a worker.
+    """
+    jwt = _bearer(request) or await sync_to_async(request.session.get)("supabase_token")
+    return _apool().get(jwt)
+
+
+def service_client() -> SyncPostgrestClient:
+    """Anon-key client on the shared transport (pooled settings.SUPABASE_CLIENT)."""
+    return _pool().get(None)
+
+
+async def aservice_client() -> AsyncPostgrestClient:
+    """Anon-key client for async views (async counterpart of settings.SUPABASE_CLIENT)."""
+    return _apool().get(None)
+
+
+def client_for_token(jwt) -> SyncPostgrestClient:
+    """Pooled client for an explicit JWT (e.g. the service-role key in a management command)."""
+    return _pool().get(jwt)
+
+
+def pool_stats() -> dict:
+    requests = _stats["requests"]
+    return {
+        **_stats,
+        "reused_connections": max(0, requests - _stats["connections"]),
+        "reuse_ratio": round(1 - _stats["connections"] / requests, 4) if requests else 0.0,
+        "cached_clients": len(_sync_pool.clients) if _sync_pool else 0,
+    }
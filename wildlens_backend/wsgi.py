@@ -14,3 +14,7 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'wildlens_backend.settings')
 
 application = get_wsgi_application()
+
+# reference data (infos_especes) is loaded before the first request needs it
+from api.services import species_catalog  # noqa: E402
+species_catalog.preload()